@@ -0,0 +1,112 @@
+"""
+Shared HTTP client pool for the PydanticAI agents.
+
+ProductAgent, StoreLocatorAgent and WeatherAgent all call back into the Next.js
+API routes (/api/products, /api/stores, /api/weather). Instead of opening a new
+httpx.AsyncClient (and a new TCP/TLS connection) for every chat turn, the agents
+share one process-wide client whose connections are kept alive between requests.
+
+Configuration (environment variables):
+- AGENT_HTTP_MAX_CONNECTIONS: Maximum open connections (default 100)
+- AGENT_HTTP_MAX_KEEPALIVE: Maximum idle keep-alive connections (default 20)
+- AGENT_HTTP_KEEPALIVE_EXPIRY: Seconds an idle connection is kept (default 30)
+- AGENT_HTTP2: Set to "false" to disable HTTP/2 when the h2 package is installed
+- AGENT_<ENDPOINT>_TIMEOUT: Per-endpoint timeout in seconds, e.g. AGENT_PRODUCTS_TIMEOUT
+
+Call aclose_shared_client() before the event loop shuts down to release the
+pooled connections.
+
+httpx (with httpcore, anyio and the TLS setup) is imported by the first
+get_client() call rather than with this module, so an agent process that
+answers without calling an API route never loads it.
+"""
+import asyncio
+import logging
+import os
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger('agents.agent_http')
+
+# Timeouts (seconds) used by each agent endpoint unless overridden via environment
+DEFAULT_ENDPOINT_TIMEOUTS = {
+    'products': 10.0,
+    'stores': 5.0,
+    'weather': 10.0,
+}
+
+_client: Optional['httpx.AsyncClient'] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def http2_available() -> bool:
+    """Return True if HTTP/2 is enabled and the optional h2 package is installed."""
+    if os.environ.get('AGENT_HTTP2', 'true').lower() != 'true':
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def pool_limits() -> 'httpx.Limits':
+    """Build the connection pool limits from the environment."""
+    import httpx
+
+    return httpx.Limits(
+        max_connections=int(os.environ.get('AGENT_HTTP_MAX_CONNECTIONS', '100')),
+        max_keepalive_connections=int(os.environ.get('AGENT_HTTP_MAX_KEEPALIVE', '20')),
+        keepalive_expiry=float(os.environ.get('AGENT_HTTP_KEEPALIVE_EXPIRY', '30')),
+    )
+
+
+def endpoint_timeout(endpoint: str) -> float:
+    """
+    Get the request timeout for an agent endpoint
+    
+    Args:
+        endpoint: Endpoint name ('products', 'stores' or 'weather')
+        
+    Returns:
+        Timeout in seconds
+    """
+    default = DEFAULT_ENDPOINT_TIMEOUTS.get(endpoint, 10.0)
+    return float(os.environ.get(f'AGENT_{endpoint.upper()}_TIMEOUT', default))
+
+
+def get_client() -> 'httpx.AsyncClient':
+    """
+    Get the shared AsyncClient for the running event loop
+    
+    httpx binds pooled connections to the event loop that opened them, so a new
+    client is created if the loop has changed since the last call.
+    
+    Returns:
+        Shared httpx.AsyncClient
+    """
+    global _client, _client_loop
+    
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        import httpx
+
+        http2 = http2_available()
+        _client = httpx.AsyncClient(limits=pool_limits(), http2=http2)
+        _client_loop = loop
+        logger.debug("Created shared agent HTTP client (http2=%s)", http2)
+    return _client
+
+
+async def aclose_shared_client() -> None:
+    """Close the shared client and its pooled connections, if one is open."""
+    global _client, _client_loop
+    
+    client, loop = _client, _client_loop
+    _client, _client_loop = None, None
+    # Connections opened on another (finished) loop cannot be closed from here
+    if client is not None and not client.is_closed and loop is asyncio.get_running_loop():
+        await client.aclose()
+        logger.debug("Closed shared agent HTTP client")
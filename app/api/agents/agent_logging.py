@@ -0,0 +1,148 @@
+"""
+Logging setup shared by the PydanticAI agents.
+
+Every agent logs through a named logger under "agents" (agents.product,
+agents.store_locator, ...) with %-style arguments, so a disabled level costs a
+level check instead of building the message. Records are handed to a
+QueueHandler and written to the log file by a QueueListener thread, which keeps
+file I/O off the event loop; the listener is flushed and stopped at exit. A
+forked child (agent_pool.py workers) starts a listener of its own, since the
+parent's thread does not exist in the child.
+Third-party libraries (httpx, httpcore) only reach the file from WARNING up.
+
+Large payloads (API responses, result lists) go through log_payload(), which
+only serializes them at DEBUG, for a sample of requests, and truncates them.
+
+Configuration (environment variables):
+- AGENT_LOG_LEVEL: Level of the agent loggers (default INFO)
+- AGENT_LOG_FILE: Log file (default logs/app.log)
+- AGENT_LOG_QUEUE: Set to "false" to write from the calling thread instead of a listener thread
+- AGENT_LOG_PAYLOAD_SAMPLE: Fraction of DEBUG payloads that are logged (default 0.1)
+- AGENT_LOG_PAYLOAD_MAX_CHARS: Payloads are truncated to this length (default 2000)
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+from typing import Any, Optional, Tuple
+
+AGENTS_LOGGER = 'agents'
+DEFAULT_LOG_FILE = os.path.join('logs', 'app.log')
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional[logging.Handler] = None
+_configured = False
+_settings: Optional[Tuple[str, str, bool]] = None
+_lock = threading.Lock()
+
+
+def configure_logging(level: Optional[str] = None, filename: Optional[str] = None,
+                      use_queue: Optional[bool] = None, force: bool = False) -> None:
+    """
+    Set up the agent loggers, once per process
+
+    Arguments override the environment variables.
+
+    Args:
+        level: Level name for the agent loggers
+        filename: Log file
+        use_queue: Write through a QueueListener thread
+        force: Replace an existing configuration
+    """
+    global _listener, _handler, _configured, _settings
+
+    with _lock:
+        if _configured and not force:
+            return
+        shutdown_logging()
+
+        level = (level or os.environ.get('AGENT_LOG_LEVEL', 'INFO')).upper()
+        filename = filename or os.environ.get('AGENT_LOG_FILE', DEFAULT_LOG_FILE)
+        if use_queue is None:
+            use_queue = os.environ.get('AGENT_LOG_QUEUE', 'true').lower() != 'false'
+        _settings = (level, filename, use_queue)
+
+        file_handler = logging.FileHandler(filename)
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        if use_queue:
+            log_queue = queue.SimpleQueue()
+            _handler = logging.handlers.QueueHandler(log_queue)
+            _listener = logging.handlers.QueueListener(log_queue, file_handler)
+            _listener.start()
+        else:
+            _handler = file_handler
+
+        # The handler sits on the root logger so warnings from libraries are kept;
+        # the agent loggers carry their own level
+        root = logging.getLogger()
+        root.addHandler(_handler)
+        if root.level == logging.NOTSET or root.level < logging.WARNING:
+            root.setLevel(logging.WARNING)
+        logging.getLogger(AGENTS_LOGGER).setLevel(level)
+
+        if not _configured:
+            atexit.register(shutdown_logging)
+            os.register_at_fork(after_in_child=_restart_in_child)
+        _configured = True
+
+
+def _restart_in_child() -> None:
+    """Replace the listener a forked child inherited without its thread."""
+    if _listener is not None:
+        configure_logging(*_settings, force=True)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and detach the agent log handler."""
+    global _listener, _handler
+
+    if _listener is not None:
+        # Writes out everything still queued before returning
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler.close()
+        _handler = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Get the logger of an agent, configuring agent logging on first use
+
+    Args:
+        name: Agent name, e.g. 'product' for the "agents.product" logger
+
+    Returns:
+        Logger
+    """
+    configure_logging()
+    return logging.getLogger(f"{AGENTS_LOGGER}.{name}")
+
+
+def log_payload(logger: logging.Logger, message: str, payload: Any) -> None:
+    """
+    Log a large payload at DEBUG, sampled and truncated
+
+    Args:
+        logger: Logger to write to
+        message: Description printed before the payload
+        payload: JSON-serializable value (anything else is logged with str())
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    sample_rate = float(os.environ.get('AGENT_LOG_PAYLOAD_SAMPLE', '0.1'))
+    if sample_rate < 1.0 and random.random() >= sample_rate:
+        return
+    max_chars = int(os.environ.get('AGENT_LOG_PAYLOAD_MAX_CHARS', '2000'))
+    text = json.dumps(payload, default=str)
+    if len(text) > max_chars:
+        text = f"{text[:max_chars]}... ({len(text)} chars)"
+    logger.debug("%s: %s", message, text)
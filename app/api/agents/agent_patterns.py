@@ -0,0 +1,79 @@
+"""
+Regular expressions for the agents' query parsing tables, compiled on first use.
+
+A spawned agent process answers one query, and most queries touch a handful of
+an agent's patterns (a product query never reaches the storage or processor
+tables unless it mentions them). Compiling every table at import time made
+up a large part of an agent module's import, so the tables are built from
+lazy_compile() patterns, which compile when a method is first called on them
+and then cost nothing extra per call.
+
+Hosts that keep the agents loaded (agent_server.py, agent_pool.py) call
+compile_all() once at startup instead, so no request pays for compilation and
+pool workers share the compiled patterns with the parent they are forked from.
+"""
+import re
+from typing import List
+
+# Pattern methods copied onto a LazyPattern once it is compiled
+_PATTERN_ATTRIBUTES = ('search', 'match', 'fullmatch', 'split', 'findall', 'finditer', 'sub', 'subn',
+                       'groups', 'groupindex')
+
+_pending: List['LazyPattern'] = []
+
+
+class LazyPattern:
+    """Stand-in for a compiled re.Pattern that compiles on first use"""
+
+    def __init__(self, pattern: str, flags: int = 0):
+        self.pattern = pattern
+        self.flags = flags
+        self.compiled = None
+        _pending.append(self)
+
+    def compile(self) -> re.Pattern:
+        """Compile the pattern, once."""
+        if self.compiled is None:
+            self.compiled = re.compile(self.pattern, self.flags)
+            # Later calls find the bound methods in the instance dict and skip __getattr__
+            for name in _PATTERN_ATTRIBUTES:
+                setattr(self, name, getattr(self.compiled, name))
+        return self.compiled
+
+    def __getattr__(self, name: str):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.compile(), name)
+
+    def __repr__(self) -> str:
+        return f"lazy_compile({self.pattern!r}, {self.flags!r})"
+
+
+def lazy_compile(pattern: str, flags: int = 0) -> LazyPattern:
+    """
+    Create a pattern that compiles on first use
+
+    Args:
+        pattern: Regular expression
+        flags: re flags
+
+    Returns:
+        LazyPattern with the methods of re.Pattern
+    """
+    return LazyPattern(pattern, flags)
+
+
+def compile_all() -> int:
+    """
+    Compile every lazy pattern created so far
+
+    Returns:
+        Number of patterns compiled by this call
+    """
+    compiled = 0
+    while _pending:
+        pattern = _pending.pop()
+        if pattern.compiled is None:
+            pattern.compile()
+            compiled += 1
+    return compiled
@@ -0,0 +1,429 @@
+"""
+Pre-forked pool of warm agent workers.
+
+agent_server.py keeps the agents warm in a single process, so agent work never
+uses more than one core. The pool's main process (the zygote) imports the
+agents and builds their tables once, moves everything it allocated out of the
+garbage collector's reach with gc.freeze(), and then forks:
+
+- AGENT_POOL_WORKERS workers that run the agents; they share the zygote's
+  memory copy-on-write
+- a dispatcher that serves the agent server's HTTP API (POST /agents/<type>,
+  GET /health) and forwards every request to the worker with the fewest
+  requests in flight
+
+The zygote never runs an agent or an event loop, so its memory stays as it was
+at fork time and every worker starts from the same warm state. A worker is
+retired after AGENT_POOL_MAX_REQUESTS requests: the dispatcher stops sending
+it work, closes its connection once the last answer is in, and the zygote
+forks a replacement (as it does for a worker that dies). GET /health lists
+every worker's load and memory (RSS, PSS, shared and private kB from
+/proc/<pid>/smaps_rollup).
+
+gc.freeze() keeps collections from writing to the shared objects; reference
+counting still copies the pages a worker touches, so private memory grows with
+use and goes back down when the worker is recycled.
+
+Run from the repository root, like agent_server.py (needs fork, i.e. Linux):
+    python app/api/agents/agent_pool.py
+
+Configuration (environment variables):
+- AGENT_SERVER_HOST, AGENT_SERVER_PORT, AGENT_SERVER_SOCKET: Listening address, as for agent_server.py
+- AGENT_SERVER_CONCURRENCY: Requests each worker runs at once (default 16)
+- AGENT_SERVER_QUEUE_TIMEOUT: Seconds a request may wait for a worker (default 10)
+- AGENT_POOL_WORKERS: Worker processes (default: CPU count)
+- AGENT_POOL_MAX_REQUESTS: Requests a worker serves before it is replaced (default 1000, 0 never)
+- AGENT_POOL_GC_FREEZE: Set to "false" to fork without gc.freeze()
+"""
+import asyncio
+import gc
+import itertools
+import json
+import os
+import signal
+import socket
+import struct
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from agent_logging import get_logger, shutdown_logging
+from agent_server import AgentHttpServer, AgentServer
+
+logger = get_logger('pool')
+
+# Frames between the dispatcher and a worker: 4-byte length, then JSON
+FRAME_HEADER = struct.Struct('!I')
+
+# smaps_rollup fields in the memory report
+MEMORY_FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty')
+
+
+def write_frame(writer: asyncio.StreamWriter, message: Dict[str, Any]) -> None:
+    data = json.dumps(message).encode()
+    writer.write(FRAME_HEADER.pack(len(data)) + data)
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Dict[str, Any]:
+    header = await reader.readexactly(FRAME_HEADER.size)
+    return json.loads(await reader.readexactly(FRAME_HEADER.unpack(header)[0]))
+
+
+def process_memory(pid: int) -> Optional[Dict[str, int]]:
+    """
+    Read the memory of a process from /proc/<pid>/smaps_rollup
+
+    Args:
+        pid: Process id
+
+    Returns:
+        rss_kb, pss_kb, shared_kb and private_kb, or None if unavailable
+    """
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if name in MEMORY_FIELDS:
+                    fields[name] = int(value.split()[0])
+    except (OSError, ValueError):
+        return None
+    if len(fields) < len(MEMORY_FIELDS):
+        return None
+    return {
+        'rss_kb': fields['Rss'],
+        'pss_kb': fields['Pss'],
+        'shared_kb': fields['Shared_Clean'] + fields['Shared_Dirty'],
+        'private_kb': fields['Private_Clean'] + fields['Private_Dirty'],
+    }
+
+
+async def run_worker(server: AgentServer, connection: socket.socket) -> None:
+    """
+    Answer agent requests from the dispatcher until it closes the connection
+
+    Args:
+        server: The zygote's warm agents
+        connection: Worker end of the dispatcher socket pair
+    """
+    reader, writer = await asyncio.open_unix_connection(sock=connection)
+    write_lock = asyncio.Lock()
+    tasks: Set[asyncio.Task] = set()
+
+    async def answer(request: Dict[str, Any]):
+        status, body = await server.run_agent(request['agent'], request['query'], request.get('parameters'))
+        async with write_lock:
+            write_frame(writer, {'id': request['id'], 'status': status, 'body': body})
+            await writer.drain()
+
+    while True:
+        try:
+            request = await read_frame(reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            break
+        task = asyncio.create_task(answer(request))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    await asyncio.gather(*tasks, return_exceptions=True)
+    writer.close()
+    await server.close()
+    logger.info("Worker %s exiting after %s requests", os.getpid(), server.requests)
+
+
+class Worker:
+    """The dispatcher's view of one worker process"""
+
+    def __init__(self, pid: int, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.pid = pid
+        self.reader = reader
+        self.writer = writer
+        self.in_flight = 0
+        self.requests = 0
+        self.retiring = False
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.started = time.time()
+
+
+class PoolDispatcher(AgentHttpServer):
+    """Serves the agent HTTP API and spreads requests over the workers"""
+
+    def __init__(self, control: socket.socket, agents: List[str], startup_ms: float,
+                 concurrency: int, queue_timeout: float, max_requests: int):
+        """
+        Args:
+            control: Dispatcher end of the zygote's control socket, on which new workers arrive
+            agents: Agent types the workers serve
+            startup_ms: Time the zygote took to load the agents
+            concurrency: Requests each worker runs at once
+            queue_timeout: Seconds a request may wait for a worker
+            max_requests: Requests a worker serves before it is retired (0 never)
+        """
+        super().__init__(concurrency, queue_timeout)
+        self.control = control
+        self.agents = agents
+        self.startup_ms = startup_ms
+        self.max_requests = max_requests
+        self.workers: Dict[int, Worker] = {}
+        self.recycled = 0
+        self.request_ids = itertools.count()
+        self.changed = asyncio.Condition()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8765, socket_path: Optional[str] = None):
+        self.control.setblocking(False)
+        asyncio.get_running_loop().add_reader(self.control.fileno(), self.receive_worker)
+        await super().serve(host, port, socket_path)
+
+    def receive_worker(self):
+        """Take over the connection of a worker the zygote has just forked."""
+        try:
+            message, fds, _, _ = socket.recv_fds(self.control, 64, 1)
+        except BlockingIOError:
+            return
+        if not message:
+            logger.error("Zygote exited; stopping the dispatcher")
+            os.kill(os.getpid(), signal.SIGTERM)
+            asyncio.get_running_loop().remove_reader(self.control.fileno())
+            return
+        asyncio.create_task(self.attach_worker(int(message), socket.socket(fileno=fds[0])))
+
+    async def attach_worker(self, pid: int, connection: socket.socket):
+        reader, writer = await asyncio.open_unix_connection(sock=connection)
+        worker = Worker(pid, reader, writer)
+        self.workers[pid] = worker
+        async with self.changed:
+            self.changed.notify_all()
+        logger.info("Worker %s attached (%s workers)", pid, len(self.workers))
+
+        try:
+            while True:
+                response = await read_frame(reader)
+                future = worker.pending.pop(response['id'], None)
+                if future is not None and not future.done():
+                    future.set_result((response['status'], response['body']))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            del self.workers[pid]
+            for future in worker.pending.values():
+                if not future.done():
+                    future.set_result((502, {'error': f"Agent worker {pid} exited"}))
+            if not worker.retiring:
+                logger.warning("Worker %s exited unexpectedly", pid)
+            writer.close()
+            async with self.changed:
+                self.changed.notify_all()
+
+    def pick_worker(self) -> Optional[Worker]:
+        """Return the least loaded worker that can take a request, if any."""
+        candidates = [worker for worker in self.workers.values()
+                      if not worker.retiring and worker.in_flight < self.concurrency]
+        return min(candidates, key=lambda worker: (worker.in_flight, worker.requests), default=None)
+
+    async def run_agent(self, agent_type: str, query: str, parameters: Optional[Dict[str, Any]]) -> Tuple[int, Dict]:
+        """
+        Forward one agent request to the least loaded worker
+
+        Args:
+            agent_type: Agent type from the URL
+            query: User query
+            parameters: Agent parameters
+
+        Returns:
+            (HTTP status, response body); the body names the worker that answered
+        """
+        if agent_type not in self.agents:
+            return 404, {'error': f"Unknown agent type: {agent_type}"}
+
+        start = time.perf_counter()
+        async with self.changed:
+            try:
+                worker = await asyncio.wait_for(self.changed.wait_for(self.pick_worker), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                return 503, {'error': 'Agent workers are busy'}
+            worker.in_flight += 1
+            worker.requests += 1
+            if self.max_requests and worker.requests >= self.max_requests:
+                worker.retiring = True
+        queued = time.perf_counter()
+
+        request_id = next(self.request_ids)
+        future = asyncio.get_running_loop().create_future()
+        worker.pending[request_id] = future
+        write_frame(worker.writer, {'id': request_id, 'agent': agent_type, 'query': query, 'parameters': parameters})
+        try:
+            status, body = await future
+        finally:
+            worker.pending.pop(request_id, None)
+            worker.in_flight -= 1
+            if worker.retiring and worker.in_flight == 0 and not worker.writer.is_closing():
+                # The worker exits once it sees the connection close
+                worker.writer.close()
+                self.recycled += 1
+                logger.info("Retiring worker %s after %s requests", worker.pid, worker.requests)
+            async with self.changed:
+                self.changed.notify_all()
+        done = time.perf_counter()
+
+        self.requests += 1
+        timings = body.setdefault('timings', {})
+        if 'agent_ms' in timings:
+            self.agent_ms.append(timings['agent_ms'])
+        timings['queue_ms'] = round(timings.get('queue_ms', 0) + (queued - start) * 1000, 2)
+        timings['total_ms'] = round((done - start) * 1000, 2)
+        body['worker'] = worker.pid
+        return status, body
+
+    def health(self) -> Dict[str, Any]:
+        """Return the agents, load and memory of every worker and timing percentiles."""
+        now = time.time()
+        return {
+            'agents': self.agents,
+            'concurrency': self.concurrency,
+            'in_flight': sum(worker.in_flight for worker in self.workers.values()),
+            'requests': self.requests,
+            'rejected': self.rejected,
+            'recycled': self.recycled,
+            'startup_ms': round(self.startup_ms, 1),
+            'timings': self.percentiles(),
+            'zygote': {'pid': os.getppid(), 'memory': process_memory(os.getppid())},
+            'dispatcher': {'pid': os.getpid(), 'memory': process_memory(os.getpid())},
+            'workers': [{
+                'pid': worker.pid,
+                'in_flight': worker.in_flight,
+                'requests': worker.requests,
+                'retiring': worker.retiring,
+                'uptime_s': round(now - worker.started, 1),
+                'memory': process_memory(worker.pid),
+            } for worker in self.workers.values()],
+        }
+
+    async def close(self):
+        """Close the worker connections, which lets the workers exit."""
+        for worker in self.workers.values():
+            worker.retiring = True
+            worker.writer.close()
+
+
+class AgentPool:
+    """The zygote: warm agents that the dispatcher and workers are forked from"""
+
+    def __init__(self, workers: Optional[int] = None, max_requests: Optional[int] = None,
+                 gc_freeze: Optional[bool] = None):
+        """
+        Load the agents and prepare them for forking
+
+        Args:
+            workers: Worker processes (default AGENT_POOL_WORKERS, then the CPU count)
+            max_requests: Requests a worker serves before it is replaced (default AGENT_POOL_MAX_REQUESTS)
+            gc_freeze: Freeze the loaded objects before forking (default AGENT_POOL_GC_FREEZE)
+        """
+        self.workers = workers or int(os.environ.get('AGENT_POOL_WORKERS', '0')) or os.cpu_count() or 1
+        self.max_requests = max_requests if max_requests is not None \
+            else int(os.environ.get('AGENT_POOL_MAX_REQUESTS', '1000'))
+        if gc_freeze is None:
+            gc_freeze = os.environ.get('AGENT_POOL_GC_FREEZE', 'true').lower() != 'false'
+
+        # No collections while loading: the objects should stay where they were
+        # allocated, and the collector should not touch them after the fork
+        gc.disable()
+        self.server = AgentServer()
+        if gc_freeze:
+            gc.freeze()
+        self.gc_freeze = gc_freeze
+        self.control: Optional[socket.socket] = None
+        self.dispatcher_pid: Optional[int] = None
+        self.worker_pids: Set[int] = set()
+
+    def fork(self, child, *args) -> int:
+        """Fork a child that runs child(*args) and exits."""
+        pid = os.fork()
+        if pid:
+            return pid
+        code = 0
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            gc.enable()
+            child(*args)
+        except BaseException:
+            logger.exception("Pool child %s failed", os.getpid())
+            code = 1
+        finally:
+            shutdown_logging()
+            os._exit(code)
+
+    def dispatcher_main(self, control: socket.socket, host: str, port: int, socket_path: Optional[str]):
+        self.control.close()
+        dispatcher = PoolDispatcher(control, sorted(self.server.agents), self.server.startup_ms,
+                                    self.server.concurrency, self.server.queue_timeout, self.max_requests)
+        asyncio.run(dispatcher.serve(host, port, socket_path))
+
+    def worker_main(self, connection: socket.socket, dispatcher_end: socket.socket):
+        # Ctrl-C reaches the whole process group; workers exit when the dispatcher lets go of them
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        # Holding the dispatcher's end would keep the worker from seeing it close
+        dispatcher_end.close()
+        self.control.close()
+        asyncio.run(run_worker(self.server, connection))
+
+    def fork_worker(self):
+        """Fork a worker and hand its connection to the dispatcher."""
+        dispatcher_end, worker_end = socket.socketpair()
+        with dispatcher_end, worker_end:
+            pid = self.fork(self.worker_main, worker_end, dispatcher_end)
+            socket.send_fds(self.control, [str(pid).encode()], [dispatcher_end.fileno()])
+        self.worker_pids.add(pid)
+
+    def run(self, host: str = '127.0.0.1', port: int = 8765, socket_path: Optional[str] = None):
+        """Start the dispatcher and workers and keep the workers replaced until SIGINT/SIGTERM."""
+        self.control, dispatcher_control = socket.socketpair()
+        with dispatcher_control:
+            self.dispatcher_pid = self.fork(self.dispatcher_main, dispatcher_control, host, port, socket_path)
+        for _ in range(self.workers):
+            self.fork_worker()
+        logger.info("Agent pool started: zygote %s, dispatcher %s, %s workers (gc.freeze %s)",
+                    os.getpid(), self.dispatcher_pid, self.workers, 'on' if self.gc_freeze else 'off')
+
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        try:
+            while True:
+                pid, status = os.wait()
+                if pid == self.dispatcher_pid:
+                    logger.warning("Dispatcher exited (status %s); stopping the pool", status)
+                    self.dispatcher_pid = None
+                    break
+                self.worker_pids.discard(pid)
+                self.fork_worker()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Stop the dispatcher, then the workers, and wait for them to exit."""
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        if self.dispatcher_pid:
+            os.kill(self.dispatcher_pid, signal.SIGTERM)
+            os.waitpid(self.dispatcher_pid, 0)
+        for pid in self.worker_pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self.control.close()
+        logger.info("Agent pool stopped")
+
+
+def main():
+    pool = AgentPool()
+    pool.run(
+        host=os.environ.get('AGENT_SERVER_HOST', '127.0.0.1'),
+        port=int(os.environ.get('AGENT_SERVER_PORT', '8765')),
+        socket_path=os.environ.get('AGENT_SERVER_SOCKET') or None,
+    )
+
+
+if __name__ == '__main__':
+    main()
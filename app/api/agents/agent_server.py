@@ -0,0 +1,275 @@
+"""
+Long-lived host for the PydanticAI agents.
+
+The agent route used to spawn a Python process per chat turn, paying for
+interpreter startup, the pydantic_ai/pydantic/httpx imports and every agent's
+regex tables each time. This server loads ProductAgent, StoreLocatorAgent,
+WeatherAgent and MultiAgent once, compiles their pattern tables, keeps the
+instances (and the shared agent HTTP client) warm, and serves them over HTTP
+on localhost or a Unix socket:
+
+    POST /agents/<agent type>   {"query": "...", "parameters": {...}}
+        -> 200 {"result": "...", "timings": {"queue_ms": .., "agent_ms": .., "total_ms": ..}}
+    GET /health
+        -> 200 {"agents": [...], "in_flight": .., "requests": .., "timings": {...}}
+
+At most AGENT_SERVER_CONCURRENCY requests run at once; a request that cannot
+start within AGENT_SERVER_QUEUE_TIMEOUT seconds gets a 503, and the route falls
+back to spawning the agent. Every request's timings are returned and logged.
+
+Run from the repository root, like the agent route (logs/ and the store data
+paths are relative to it):
+    python app/api/agents/agent_server.py
+
+Configuration (environment variables):
+- AGENT_SERVER_HOST: Interface to listen on (default 127.0.0.1)
+- AGENT_SERVER_PORT: Port to listen on (default 8765)
+- AGENT_SERVER_SOCKET: Unix socket path; replaces host and port when set
+- AGENT_SERVER_CONCURRENCY: Requests processed at once (default 16)
+- AGENT_SERVER_QUEUE_TIMEOUT: Seconds a request may wait for a slot (default 10)
+"""
+import abc
+import asyncio
+import json
+import os
+import signal
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from agent_http import aclose_shared_client
+from agent_logging import get_logger
+from agent_patterns import compile_all
+from multi_agent import MultiAgent, load_agent_class
+
+logger = get_logger('server')
+
+AGENT_TYPES = ('product', 'store-locator', 'weather')
+
+# Largest request body accepted
+MAX_BODY_BYTES = 1 << 20
+
+# Requests whose agent timings are kept for the /health percentiles
+TIMING_WINDOW = 1000
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            413: 'Payload Too Large', 500: 'Internal Server Error', 502: 'Bad Gateway',
+            503: 'Service Unavailable'}
+
+
+class AgentHttpServer(abc.ABC):
+    """
+    HTTP front of the agent server
+
+    Subclasses run the agents (run_agent) and report their state (health);
+    this class parses requests and serves them on keep-alive connections.
+    """
+
+    def __init__(self, concurrency: int, queue_timeout: float):
+        self.concurrency = concurrency
+        self.queue_timeout = queue_timeout
+        self.requests = 0
+        self.rejected = 0
+        self.agent_ms: Deque[float] = deque(maxlen=TIMING_WINDOW)
+
+    @abc.abstractmethod
+    async def run_agent(self, agent_type: str, query: str, parameters: Optional[Dict[str, Any]]) -> Tuple[int, Dict]:
+        """Answer one agent request with (HTTP status, response body)."""
+
+    @abc.abstractmethod
+    def health(self) -> Dict[str, Any]:
+        """Return the body of GET /health."""
+
+    def percentiles(self) -> Dict[str, Optional[float]]:
+        """Return the p50/p95 agent time of recent requests."""
+        timings = sorted(self.agent_ms)
+
+        def percentile(p: float) -> Optional[float]:
+            return round(timings[min(len(timings) - 1, int(p * len(timings)))], 2) if timings else None
+
+        return {'agent_ms_p50': percentile(0.5), 'agent_ms_p95': percentile(0.95)}
+
+    async def close(self):
+        """Release resources once the server has stopped listening."""
+
+    async def route(self, method: str, path: str, body: bytes) -> Tuple[int, Dict]:
+        """Dispatch one HTTP request."""
+        if path == '/health':
+            return (200, self.health()) if method == 'GET' else (405, {'error': 'Use GET'})
+        if not path.startswith('/agents/'):
+            return 404, {'error': f"Not found: {path}"}
+        if method != 'POST':
+            return 405, {'error': 'Use POST'}
+        try:
+            request = json.loads(body or b'{}')
+            query = request['query']
+            parameters = request.get('parameters')
+            if not isinstance(query, str) or not query or not (parameters is None or isinstance(parameters, dict)):
+                raise ValueError('query must be a non-empty string and parameters an object')
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, {'error': f"Invalid request: {e}"}
+        return await self.run_agent(path[len('/agents/'):], query, parameters)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve HTTP/1.1 requests on one connection, keeping it alive between requests."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, version = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', '0'))
+                if length > MAX_BODY_BYTES:
+                    status, payload = 413, {'error': 'Request body too large'}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    status, payload = await self.route(method, path.split('?', 1)[0], body)
+                    keep_alive = (headers.get('connection', '').lower() != 'close'
+                                  and not version.strip().endswith('1.0'))
+
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError) as e:
+            logger.debug("Dropping connection: %s", e)
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8765, socket_path: Optional[str] = None):
+        """Listen until SIGINT/SIGTERM, then close()."""
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            server = await asyncio.start_unix_server(self.handle_connection, path=socket_path)
+            logger.info("Agent server listening on %s", socket_path)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+            logger.info("Agent server listening on http://%s:%s", host, port)
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        async with server:
+            await stop.wait()
+        await self.close()
+        logger.info("Agent server stopped after %s requests", self.requests)
+
+
+class AgentServer(AgentHttpServer):
+    """Warm agent instances behind a bounded-concurrency HTTP endpoint"""
+
+    def __init__(self, concurrency: Optional[int] = None, queue_timeout: Optional[float] = None):
+        """
+        Load and instantiate every agent
+
+        Args:
+            concurrency: Requests processed at once (default AGENT_SERVER_CONCURRENCY)
+            queue_timeout: Seconds a request may wait for a slot (default AGENT_SERVER_QUEUE_TIMEOUT)
+        """
+        start = time.perf_counter()
+        super().__init__(concurrency or int(os.environ.get('AGENT_SERVER_CONCURRENCY', '16')),
+                         queue_timeout or float(os.environ.get('AGENT_SERVER_QUEUE_TIMEOUT', '10')))
+        self.agents: Dict[str, Any] = {agent_type: load_agent_class(agent_type)() for agent_type in AGENT_TYPES}
+        # The multi agent fans out to the same warm instances
+        multi = MultiAgent()
+        multi.agents.update(self.agents)
+        self.agents['multi'] = multi
+        # Compile the agents' pattern tables now rather than on the first requests
+        compile_all()
+
+        self.slots = asyncio.Semaphore(self.concurrency)
+        self.in_flight = 0
+        self.startup_ms = (time.perf_counter() - start) * 1000
+        logger.info("Loaded agents %s in %.1fms", sorted(self.agents), self.startup_ms)
+
+    async def run_agent(self, agent_type: str, query: str, parameters: Optional[Dict[str, Any]]) -> Tuple[int, Dict]:
+        """
+        Run one agent request within the concurrency limit
+
+        Args:
+            agent_type: Agent type from the URL
+            query: User query
+            parameters: Agent parameters
+
+        Returns:
+            (HTTP status, response body)
+        """
+        agent = self.agents.get(agent_type)
+        if agent is None:
+            return 404, {'error': f"Unknown agent type: {agent_type}"}
+
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self.slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return 503, {'error': 'Agent server is busy'}
+        queued = time.perf_counter()
+        self.in_flight += 1
+        try:
+            result = await agent.process(query, parameters)
+            status, body = 200, {'result': result}
+        except Exception as e:
+            logger.exception("Agent %s failed", agent_type)
+            status, body = 500, {'error': str(e)}
+        finally:
+            self.in_flight -= 1
+            self.slots.release()
+        done = time.perf_counter()
+
+        self.requests += 1
+        self.agent_ms.append((done - queued) * 1000)
+        body['timings'] = {
+            'queue_ms': round((queued - start) * 1000, 2),
+            'agent_ms': round((done - queued) * 1000, 2),
+            'total_ms': round((done - start) * 1000, 2),
+        }
+        logger.info("agent=%s status=%s queue_ms=%.1f agent_ms=%.1f",
+                    agent_type, status, body['timings']['queue_ms'], body['timings']['agent_ms'])
+        return status, body
+
+    def health(self) -> Dict[str, Any]:
+        """Return the loaded agents, load and timing percentiles."""
+        return {
+            'agents': sorted(self.agents),
+            'concurrency': self.concurrency,
+            'in_flight': self.in_flight,
+            'requests': self.requests,
+            'rejected': self.rejected,
+            'startup_ms': round(self.startup_ms, 1),
+            'timings': self.percentiles(),
+        }
+
+    async def close(self):
+        """Close the shared agent HTTP client."""
+        await aclose_shared_client()
+
+
+async def main():
+    server = AgentServer()
+    await server.serve(
+        host=os.environ.get('AGENT_SERVER_HOST', '127.0.0.1'),
+        port=int(os.environ.get('AGENT_SERVER_PORT', '8765')),
+        socket_path=os.environ.get('AGENT_SERVER_SOCKET') or None,
+    )
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
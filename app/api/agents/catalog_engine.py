@@ -0,0 +1,435 @@
+"""
+Embedded columnar catalog engine for the ProductAgent.
+
+The product catalog is small (about 20,000 rows), so the agent can answer
+filter searches without the /api/products -> OpenSearch round trip. The
+catalog is loaded once per process into NumPy column arrays:
+
+- Keyword fields (Brand, Model, Color, Storage, RAM, Processor, Category and
+  the Yes/No feature flags) are dictionary-encoded: one integer code per row
+  plus the value -> code vocabulary, so a term filter is a single comparison
+  of an integer array
+- Numeric fields (Price, Rating, Screen_Size, Release_Year, Review_Count) are
+  float arrays, so range filters are vectorized comparisons
+- Every sort order is precomputed as a rank per row, so a page of results is
+  an argpartition of the matching rows' ranks instead of a full sort
+- Facet counts and a price histogram are precomputed (facet_index.py) and
+  returned with every answer, for the agent's refinement hints
+
+Matching mirrors the OpenSearch query built by app/services/product.service.ts:
+term filters are exact, case-sensitive keyword matches, price and rating are
+inclusive ranges, and ties are broken by SKU_ID in keyword order. The agent's
+own filter names (max_price, min_rating, min_screen_size, water_resistant,
+...) are accepted next to the API's. The text query is only understood when it
+is the placeholder the agent sends with extracted filters ("phone", a phone
+product type such as "smartphones", or "latest"), which matches every product
+of the phone catalog; other text, including other product types ("laptops",
+"tablets", "electronics", ...), needs OpenSearch scoring, and search() returns
+None so the caller can fall back to the HTTP path. It also returns None for
+filters on fields the catalog file does not have (the Solr catalog has no
+Brand, Rating, ...); a sort on such a field leaves the rows tied, as OpenSearch
+does for missing values.
+
+The engine reloads itself when the source file changes on disk.
+
+Configuration (environment variables):
+- PRODUCT_CATALOG_EMBEDDED: Set to "true" to enable the embedded catalog engine
+- PRODUCT_CATALOG_PATH: Catalog file (cleaned_catalog.csv or a .ndjson bulk file)
+"""
+import csv
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from facet_index import FacetIndex
+
+logger = logging.getLogger('agents.catalog_engine')
+
+DEFAULT_CATALOG_PATH = os.path.join('external_services', 'solr_loader', 'cleaned_catalog.csv')
+
+# Dictionary-encoded keyword fields
+KEYWORD_COLUMNS = ('SKU_ID', 'Brand', 'Model', 'Color', 'Storage', 'RAM', 'Processor', 'Category',
+                   'Water_Resistant', 'Wireless_Charging', 'Fast_Charging', '5G_Compatible')
+
+# Numeric fields kept as float arrays; empty values count as 0, as in the OpenSearch loader
+NUMERIC_COLUMNS = ('Price', 'Rating', 'Screen_Size', 'Release_Year', 'Review_Count')
+
+# Filter name -> (catalog field, operation). The API's names come first, then
+# the names ProductAgent.extract_search_params uses for the same filters.
+FILTERS = {
+    'minPrice': ('Price', 'gte'),
+    'maxPrice': ('Price', 'lte'),
+    'minRating': ('Rating', 'gte'),
+    'minScreenSize': ('Screen_Size', 'gte'),
+    'releaseYear': ('Release_Year', 'eq'),
+    'color': ('Color', 'term'),
+    'storage': ('Storage', 'term'),
+    'brand': ('Brand', 'term'),
+    'model': ('Model', 'term'),
+    'processor': ('Processor', 'term'),
+    'ram': ('RAM', 'term'),
+    'category': ('Category', 'term'),
+    'waterResistant': ('Water_Resistant', 'flag'),
+    'wirelessCharging': ('Wireless_Charging', 'flag'),
+    'fastCharging': ('Fast_Charging', 'flag'),
+    'fiveGCompatible': ('5G_Compatible', 'flag'),
+    'min_price': ('Price', 'gte'),
+    'max_price': ('Price', 'lte'),
+    'min_rating': ('Rating', 'gte'),
+    'min_screen_size': ('Screen_Size', 'gte'),
+    'water_resistant': ('Water_Resistant', 'flag'),
+    'wireless_charging': ('Wireless_Charging', 'flag'),
+    'fast_charging': ('Fast_Charging', 'flag'),
+    '5g': ('5G_Compatible', 'flag'),
+}
+
+# The agent sets 'price' next to max_price for "exactly $N" queries; max_price covers it
+IGNORED_FILTERS = frozenset({'price'})
+
+# Filters kept by the service's fallbackStrategy retry
+FALLBACK_FILTERS = ('minPrice', 'maxPrice', 'color', 'storage', 'brand',
+                    'min_price', 'max_price')
+
+# Sort name -> sort keys as (field, descending); SKU_ID always breaks ties.
+# 'release_date:desc' is the sort the agent puts in its filters for "latest" queries.
+SORTS = {
+    'relevance': (('Rating', True),),
+    'price_asc': (('Price', False),),
+    'price_desc': (('Price', True),),
+    'rating_desc': (('Rating', True), ('Review_Count', True)),
+    'release_date:desc': (('Release_Year', True), ('Rating', True)),
+}
+
+# Text queries the agent sends when it has extracted filters that select every
+# product of the phone catalog; other product types go to OpenSearch
+MATCH_ALL_QUERIES = frozenset({'phone', 'phones', 'smartphone', 'smartphones', 'latest'})
+
+_NUMBER_RE = re.compile(r'(\d+(?:\.\d+)?)')
+
+
+def read_catalog_rows(path: str) -> List[Dict[str, Any]]:
+    """
+    Read product documents from a cleaned catalog CSV or an OpenSearch bulk NDJSON file
+
+    Args:
+        path: Path to cleaned_catalog.csv or bulk_data.ndjson
+
+    Returns:
+        List of rows keyed by the OpenSearch source field names
+    """
+    if path.endswith('.csv'):
+        with open(path, newline='') as f:
+            return list(csv.DictReader(f))
+
+    rows = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            doc = json.loads(line)
+            # Skip the bulk API action lines
+            if 'index' in doc and len(doc) == 1:
+                continue
+            rows.append(doc)
+    return rows
+
+
+def parse_number(value: Any) -> float:
+    """Convert a catalog value to float the way the OpenSearch loader does (6.1" -> 6.1, '' -> 0)."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _NUMBER_RE.search(value or '')
+    return float(match.group(1)) if match else 0.0
+
+
+def product_data(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a catalog row to the /api/products ProductData format (mapOpenSearchToProductData)."""
+    price = parse_number(row.get('Price'))
+    return {
+        'id': str(row.get('id', row.get('SKU_ID', ''))),
+        'skuId': row.get('SKU_ID'),
+        'baseId': row.get('Base_ID'),
+        'title': row.get('Title'),
+        'price': price,
+        'description': row.get('Description'),
+        'stock': int(parse_number(row.get('Stock'))),
+        'releaseYear': int(parse_number(row.get('Release_Year'))),
+        'storage': row.get('Storage'),
+        'screenSize': parse_number(row.get('Screen_Size')),
+        'color': row.get('Color'),
+        'brand': row.get('Brand') or '',
+        'model': row.get('Model') or '',
+        'rating': parse_number(row.get('Rating')),
+        'reviewCount': int(parse_number(row.get('Review_Count'))),
+        'cameraMP': row.get('Camera_MP') or '',
+        'batteryMah': int(parse_number(row.get('Battery_mAh'))),
+        'weightG': int(parse_number(row.get('Weight_g'))),
+        'dimensions': row.get('Dimensions') or '',
+        'os': row.get('OS') or '',
+        'processor': row.get('Processor') or '',
+        'ram': row.get('RAM') or '',
+        'waterResistant': row.get('Water_Resistant') or '',
+        'wirelessCharging': row.get('Wireless_Charging') or '',
+        'fastCharging': row.get('Fast_Charging') or '',
+        'fiveGCompatible': row.get('5G_Compatible') or '',
+        'category': row.get('Category') or '',
+        'tags': row.get('Tags') or '',
+        'discountPercentage': parse_number(row.get('Discount_Percentage')),
+        'originalPrice': parse_number(row.get('Original_Price')) or price,
+        'shippingWeight': row.get('Shipping_Weight') or '',
+        'availability': row.get('Availability') or '',
+        'warranty': row.get('Warranty') or '',
+    }
+
+
+class CatalogEngine:
+    """
+    Column arrays over the product catalog.
+
+    Attributes:
+        path: Source data file
+        rows: Catalog rows in file order, as read from the file
+        codes: Keyword field -> int32 array of value codes, one per row
+        vocab: Keyword field -> {value: code}
+        numeric: Numeric field -> float64 array, one value per row
+        ranks: Sort name -> int32 array of each row's position in that order
+        facets: Facet counts over the rows (None without a Price column)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows: List[Dict[str, Any]] = []
+        self.codes: Dict[str, np.ndarray] = {}
+        self.vocab: Dict[str, Dict[str, int]] = {}
+        self.numeric: Dict[str, np.ndarray] = {}
+        self.ranks: Dict[str, np.ndarray] = {}
+        self.facets: Optional[FacetIndex] = None
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        """(Re)build every column from the source file, keeping the current columns if it has no rows."""
+        mtime = os.stat(self.path).st_mtime
+        rows = read_catalog_rows(self.path)
+        if not rows and self.rows:
+            # Most likely caught mid-rewrite; the finished file gets a new mtime and is loaded then
+            self._mtime = mtime
+            logger.warning("Catalog %s has no products, keeping the %s previously loaded", self.path, len(self.rows))
+            return
+        fields = set().union(*rows) if rows else set()
+
+        codes, vocab = {}, {}
+        for field in KEYWORD_COLUMNS:
+            if field not in fields:
+                continue
+            # np.unique sorts the values, so codes also order the rows by keyword
+            values, inverse = np.unique(np.array([str(row.get(field) or '') for row in rows]),
+                                        return_inverse=True)
+            codes[field] = inverse.astype(np.int32)
+            vocab[field] = {value: code for code, value in enumerate(values.tolist())}
+        numeric = {
+            field: np.array([parse_number(row.get(field)) for row in rows], dtype=np.float64)
+            for field in NUMERIC_COLUMNS if field in fields
+        }
+
+        ranks = {}
+        row_ids = np.arange(len(rows), dtype=np.int32)
+        for name, keys in SORTS.items():
+            # np.lexsort sorts by the last key first; fields the catalog lacks sort as equal
+            sort_keys = [codes['SKU_ID']] if 'SKU_ID' in codes else [row_ids]
+            for field, descending in reversed(keys):
+                if field in numeric:
+                    sort_keys.append(-numeric[field] if descending else numeric[field])
+            rank = np.empty(len(rows), dtype=np.int32)
+            rank[np.lexsort(sort_keys)] = row_ids
+            ranks[name] = rank
+
+        facets = FacetIndex(codes, vocab, numeric['Price']) if 'Price' in numeric else None
+
+        # Swap the new columns in together so readers never see a partial build
+        self.rows, self.codes, self.vocab, self.numeric, self.ranks = rows, codes, vocab, numeric, ranks
+        self.facets = facets
+        self._mtime = mtime
+        logger.info("Loaded %s products into the embedded catalog engine from %s", len(rows), self.path)
+
+    def reload_if_changed(self) -> None:
+        """Rebuild the columns if the source file was modified since the last load."""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    try:
+                        self.load()
+                    except (OSError, ValueError, csv.Error) as e:
+                        self._mtime = mtime
+                        logger.warning("Could not reload catalog %s, keeping the previous products: %s", self.path, e)
+
+    def filter_mask(self, filters: Dict[str, Any]) -> Optional[np.ndarray]:
+        """
+        Evaluate filters as one boolean mask over the catalog
+
+        Args:
+            filters: Filter dict in API or agent naming
+
+        Returns:
+            Boolean array with one entry per row, or None if a filter is unknown
+            or needs a field the catalog does not have
+        """
+        mask = np.ones(len(self.rows), dtype=bool)
+        for name, value in filters.items():
+            if name in IGNORED_FILTERS or name == 'sort':
+                continue
+            if name not in FILTERS:
+                logger.debug("Filter %s is not supported by the catalog engine", name)
+                return None
+            field, operation = FILTERS[name]
+
+            if operation in ('term', 'flag'):
+                # The service skips empty term filters, but maps any flag to Yes/No
+                if not value if operation == 'term' else value is None:
+                    continue
+                if field not in self.codes:
+                    return None
+                if operation == 'flag':
+                    value = 'Yes' if value in (True, 'Yes') else 'No'
+                code = self.vocab[field].get(str(value))
+                if code is None:
+                    return np.zeros(len(self.rows), dtype=bool)
+                mask &= self.codes[field] == code
+            else:
+                if value is None or (operation == 'eq' and not value):
+                    continue
+                if field not in self.numeric:
+                    return None
+                column = self.numeric[field]
+                if operation == 'gte':
+                    mask &= column >= float(value)
+                elif operation == 'lte':
+                    mask &= column <= float(value)
+                else:
+                    mask &= column == float(value)
+        return mask
+
+    def term_filters(self, filters: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Return the filters as catalog field -> value if they are all term filters
+
+        Args:
+            filters: Filter dict in API or agent naming, as accepted by filter_mask
+
+        Returns:
+            Field -> value of the non-empty term filters, or None if another kind of filter is set
+        """
+        terms = {}
+        for name, value in filters.items():
+            if name in IGNORED_FILTERS or name == 'sort':
+                continue
+            field, operation = FILTERS[name]
+            if operation != 'term':
+                return None
+            if value:
+                terms[field] = value
+        return terms
+
+    def top_k(self, mask: np.ndarray, sort: str, start: int, size: int) -> Tuple[np.ndarray, int]:
+        """
+        Select one page of the matching rows in sort order
+
+        Args:
+            mask: Rows that match the filters
+            sort: Name of a precomputed sort order
+            start: Offset of the page
+            size: Page size
+
+        Returns:
+            (row ids of the page in order, number of matching rows)
+        """
+        ids = np.flatnonzero(mask)
+        total = len(ids)
+        end = start + size
+        rank = self.ranks[sort][ids]
+        # Ranks are unique, so the end smallest are exactly the first end rows in order
+        if end < total:
+            selected = np.argpartition(rank, end - 1)[:end]
+            ids, rank = ids[selected], rank[selected]
+        return ids[np.argsort(rank)][start:end], total
+
+    def search(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Answer a product search locally
+
+        Args:
+            params: Product search request body (query, filters, size, page, sort, fallbackStrategy)
+
+        Returns:
+            Product API response body ({'success': True, 'data': {'products', 'total'}}) plus
+            the matches' facet counts in data['facets'] (see FacetIndex.counts), or None if
+            the request needs the HTTP path or no catalog is loaded
+        """
+        self.reload_if_changed()
+        if not self.rows:
+            return None
+
+        query = (params.get('query') or '').strip().lower()
+        if query and query not in MATCH_ALL_QUERIES:
+            return None
+        filters = params.get('filters') or {}
+        sort = params.get('sort') or 'relevance'
+        if sort == 'relevance' and filters.get('sort') in SORTS:
+            sort = filters['sort']
+        if sort not in SORTS:
+            return None
+
+        mask = self.filter_mask(filters)
+        if mask is None:
+            return None
+        if not mask.any() and params.get('fallbackStrategy') and filters:
+            # As the service does: retry with only the price, color, storage and brand filters
+            filters = {name: filters[name] for name in FALLBACK_FILTERS if filters.get(name)}
+            mask = self.filter_mask(filters)
+            if mask is None:
+                return None
+
+        size = int(params.get('size') or 10)
+        page = int(params.get('page') or 1)
+        ids, total = self.top_k(mask, sort, (page - 1) * size, size)
+        products = [product_data(self.rows[i]) for i in ids.tolist()]
+        data = {'products': products, 'total': total}
+        if self.facets is not None:
+            data['facets'] = self.facets.counts(mask, self.term_filters(filters))
+        return {'success': True, 'data': data}
+
+
+_catalog_engine: Optional[CatalogEngine] = None
+_catalog_engine_lock = threading.Lock()
+
+
+def get_catalog_engine() -> Optional[CatalogEngine]:
+    """
+    Get the process-wide catalog engine, loading it on first use
+
+    Returns:
+        CatalogEngine, or None if the catalog file could not be loaded
+    """
+    global _catalog_engine
+
+    if _catalog_engine is None:
+        with _catalog_engine_lock:
+            if _catalog_engine is None:
+                path = os.environ.get('PRODUCT_CATALOG_PATH', DEFAULT_CATALOG_PATH)
+                try:
+                    _catalog_engine = CatalogEngine(path)
+                except (OSError, ValueError) as e:
+                    logger.error("Could not load embedded catalog engine from %s: %s", path, e)
+                    return None
+    return _catalog_engine
@@ -0,0 +1,154 @@
+"""
+Facet counts and price histograms for the embedded catalog engine.
+
+ProductAgent uses them for refinement hints ("312 in Black, 140 under $500")
+and for the price range of all matches rather than of the page it shows.
+FacetIndex is built with the catalog columns (see catalog_engine.py):
+
+- A count cube with one axis per facet field (brand, color, storage and
+  category codes) and one for the price bucket, filled by a single bincount
+  over the rows. Searches whose filters are all terms on facet fields (the
+  filter combinations the agent narrows down by) are answered by slicing the
+  cube and summing over the other axes, without touching the rows.
+- The lowest and highest price of every cell of the facet fields, so the price
+  range of those searches comes from the cube as well.
+- Per-row price bucket codes, so searches with any other filter (price
+  ranges, features, ...) are counted from their match mask with one bincount
+  per facet field.
+
+Price buckets are half-open, [edge, next edge), so the count "under $X" for a
+bucket edge X is exact.
+"""
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger('agents.facet_index')
+
+# (facet name, catalog field), in the order hints are offered
+FACET_FIELDS = (('color', 'Color'), ('storage', 'Storage'), ('brand', 'Brand'), ('category', 'Category'))
+
+# Price histogram bucket edges in dollars
+PRICE_EDGES = (300, 400, 500, 600, 700, 800, 1000, 1200, 1500, 2000)
+
+# Larger cubes (very many brands or colors) are not built; searches use the mask path
+MAX_CUBE_CELLS = 1 << 22
+
+
+class FacetIndex:
+    """
+    Facet counts over the catalog rows.
+
+    Attributes:
+        fields: (facet name, catalog field) of the facet fields the catalog has
+        cube: Row counts by facet codes and price bucket, or None if too large
+    """
+
+    def __init__(self, codes: Dict[str, np.ndarray], vocab: Dict[str, Dict[str, int]], price: np.ndarray):
+        """
+        Args:
+            codes: Keyword field -> value code per row, as built by CatalogEngine
+            vocab: Keyword field -> {value: code}
+            price: Price per row
+        """
+        self.fields: List[Tuple[str, str]] = [(name, field) for name, field in FACET_FIELDS if field in codes]
+        self.codes = [codes[field] for _, field in self.fields]
+        self.vocab = [vocab[field] for _, field in self.fields]
+        # vocab dicts are built in code order
+        self.values = [list(values) for values in self.vocab]
+        self.price = price
+        self.price_bucket = np.searchsorted(PRICE_EDGES, price, side='right').astype(np.int32)
+
+        shape = tuple(len(values) for values in self.values)
+        cells = int(np.prod(shape)) if shape else 1
+        self.cube: Optional[np.ndarray] = None
+        if cells * (len(PRICE_EDGES) + 1) > MAX_CUBE_CELLS:
+            logger.info("Facet cube of %s cells is too large; facets are counted per search", cells)
+            return
+        cell = np.ravel_multi_index(self.codes, shape) if shape else np.zeros(len(price), dtype=np.intp)
+        buckets = len(PRICE_EDGES) + 1
+        self.cube = np.bincount(cell * buckets + self.price_bucket,
+                                minlength=cells * buckets).reshape(shape + (buckets,))
+        min_price = np.full(cells, np.inf)
+        max_price = np.full(cells, -np.inf)
+        np.minimum.at(min_price, cell, price)
+        np.maximum.at(max_price, cell, price)
+        self.min_price = min_price.reshape(shape)
+        self.max_price = max_price.reshape(shape)
+
+    def cube_index(self, terms: Dict[str, Any]) -> Optional[tuple]:
+        """
+        Index of the cube cells matching term filters
+
+        Args:
+            terms: Catalog field -> required value
+
+        Returns:
+            Tuple of code ranges per facet axis, or None if the cube cannot answer
+        """
+        if self.cube is None:
+            return None
+        facet_fields = [field for _, field in self.fields]
+        if any(field not in facet_fields for field in terms):
+            return None
+        index = []
+        for (_, field), vocab in zip(self.fields, self.vocab):
+            if field not in terms:
+                index.append(slice(None))
+                continue
+            code = vocab.get(str(terms[field]))
+            if code is None:
+                return None
+            # A one-code slice keeps the axis, so axis numbers stay the same
+            index.append(slice(code, code + 1))
+        return tuple(index)
+
+    def counts(self, mask: np.ndarray, terms: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Facet counts, price histogram and price range of a search's matches
+
+        Args:
+            mask: Rows that match the search
+            terms: Catalog field -> value if the search's filters are all term filters
+
+        Returns:
+            {'fields': {facet name: {value: count}}, 'price': {'edges', 'under', 'min', 'max'}};
+            values are ordered by count, empty values and zero counts left out, and
+            under[i] counts the matches priced below edges[i]
+        """
+        index = self.cube_index(terms) if terms is not None else None
+        if index is not None:
+            sub = self.cube[index]
+            axes = tuple(range(sub.ndim))
+            field_counts = []
+            for axis, (values, axis_index) in enumerate(zip(self.values, index)):
+                value_counts = np.zeros(len(values), dtype=np.int64)
+                # Put the counts of a sliced axis back at their codes
+                value_counts[axis_index] = sub.sum(axis=axes[:axis] + axes[axis + 1:])
+                field_counts.append(value_counts)
+            price_counts = sub.sum(axis=axes[:-1])
+            low = float(self.min_price[index].min(initial=np.inf))
+            high = float(self.max_price[index].max(initial=-np.inf))
+            price_range = (low, high) if low <= high else (None, None)
+        else:
+            field_counts = [np.bincount(codes[mask], minlength=len(values))
+                            for codes, values in zip(self.codes, self.values)]
+            price_counts = np.bincount(self.price_bucket[mask], minlength=len(PRICE_EDGES) + 1)
+            prices = self.price[mask]
+            price_range = (float(prices.min()), float(prices.max())) if len(prices) else (None, None)
+
+        fields = {}
+        for (name, _), values, value_counts in zip(self.fields, self.values, field_counts):
+            order = np.argsort(-value_counts, kind='stable')
+            fields[name] = {values[code]: int(value_counts[code]) for code in order.tolist()
+                            if value_counts[code] and values[code]}
+        return {
+            'fields': fields,
+            'price': {
+                'edges': list(PRICE_EDGES),
+                'under': np.cumsum(price_counts)[:-1].tolist(),
+                'min': price_range[0],
+                'max': price_range[1],
+            },
+        }
@@ -0,0 +1,111 @@
+"""
+Persistent memo of resolved weather locations for the WeatherAgent.
+
+/api/weather geocodes the city it is given with Nominatim before asking the
+National Weather Service for a forecast, and the place a city string resolves
+to ("Austin, Texas") does not change. The memo maps normalized city strings to
+that resolved location, so different spellings of one place share a forecast
+cache entry. It is kept in a JSON file so every agent process starts out
+knowing the cities resolved before.
+
+Configuration (environment variables):
+- WEATHER_GEOCODE_PATH: JSON file holding the memo (default logs/weather_geocode.json)
+"""
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger('agents.geocode_memo')
+
+DEFAULT_GEOCODE_MEMO_PATH = os.path.join('logs', 'weather_geocode.json')
+
+_NON_WORD_RE = re.compile(r'[^\w\s]+')
+_COUNTRY_SUFFIX_RE = re.compile(r'\s+(?:usa|us|united states(?: of america)?)$')
+
+
+def normalize_city(city: str) -> str:
+    """Normalize a city string for lookup ("Austin,  TX, USA" -> "austin tx")."""
+    normalized = ' '.join(_NON_WORD_RE.sub(' ', city.lower()).split())
+    return _COUNTRY_SUFFIX_RE.sub('', normalized)
+
+
+class GeocodeMemo:
+    """City string -> resolved location, persisted as JSON"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.locations: Dict[str, str] = self._read()
+
+    def _read(self) -> Dict[str, str]:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable geocode memo %s: %s", self.path, e)
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def get(self, city: str) -> Optional[str]:
+        """
+        Look up the location a city string resolved to
+
+        Args:
+            city: City as given by the user
+
+        Returns:
+            Resolved location, or None if the city has not been seen
+        """
+        location = self.locations.get(normalize_city(city))
+        if location is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return location
+
+    def put(self, city: str, location: str) -> None:
+        """
+        Remember the location a city string resolved to
+
+        The file is re-read before writing so entries added by other agent
+        processes are kept, and replaced atomically.
+
+        Args:
+            city: City as given by the user
+            location: Location reported by /api/weather
+        """
+        key = normalize_city(city)
+        if not key or not location or self.locations.get(key) == location:
+            return
+        with self._lock:
+            locations = self._read()
+            locations.update(self.locations)
+            locations[key] = location
+            self.locations = locations
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(locations, f, indent=1, sort_keys=True)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logger.warning("Could not save geocode memo %s: %s", self.path, e)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the number of known cities."""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.locations),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
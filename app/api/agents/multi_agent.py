@@ -0,0 +1,228 @@
+from pydantic_ai import Agent
+from typing import Dict, Any, Optional, List, NamedTuple
+import asyncio
+import importlib.util
+import os
+import re
+import time
+
+from agent_logging import get_logger
+from agent_patterns import lazy_compile
+
+logger = get_logger('multi')
+
+AGENTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Seconds each agent gets before its part of the answer is dropped. They sit just
+# above the agent_http endpoint timeouts so an agent normally reports its own
+# HTTP error first; the deadline bounds everything else (geocoding, retries).
+DEFAULT_AGENT_DEADLINES = {
+    'weather': 12.0,
+    'store-locator': 7.0,
+    'product': 12.0,
+}
+
+# What each agent looks up, for the messages shown when it fails or times out
+_AGENT_LABELS = {
+    'weather': 'weather',
+    'store-locator': 'store search',
+    'product': 'product search',
+}
+
+# Clause boundaries: sentence punctuation, "and"/"also"/"plus" (but not the "and"
+# inside "between $200 and $500")
+_CLAUSE_SPLIT_RE = lazy_compile(r'[;?!]+|\.(?:\s+|$)|,?\s+(?:and\s+also|and|also|plus)\s+(?!\$)', re.IGNORECASE)
+_WEATHER_INTENT_RE = lazy_compile(
+    r'\b(?:weather|forecast|temperature|rain(?:ing|y)?|snow(?:ing|y)?|sunny|cloudy|windy|hot|cold|umbrella)\b',
+    re.IGNORECASE
+)
+_STORE_INTENT_RE = lazy_compile(r'\b(?:stores?|shops?|locations?|outlets?|branch(?:es)?)\b', re.IGNORECASE)
+# Words that point back at a place named in another clause
+_PLACE_REFERENCE_RE = lazy_compile(r'\b(?:there|here|that city|nearby)\b', re.IGNORECASE)
+
+
+class SubQuery(NamedTuple):
+    """One agent call planned for a chat turn"""
+    agent_type: str                          # 'weather', 'store-locator' or 'product'
+    query: str                               # Query passed to the agent's process()
+    parameters: Optional[Dict[str, Any]]     # Parameters passed to the agent's process()
+    position: int                            # Clause index, used to order the merged answer
+
+
+_agent_classes: Dict[str, type] = {}
+
+
+def load_agent_class(agent_type: str) -> type:
+    """
+    Load an agent class the same way the agent route does
+
+    Args:
+        agent_type: Agent type, e.g. 'store-locator' for store-locator_agent.py
+
+    Returns:
+        The <PascalCase>Agent class
+    """
+    if agent_type not in _agent_classes:
+        module_name = f"{agent_type.replace('-', '_')}_agent"
+        spec = importlib.util.spec_from_file_location(module_name, os.path.join(AGENTS_DIR, f"{agent_type}_agent.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        class_name = ''.join(part.capitalize() for part in agent_type.split('-')) + 'Agent'
+        _agent_classes[agent_type] = getattr(module, class_name)
+    return _agent_classes[agent_type]
+
+
+def agent_deadline(agent_type: str) -> float:
+    """
+    Get the deadline for one agent call
+
+    Overridden with MULTI_AGENT_<TYPE>_DEADLINE, e.g. MULTI_AGENT_STORE_LOCATOR_DEADLINE.
+
+    Args:
+        agent_type: Agent type
+
+    Returns:
+        Deadline in seconds
+    """
+    env_name = f"MULTI_AGENT_{agent_type.upper().replace('-', '_')}_DEADLINE"
+    try:
+        return float(os.environ.get(env_name, DEFAULT_AGENT_DEADLINES[agent_type]))
+    except ValueError:
+        return DEFAULT_AGENT_DEADLINES[agent_type]
+
+
+class MultiAgent(Agent):
+    """
+    PydanticAI agent for chat turns that mix weather, store and product questions.
+
+    A turn like "is it raining in Austin and which stores there have the black
+    128GB phone" is split into clauses, each clause is classified with the
+    existing extractors of WeatherAgent, StoreLocatorAgent and ProductAgent,
+    and the resulting agent calls run concurrently. The turn takes as long as
+    the slowest agent instead of the sum of all of them.
+
+    Features:
+    - Intent detection per clause with the agents' own parsers
+    - Places named in one clause resolve "there" in another
+    - Per-agent deadlines (MULTI_AGENT_<TYPE>_DEADLINE)
+    - A failed or timed-out agent only drops its own part of the answer
+    """
+
+    def __init__(self):
+        super().__init__()
+        # Register the process method as a tool
+        self.tools = [self.process]
+        self.agents: Dict[str, Any] = {}
+
+    def get_agent(self, agent_type: str):
+        """Get the agent instance for a type, creating it on first use."""
+        if agent_type not in self.agents:
+            self.agents[agent_type] = load_agent_class(agent_type)()
+        return self.agents[agent_type]
+
+    def split_clauses(self, query: str) -> List[str]:
+        """Split a chat turn into its clauses."""
+        return [clause.strip() for clause in _CLAUSE_SPLIT_RE.split(query) if clause and clause.strip()]
+
+    def plan(self, query: str, parameters: Optional[Dict[str, Any]] = None) -> List[SubQuery]:
+        """
+        Work out which agents a chat turn needs
+
+        Args:
+            query: The user's chat turn
+            parameters: Parameters from the request (baseUrl is passed to the product agent)
+
+        Returns:
+            One SubQuery per agent, in the order the clauses appear. A turn
+            without a recognised intent goes to the product agent as a whole.
+        """
+        clauses = self.split_clauses(query)
+        weather_agent = self.get_agent('weather')
+        store_agent = self.get_agent('store-locator')
+        product_agent = self.get_agent('product')
+        product_parameters = {'baseUrl': parameters['baseUrl']} if parameters and 'baseUrl' in parameters else None
+
+        planned: Dict[str, SubQuery] = {}
+        place = None
+        store_clauses = []
+        for position, clause in enumerate(clauses):
+            if _WEATHER_INTENT_RE.search(clause) and 'weather' not in planned:
+                city = weather_agent.extract_city(clause)
+                if city:
+                    place = place or city
+                    planned['weather'] = SubQuery('weather', clause, {
+                        'city': city,
+                        'timeframe': weather_agent.extract_timeframe(clause)
+                    }, position)
+
+            if _STORE_INTENT_RE.search(clause):
+                store_params = store_agent.extract_search_params(clause)
+                store_clauses.append((position, clause, store_params.filters))
+                if store_params.filters.get('city') and not place:
+                    place = store_params.filters['city']
+
+            # Product intent: a product type ("phone") or product filters ("black 128GB")
+            product_params = product_agent.extract_search_params(clause)
+            if 'product' not in planned and (product_params['filters'] or product_params['query'] != clause.lower()):
+                planned['product'] = SubQuery('product', clause, product_parameters, position)
+
+        if store_clauses:
+            position, clause, filters = store_clauses[0]
+            # "which stores there ..." searches the place named elsewhere in the turn
+            if place and (not filters or _PLACE_REFERENCE_RE.search(clause)):
+                clause = f"stores in {place}"
+            planned['store-locator'] = SubQuery('store-locator', clause, None, position)
+
+        if not planned:
+            return [SubQuery('product', query, product_parameters, 0)]
+        # Clause order, then weather, stores and products within a clause
+        agent_order = list(_AGENT_LABELS)
+        return sorted(planned.values(), key=lambda sub_query: (sub_query.position, agent_order.index(sub_query.agent_type)))
+
+    async def run_sub_query(self, sub_query: SubQuery) -> str:
+        """
+        Run one agent call within its deadline
+
+        Args:
+            sub_query: Planned agent call
+
+        Returns:
+            The agent's formatted response, or a short apology if it failed or
+            missed its deadline
+        """
+        deadline = agent_deadline(sub_query.agent_type)
+        label = _AGENT_LABELS[sub_query.agent_type]
+        start = time.perf_counter()
+        try:
+            agent = self.get_agent(sub_query.agent_type)
+            result = await asyncio.wait_for(agent.process(sub_query.query, sub_query.parameters), deadline)
+            logger.info("%s agent answered in %.2fs", sub_query.agent_type, time.perf_counter() - start)
+            return str(result)
+        except asyncio.TimeoutError:
+            logger.warning("%s agent missed its %.1fs deadline for: %s", sub_query.agent_type, deadline, sub_query.query)
+            return f"Sorry, the {label} took too long to respond, so I left it out of this answer."
+        except Exception as e:
+            logger.error("%s agent failed for '%s': %s", sub_query.agent_type, sub_query.query, str(e), exc_info=True)
+            return f"Sorry, the {label} failed: {str(e)}"
+
+    async def process(self, query: str, parameters: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Answer a chat turn that may span several agents.
+
+        Args:
+            query: The user's chat turn
+            parameters: Optional additional parameters including base URL
+
+        Returns:
+            The agents' formatted responses, separated by blank lines
+        """
+        try:
+            sub_queries = self.plan(query, parameters)
+        except Exception as e:
+            logger.error("Error planning multi-agent query: %s", str(e), exc_info=True)
+            return f"Error processing query: {str(e)}"
+
+        logger.info("Dispatching %s agent calls: %s", len(sub_queries),
+                    ", ".join(f"{sq.agent_type}({sq.query!r})" for sq in sub_queries))
+        responses = await asyncio.gather(*(self.run_sub_query(sub_query) for sub_query in sub_queries))
+        return "\n\n".join(responses)
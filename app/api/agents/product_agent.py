@@ -1,15 +1,108 @@
 from pydantic_ai import Agent
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from pydantic import BaseModel, Field
-import httpx
+from dataclasses import dataclass
 import json
 import os
-import re
-import logging
 import sys
 
-# Configure logging to write to a file
-logging.basicConfig(filename='logs/app.log', level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+from agent_http import endpoint_timeout, get_client
+from agent_logging import get_logger, log_payload
+from agent_patterns import lazy_compile
+from response_cache import AsyncTTLCache
+
+try:
+    import orjson
+except ImportError:  # Optional; responses are decoded with the json module instead
+    orjson = None
+
+logger = get_logger('product')
+
+# Query parsing tables used by ProductAgent.extract_search_params. Each pattern
+# is compiled on first use (see agent_patterns) and reused by every chat turn.
+# Queries are lowercased before matching, so every literal here is lowercase.
+_PRODUCT_TYPE_RE = lazy_compile(
+    r'(phones?|devices?|smartphones?|tablets?|laptops?|computers?|gadgets?|electronics?)'
+)
+
+_BRANDS = (
+    "hyperphone", "techpro", "smartdevice", "nexgen", "pixelwave",
+    "smartcom", "audimax", "visiontech", "vaultphone", "ecotech",
+)
+
+# Color terms in priority order, mapped to the capitalization used by the catalog
+_COLOR_VARIATIONS = (
+    ("black", "Black"),
+    ("white", "White"),
+    ("silver", "Silver"),
+    ("gold", "Gold"),
+    ("blue", "Blue"),
+    ("navy", "Blue"),
+    ("sky blue", "Blue"),
+    ("navy blue", "Blue"),
+    ("royal blue", "Blue"),
+    ("red", "Red"),
+    ("green", "Green"),
+    ("purple", "Purple"),
+    ("pink", "Pink"),
+    ("yellow", "Yellow"),
+    ("orange", "Orange"),
+    ("brown", "Brown"),
+    ("gray", "Gray"),
+    ("grey", "Gray"),
+)
+
+_STORAGE_RE = lazy_compile(r'(\d+)\s*(gb|gigabyte|g)(?:\s+storage)?')
+_RAM_RE = lazy_compile(r'(\d+)\s*(gb|gigabyte|g)\s+ram')
+
+# (required literal, pattern, catalog value); a None value keeps the matched text
+_PROCESSOR_PATTERNS = (
+    ('snapdragon', lazy_compile(r'snapdragon(?:\s+\d*)?'), 'Snapdragon 8 Gen 1'),
+    ('mediatek', lazy_compile(r'mediatek(?:\s+\w*\s+\d*)?'), 'MediaTek Dimensity 9000'),
+    ('bionic', lazy_compile(r'(?:a\d+\s+)?bionic'), 'A15 Bionic'),
+    ('quantum', lazy_compile(r'quantum'), None),
+)
+
+_EXACT_PRICE_RE = lazy_compile(r'exactly (?:at )?\$(\d+)')
+_UNDER_PRICE_RE = lazy_compile(r'under \$(\d+)')
+_OVER_PRICE_RE = lazy_compile(r'over \$(\d+)')
+_RANGE_PRICE_RE = lazy_compile(r'between \$(\d+) and \$(\d+)')
+_AROUND_PRICE_RE = lazy_compile(r'around \$(\d+)')
+_RATING_RE = lazy_compile(r'(top[- ]rated|\d+ stars?|highest[- ]rated)')
+
+# Filter key -> terms that enable the feature
+_FEATURE_TERMS = (
+    ('water_resistant', ('water resistant', 'waterproof', 'water proof')),
+    ('wireless_charging', ('wireless charging',)),
+    ('fast_charging', ('fast charging', 'quick charge')),
+    ('5g', ('5g',)),
+)
+
+# Category terms in priority order; "super luxury" only exists for testing
+_CATEGORY_TERMS = (
+    ('flagship', 'Premium'),
+    ('budget', 'Budget'),
+    ('gaming', 'Gaming'),
+    ('super luxury', 'Super Luxury'),
+)
+
+# Process-wide cache of /api/products responses keyed on the extracted search parameters.
+# Touch CATALOG_CACHE_STAMP (load-data.sh does) to invalidate it after a reindex.
+product_search_cache = AsyncTTLCache(
+    maxsize=int(os.environ.get('PRODUCT_CACHE_SIZE', '256')),
+    ttl=float(os.environ.get('PRODUCT_CACHE_TTL', '300')),
+    stamp_path=os.environ.get('CATALOG_CACHE_STAMP', 'logs/catalog.stamp')
+)
+
+def invalidate_product_cache() -> None:
+    """Drop all cached product searches, e.g. after the catalog has been reindexed."""
+    product_search_cache.invalidate()
+
+def _is_cacheable_product_response(response: Tuple[int, Any]) -> bool:
+    """Only successful responses containing a product list are cached."""
+    status_code, data = response
+    return (status_code == 200 and isinstance(data, dict) and not data.get('error')
+            and isinstance(data.get('data'), dict) and 'products' in data['data'])
 
 class ProductQueryInput(BaseModel):
     """Model for product query input."""
@@ -49,6 +142,173 @@ class Product(BaseModel):
     fastCharging: Optional[bool] = None
     fiveGCompatible: Optional[bool] = None
 
+# Product fields in ProductRecord order, with the /api/products field name of each
+_PRODUCT_FIELDS = (
+    ('title', 'Title'),
+    ('brand', 'Brand'),
+    ('model', 'Model'),
+    ('price', 'Price'),
+    ('originalPrice', 'Original_Price'),
+    ('discountPercentage', 'Discount_Percentage'),
+    ('rating', 'Rating'),
+    ('reviewCount', 'Review_Count'),
+    ('storage', 'Storage'),
+    ('color', 'Color'),
+    ('ram', 'RAM'),
+    ('processor', 'Processor'),
+    ('screenSize', 'Screen_Size'),
+    ('stock', 'Stock'),
+    ('waterResistant', 'Water_Resistant'),
+    ('wirelessCharging', 'Wireless_Charging'),
+    ('fastCharging', 'Fast_Charging'),
+    ('fiveGCompatible', '5G_Compatible'),
+)
+# (API name, fallback key) for each field. All-lowercase fields may also arrive under
+# their own name (documents indexed with lowercase keys); the API name wins.
+_PRODUCT_FIELD_SOURCES = tuple(
+    (api_field, field if field.islower() else None) for field, api_field in _PRODUCT_FIELDS
+)
+# Fields the formatter compares and prints as floats, converted once per product
+_FLOAT_FIELD_INDEXES = tuple(
+    i for i, (field, _) in enumerate(_PRODUCT_FIELDS)
+    if field in ('price', 'originalPrice', 'discountPercentage', 'rating')
+)
+
+# Feature flag values that count as "has the feature"
+_FEATURE_ENABLED = (True, 'Yes')
+
+@dataclass(slots=True)
+class ProductRecord:
+    """Product hit decoded once from the API response, with the fields the formatter uses."""
+    title: Optional[str] = None
+    brand: Optional[str] = None
+    model: Optional[str] = None
+    price: Optional[float] = None
+    originalPrice: Optional[float] = None
+    discountPercentage: Optional[float] = None
+    rating: Optional[float] = None
+    reviewCount: Any = None
+    storage: Optional[str] = None
+    color: Optional[str] = None
+    ram: Optional[str] = None
+    processor: Optional[str] = None
+    screenSize: Any = None
+    stock: Any = None
+    waterResistant: Any = None
+    wirelessCharging: Any = None
+    fastCharging: Any = None
+    fiveGCompatible: Any = None
+
+def product_record(source: Dict[str, Any]) -> ProductRecord:
+    """
+    Build a ProductRecord from a product in an /api/products response
+    
+    Args:
+        source: Product as returned by the API (Title, Price, ... or lowercase keys)
+        
+    Returns:
+        ProductRecord with prices and rating converted to float
+    """
+    values = [source[key] if key in source else source.get(fallback) for key, fallback in _PRODUCT_FIELD_SOURCES]
+    for index in _FLOAT_FIELD_INDEXES:
+        if values[index] is not None:
+            values[index] = float(values[index])
+    return ProductRecord(*values)
+
+def render_product(product: ProductRecord) -> str:
+    """Render one product as the title/price, rating, specs and features lines."""
+    # Line 1: Product title with brand & model, emoji and money bag before price
+    if product.brand and product.model:
+        title = f"{product.brand} {product.model}"
+    elif product.brand or product.model:
+        title = product.brand or product.model
+    else:
+        title = product.title if product.title is not None else 'Unknown Product'
+    
+    # Add original price and discount if available
+    price = product.price or 0.0
+    price_text = f"${price:.2f}"
+    if (product.discountPercentage and product.discountPercentage > 0
+            and product.originalPrice and product.originalPrice > price):
+        price_text += f" 🏷️ {int(product.discountPercentage)}% off (was ${product.originalPrice:.2f})"
+    lines = [f"\n📱 {title} 💸 {price_text}"]
+    
+    # Line 2: Rating and review count
+    if product.rating:
+        rating_line = f"{'⭐' * int(product.rating)} {product.rating}/5"
+        if product.reviewCount and int(product.reviewCount) > 0:
+            rating_line += f" ({product.reviewCount} reviews)"
+        lines.append(rating_line)
+    
+    # Line 3: All specs on one line with separators
+    specs = []
+    if product.storage:
+        specs.append(f"Storage: {product.storage} 💾")
+    if product.color:
+        specs.append(f"Color: {product.color} 🎨")
+    if product.ram:
+        specs.append(f"RAM: {product.ram} 🧠")
+    if product.processor:
+        specs.append(f"Processor: {product.processor} 🔄")
+    if product.screenSize:
+        specs.append(f"Screen: {product.screenSize}\" 📱")
+    if product.stock is not None:
+        specs.append(f"Stock: {product.stock} 📦" if int(product.stock) > 0 else "Out of Stock ❌")
+    lines.append(" • ".join(specs))
+    
+    # Line 4: Features with icons
+    features = []
+    if product.waterResistant in _FEATURE_ENABLED:
+        features.append("Water Resistant 💧")
+    if product.wirelessCharging in _FEATURE_ENABLED:
+        features.append("Wireless Charging 🔄")
+    if product.fastCharging in _FEATURE_ENABLED:
+        features.append("Fast Charging ⚡")
+    if product.fiveGCompatible in _FEATURE_ENABLED:
+        features.append("5G Compatible 📶")
+    if features:
+        lines.append(" • ".join(features))
+    
+    return "\n".join(lines)
+
+# Facet name -> hint text for its most common value, in the order hints are offered
+_FACET_HINTS = (
+    ('color', "in {}"),
+    ('storage', "with {}"),
+    ('brand', "from {}"),
+    ('category', "in the {} category"),
+)
+
+def refinement_hints(facets: Dict[str, Any], total: int, filters: Dict[str, Any]) -> List[str]:
+    """
+    Suggest ways to narrow down a search from the facet counts of its matches
+    
+    Args:
+        facets: Facet counts from the catalog engine (see facet_index.FacetIndex.counts)
+        total: Number of matches
+        filters: Filters of the search; facets that are already filtered on are skipped
+        
+    Returns:
+        Hints such as "312 in Black" and "140 under $500"
+    """
+    hints = []
+    for name, template in _FACET_HINTS:
+        value_counts = facets['fields'].get(name)
+        # Only offer a facet that splits the matches
+        if filters.get(name) or not value_counts or len(value_counts) < 2:
+            continue
+        value, count = next(iter(value_counts.items()))
+        hints.append(f"{count} {template.format(value)}")
+    
+    # The price bucket edge that comes closest to halving the matches
+    price = facets['price']
+    splits = [(abs(count - total / 2), count, edge)
+              for edge, count in zip(price['edges'], price['under']) if 0 < count < total]
+    if splits:
+        _, count, edge = min(splits)
+        hints.insert(1, f"{count} under ${edge}")
+    return hints
+
 class ProductAgent(Agent):
     """
     PydanticAI agent for handling product search queries using the OpenSearch catalog.
@@ -76,6 +336,13 @@ class ProductAgent(Agent):
         # Register the process method as a tool
         self.tools = [self.process]
         
+        # Optional in-process catalog engine (PRODUCT_CATALOG_EMBEDDED=true); the HTTP API is the
+        # fallback. catalog_engine imports NumPy, so it is only imported when enabled.
+        self.catalog_engine = None
+        if os.environ.get('PRODUCT_CATALOG_EMBEDDED', 'false').lower() == 'true':
+            from catalog_engine import get_catalog_engine
+            self.catalog_engine = get_catalog_engine()
+        
         # Common price patterns
         self.price_patterns = [
             r'under\s+\$?(\d+)',
@@ -165,6 +432,13 @@ class ProductAgent(Agent):
         """
         Extract search parameters from a natural language query
         
+        All patterns and vocabularies come from the module-level tables. The
+        patterns are created with agent_patterns.lazy_compile(), so each one
+        compiles on first use (or up front in agent_patterns.compile_all(), as
+        the agent server and pool do). Each regex is guarded by a cheap
+        substring test for a literal it requires, so most queries only run a
+        handful of searches.
+        
         Args:
             query: User query string
             
@@ -172,228 +446,170 @@ class ProductAgent(Agent):
             Dictionary containing extracted search parameters
         """
         query = query.lower()
+        filters = {}
         
         # Initialize search parameters
         search_params = {
             'query': '',
             'size': 5,
             'page': 1,
-            'filters': {}
+            'filters': filters
         }
         
         # Extract product type terms first - this is important to capture 
         # words like "phones", "devices", etc. for the query parameter
-        product_type_patterns = [
-            r'(phones?|devices?|smartphones?|tablets?|laptops?|computers?|gadgets?|electronics?)',
-        ]
-        
-        # Try to find product type in the query
         product_type = None
-        for pattern in product_type_patterns:
-            match = re.search(pattern, query)
-            if match:
-                product_type = match.group(1)
-                logging.debug(f"Detected product type: {product_type}")
-                break
+        match = _PRODUCT_TYPE_RE.search(query)
+        if match:
+            product_type = match.group(1)
+            logger.debug("Detected product type: %s", product_type)
                 
         # Extract brand
-        brands = ["hyperphone", "techpro", "smartdevice", "nexgen", "pixelwave", 
-                 "smartcom", "audimax", "visiontech", "vaultphone", "ecotech"]
-        for brand in brands:
+        for brand in _BRANDS:
             if brand in query:
-                search_params['filters']['brand'] = brand
-                logging.debug(f"Detected brand: {brand}")
+                filters['brand'] = brand
+                logger.debug("Detected brand: %s", brand)
                 break
                 
         # Extract colors with proper capitalization to match database format
-        color_variations = {
-            "black": "Black",
-            "white": "White", 
-            "silver": "Silver",
-            "gold": "Gold",
-            "blue": "Blue",
-            "navy": "Blue",    # Map navy to Blue
-            "sky blue": "Blue", # Map sky blue to Blue
-            "navy blue": "Blue", # Map navy blue to Blue
-            "royal blue": "Blue", # Map royal blue to Blue
-            "red": "Red",
-            "green": "Green",
-            "purple": "Purple",
-            "pink": "Pink",
-            "yellow": "Yellow",
-            "orange": "Orange",
-            "brown": "Brown",
-            "gray": "Gray",
-            "grey": "Gray"    # Map grey to Gray
-        }
-        
-        # Check for colors in query
-        for color_term, db_color in color_variations.items():
-            if color_term in query.lower():
-                search_params['filters']['color'] = db_color
-                logging.debug(f"Detected color: {color_term} (mapped to {db_color})")
+        for color_term, db_color in _COLOR_VARIATIONS:
+            if color_term in query:
+                filters['color'] = db_color
+                logger.debug("Detected color: %s (mapped to %s)", color_term, db_color)
                 break
                 
-        # Extract storage
-        storage_pattern = r'(\d+)\s*(gb|gigabyte|g)(?:\s+storage)?'
-        storage_match = re.search(storage_pattern, query)
+        # Extract storage (every storage pattern needs a "g" unit)
+        storage_match = _STORAGE_RE.search(query) if 'g' in query else None
         if storage_match:
             storage = f"{storage_match.group(1)}GB"
-            search_params['filters']['storage'] = storage
-            logging.debug(f"Detected storage: {storage}")
+            filters['storage'] = storage
+            logger.debug("Detected storage: %s", storage)
             
         # Extract RAM
-        ram_pattern = r'(\d+)\s*(gb|gigabyte|g)\s+ram'
-        ram_match = re.search(ram_pattern, query)
+        ram_match = _RAM_RE.search(query) if 'ram' in query else None
         if ram_match:
             ram = f"{ram_match.group(1)}GB"
-            search_params['filters']['ram'] = ram
-            logging.debug(f"Detected RAM: {ram}")
-            
-        # Extract processor
-        processor_patterns = {
-            'snapdragon': r'snapdragon(?:\s+\d*)?',
-            'mediatek': r'mediatek(?:\s+\w*\s+\d*)?',
-            'bionic': r'(?:a\d+\s+)?bionic',
-            'quantum': r'quantum'
-        }
-        
-        for processor_type, pattern in processor_patterns.items():
-            processor_match = re.search(pattern, query)
+            filters['ram'] = ram
+            logger.debug("Detected RAM: %s", ram)
+            
+        # Extract processor, trying processor families in priority order
+        for keyword, pattern, db_processor in _PROCESSOR_PATTERNS:
+            if keyword not in query:
+                continue
+            processor_match = pattern.search(query)
             if processor_match:
-                # Get the exact match from the query
-                processor_value = processor_match.group(0)
-                
-                # Map to proper values in the database
-                if 'snapdragon' in processor_value:
-                    search_params['filters']['processor'] = 'Snapdragon 8 Gen 1'
-                elif 'mediatek' in processor_value:
-                    search_params['filters']['processor'] = 'MediaTek Dimensity 9000'
-                elif 'bionic' in processor_value:
-                    search_params['filters']['processor'] = 'A15 Bionic'
-                else:  # For "quantum" - this is an invalid processor, used for testing
-                    search_params['filters']['processor'] = processor_value
-                    
-                logging.debug(f"Detected processor: {search_params['filters']['processor']}")
+                # "quantum" is an invalid processor kept verbatim for testing
+                filters['processor'] = db_processor or processor_match.group(0)
+                logger.debug("Detected processor: %s", filters['processor'])
                 break
                 
         # Extract price filters
         # 1. Exact price - "phones priced exactly at $500"
-        exact_price_pattern = r'exactly (?:at )?\$(\d+)'
-        exact_price_match = re.search(exact_price_pattern, query)
-        if exact_price_match:
-            exact_price = int(exact_price_match.group(1))
-            search_params['filters']['price'] = exact_price
-            search_params['filters']['max_price'] = exact_price
-            logging.debug(f"Detected exact price: ${exact_price}")
+        if 'exactly' in query:
+            exact_price_match = _EXACT_PRICE_RE.search(query)
+            if exact_price_match:
+                exact_price = int(exact_price_match.group(1))
+                filters['price'] = exact_price
+                filters['max_price'] = exact_price
+                logger.debug("Detected exact price: $%s", exact_price)
             
         # 2. Under price - "phones under $500"
-        under_price_pattern = r'under \$(\d+)'
-        under_price_match = re.search(under_price_pattern, query)
-        if under_price_match:
-            max_price = int(under_price_match.group(1))
-            search_params['filters']['max_price'] = max_price
-            logging.debug(f"Detected max price: ${max_price}")
+        if 'under $' in query:
+            under_price_match = _UNDER_PRICE_RE.search(query)
+            if under_price_match:
+                max_price = int(under_price_match.group(1))
+                filters['max_price'] = max_price
+                logger.debug("Detected max price: $%s", max_price)
             
         # 3. Over price - "phones over $1000"
-        over_price_pattern = r'over \$(\d+)'
-        over_price_match = re.search(over_price_pattern, query)
-        if over_price_match:
-            min_price = int(over_price_match.group(1))
-            search_params['filters']['min_price'] = min_price
-            logging.debug(f"Detected min price: ${min_price}")
+        if 'over $' in query:
+            over_price_match = _OVER_PRICE_RE.search(query)
+            if over_price_match:
+                min_price = int(over_price_match.group(1))
+                filters['min_price'] = min_price
+                logger.debug("Detected min price: $%s", min_price)
             
         # 4. Price range - "phones between $800 and $1200"
-        range_price_pattern = r'between \$(\d+) and \$(\d+)'
-        range_price_match = re.search(range_price_pattern, query)
-        if range_price_match:
-            min_price = int(range_price_match.group(1))
-            max_price = int(range_price_match.group(2))
-            search_params['filters']['min_price'] = min_price
-            search_params['filters']['max_price'] = max_price
-            logging.debug(f"Detected price range: ${min_price} - ${max_price}")
+        if 'between $' in query:
+            range_price_match = _RANGE_PRICE_RE.search(query)
+            if range_price_match:
+                min_price = int(range_price_match.group(1))
+                max_price = int(range_price_match.group(2))
+                filters['min_price'] = min_price
+                filters['max_price'] = max_price
+                logger.debug("Detected price range: $%s - $%s", min_price, max_price)
             
         # 5. Around price - "phones around $750"
-        around_price_pattern = r'around \$(\d+)'
-        around_price_match = re.search(around_price_pattern, query)
-        if around_price_match:
-            target_price = int(around_price_match.group(1))
-            price_buffer = int(target_price * 0.2)  # 20% buffer
-            search_params['filters']['min_price'] = target_price - price_buffer
-            search_params['filters']['max_price'] = target_price + price_buffer
-            logging.debug(f"Detected price around: ${target_price} (range: ${target_price - price_buffer} - ${target_price + price_buffer})")
+        if 'around $' in query:
+            around_price_match = _AROUND_PRICE_RE.search(query)
+            if around_price_match:
+                target_price = int(around_price_match.group(1))
+                price_buffer = int(target_price * 0.2)  # 20% buffer
+                filters['min_price'] = target_price - price_buffer
+                filters['max_price'] = target_price + price_buffer
+                logger.debug("Detected price around: $%s (range: $%s - $%s)", target_price, target_price - price_buffer, target_price + price_buffer)
             
         # Extract screen size indicators
         if 'large screen' in query:
-            search_params['filters']['min_screen_size'] = 6.5
-            logging.debug("Detected large screen preference")
+            filters['min_screen_size'] = 6.5
+            logger.debug("Detected large screen preference")
             
         # Extract rating filter
-        rating_pattern = r'(top[- ]rated|\d+ stars?|highest[- ]rated)'
-        if re.search(rating_pattern, query):
-            search_params['filters']['min_rating'] = 4.5
-            logging.debug("Detected high rating requirement")
+        if ('rated' in query or 'star' in query) and _RATING_RE.search(query):
+            filters['min_rating'] = 4.5
+            logger.debug("Detected high rating requirement")
             
         # Extract feature filters
-        features = {
-            'water-resistant': ['water resistant', 'waterproof', 'water proof'],
-            'wireless-charging': ['wireless charging'],
-            'fast-charging': ['fast charging', 'quick charge'],
-            '5g': ['5g']
-        }
-        
-        for feature_key, feature_terms in features.items():
+        for feature_key, feature_terms in _FEATURE_TERMS:
             for term in feature_terms:
                 if term in query:
-                    feature_key_clean = feature_key.replace('-', '_')
-                    search_params['filters'][feature_key_clean] = 'Yes'
-                    logging.debug(f"Detected feature: {feature_key}")
+                    filters[feature_key] = 'Yes'
+                    logger.debug("Detected feature: %s", feature_key)
                     break
                     
         # Extract category
-        if 'flagship' in query:
-            search_params['filters']['category'] = 'Premium'
-            logging.debug("Detected category: Premium (flagship)")
-        elif 'budget' in query:
-            search_params['filters']['category'] = 'Budget'
-            logging.debug("Detected category: Budget")
-        elif 'gaming' in query:
-            search_params['filters']['category'] = 'Gaming'
-            logging.debug("Detected category: Gaming")
-        elif 'super luxury' in query.lower():  # Catch test case
-            search_params['filters']['category'] = 'Super Luxury'
-            logging.debug("Detected non-existent category: Super Luxury")
+        for category_term, db_category in _CATEGORY_TERMS:
+            if category_term in query:
+                filters['category'] = db_category
+                logger.debug("Detected category: %s (%s)", db_category, category_term)
+                break
             
         # Keep original query for search if no specific filters found or explicitly searching for latest
         if ('latest' in query or 'newest' in query) and not storage_match:
             search_params['query'] = 'latest'
-            search_params['filters']['sort'] = 'release_date:desc'
-            logging.debug("Searching for latest phones")
+            filters['sort'] = 'release_date:desc'
+            logger.debug("Searching for latest phones")
             
         # General query, only set if no specific filters detected
-        if not search_params['filters'] and not search_params['query']:
+        if not filters and not search_params['query']:
             search_params['query'] = query
-            logging.debug(f"Using original query: {query}")
+            logger.debug("Using original query: %s", query)
             
         # Set product type as the query parameter if found and query is still empty
         if not search_params['query'] and product_type:
             search_params['query'] = product_type
-            logging.debug(f"Using product type as query: {product_type}")
+            logger.debug("Using product type as query: %s", product_type)
             
         # Fallback to a default search term if query is still empty
-        if not search_params['query'] and search_params['filters']:
+        if not search_params['query'] and filters:
             # We have filters but no query term, use "phone" as a default
             search_params['query'] = "phone"
-            logging.debug("Using default 'phone' as query since we have filters but no query term")
+            logger.debug("Using default 'phone' as query since we have filters but no query term")
             
         # Extract the search parameters for logging
-        logging.debug(f"Extracted search parameters: {search_params}")
+        logger.debug("Extracted search parameters: %s", search_params)
             
         return search_params
 
-    def format_product_results(self, products: list, total: int, params: Dict[str, Any]) -> str:
-        """Format product results into a natural language response."""
-        logging.debug(f'Products found: {products}')
+    def format_product_results(self, products: List[ProductRecord], total: int, params: Dict[str, Any],
+                               facets: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Format product results into a natural language response.
+        
+        With facets (answers from the catalog engine), the header gives the price range
+        of all matches and the response ends with refinement hints.
+        """
+        log_payload(logger, "Products found", products)
         if not products:
             constraints = []
             filters = params.get('filters', {})
@@ -444,115 +660,54 @@ class ProductAgent(Agent):
         
         # Add price range info if filtering by price
         if params.get('filters', {}).get('maxPrice') or params.get('filters', {}).get('minPrice'):
-            prices = [float(p.get('price', 0)) for p in products]  # Ensure prices are floats
+            prices = [p.price or 0.0 for p in products]
             min_price = min(prices)
             max_price = max(prices)
             if params['filters'].get('maxPrice'):
                 header += f" under ${params['filters']['maxPrice']}"
             elif params['filters'].get('minPrice'):
                 header += f" over ${params['filters']['minPrice']}"
-            if len(products) > 1:
+            if len(products) > 1 and not facets:
                 header += f" (price range: ${min_price:.2f} - ${max_price:.2f})"
+        if facets and total > 1 and facets['price']['min'] is not None:
+            header += f" (price range: ${facets['price']['min']:.2f} - ${facets['price']['max']:.2f})"
         
         # Add brand info if filtering by brand
         if params.get('filters', {}).get('brand'):
             header += f" from {params['filters']['brand']}"
         
         header += ":"
-        response = [header]
         
-        for i, product in enumerate(products):
-            # Line 1: Product title with brand & model, emoji and money bag before price
-            title_parts = []
-            if product.get('brand'):
-                title_parts.append(product['brand'])
-            if product.get('model'):
-                title_parts.append(product['model'])
-            
-            # If no brand/model available, use original title
-            product_title = " ".join(title_parts) if title_parts else product.get('title', 'Unknown Product')
-            
-            # Add original price and discount if available
-            price_text = f"${float(product.get('price', 0)):.2f}"
-            if product.get('discountPercentage') and float(product.get('discountPercentage', 0)) > 0:
-                orig_price = product.get('originalPrice', 0)
-                if orig_price and float(orig_price) > float(product.get('price', 0)):
-                    price_text = f"${float(product.get('price', 0)):.2f} 🏷️ {int(float(product.get('discountPercentage', 0)))}% off (was ${float(orig_price):.2f})"
-            
-            model_line = f"\n📱 {product_title} 💸 {price_text}"
-            
-            # Line 2: Rating and review count
-            rating_line = ""
-            if product.get('rating'):
-                stars = "⭐" * int(float(product.get('rating', 0)))
-                rating_line = f"{stars} {float(product.get('rating', 0))}/5"
-                
-                if product.get('reviewCount') and int(product.get('reviewCount', 0)) > 0:
-                    rating_line += f" ({product['reviewCount']} reviews)"
-            
-            # Line 3: All specs on one line with separators
-            specs_parts = []
-            
-            # Add storage information
-            if product.get('storage'):
-                specs_parts.append(f"Storage: {product['storage']} 💾")
-            
-            # Add color information
-            if product.get('color'):
-                specs_parts.append(f"Color: {product['color']} 🎨")
-            
-            # Add RAM if available
-            if product.get('ram'):
-                specs_parts.append(f"RAM: {product['ram']} 🧠")
-            
-            # Add processor if available
-            if product.get('processor'):
-                specs_parts.append(f"Processor: {product['processor']} 🔄")
-            
-            # Add screen size if available
-            if product.get('screenSize'):
-                specs_parts.append(f"Screen: {product['screenSize']}\" 📱")
-            
-            # Add stock information
-            if product.get('stock') is not None:
-                if int(product.get('stock', 0)) > 0:
-                    specs_parts.append(f"Stock: {product['stock']} 📦")
-                else:
-                    specs_parts.append("Out of Stock ❌")
-            
-            # Join all specs with bullet point separators
-            specs_line = " • ".join(specs_parts)
-            
-            # Line 4: Features with icons
-            features = []
-            
-            if product.get('waterResistant') == True or product.get('waterResistant') == 'Yes':
-                features.append("Water Resistant 💧")
-                
-            if product.get('wirelessCharging') == True or product.get('wirelessCharging') == 'Yes':
-                features.append("Wireless Charging 🔄")
-                
-            if product.get('fastCharging') == True or product.get('fastCharging') == 'Yes':
-                features.append("Fast Charging ⚡")
-                
-            if product.get('fiveGCompatible') == True or product.get('fiveGCompatible') == 'Yes':
-                features.append("5G Compatible 📶")
-            
-            features_line = " • ".join(features) if features else ""
-            
-            # Add all lines to response
-            response.append(model_line)
-            if rating_line:
-                response.append(rating_line)
-            response.append(specs_line)
-            if features_line:
-                response.append(features_line)
-            
-            # Add an empty line between products
-            if i < len(products) - 1:
-                response.append("")
+        # Products are separated by an empty line
+        response = header + "\n" + "\n\n".join(render_product(product) for product in products)
+        if facets and total > len(products):
+            hints = refinement_hints(facets, total, params.get('filters', {}))
+            if hints:
+                response += "\n\n🔎 Narrow it down: " + " • ".join(hints)
+        return response
+
+    async def search_products(self, base_url: str, search_params: Dict[str, Any]) -> Tuple[int, Any]:
+        """
+        Call the products API with the given search parameters
         
-        return "\n".join(response)
+        Args:
+            base_url: Base URL of the Next.js application
+            search_params: Search parameters from extract_search_params
+            
+        Returns:
+            Tuple of (status code, parsed JSON body on 200 or response text otherwise)
+        """
+        # Make request to products API over the shared, pooled client
+        client = get_client()
+        response = await client.post(
+            f"{base_url}/api/products",
+            json=search_params,
+            headers={'Content-Type': 'application/json'},
+            timeout=endpoint_timeout('products')
+        )
+        if response.status_code == 200:
+            return response.status_code, orjson.loads(response.content) if orjson else response.json()
+        return response.status_code, response.text
 
     async def process(self, query_input, parameters: Optional[Dict[str, Any]] = None) -> ProductQueryOutput:
         """
@@ -571,87 +726,54 @@ class ProductAgent(Agent):
             
             # Extract search parameters
             search_params = self.extract_search_params(query)
-            logging.debug(f'Extracted search parameters: {search_params}')
+            logger.debug("Extracted search parameters: %s", search_params)
             
             # Get base URL from parameters or use default
             base_url = 'http://localhost:3000'
             if parameters and 'baseUrl' in parameters:
                 base_url = parameters['baseUrl']
             
-            # Make request to products API
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{base_url}/api/products",
-                    json=search_params,
-                    headers={'Content-Type': 'application/json'},
-                    timeout=10.0
+            # Answer from the embedded catalog engine when possible
+            data = self.catalog_engine.search(search_params) if self.catalog_engine is not None else None
+            if data is not None:
+                status_code = 200
+                logger.debug("Answered product search from the catalog engine: %s products", data['data']['total'])
+            else:
+                # Search the catalog, reusing the cached response for identical parameters
+                status_code, data = await product_search_cache.get_or_fetch(
+                    product_search_cache.make_key([base_url, search_params]),
+                    lambda: self.search_products(base_url, search_params),
+                    cacheable=_is_cacheable_product_response
                 )
+            
+            if status_code == 200:
+                log_payload(logger, "API response data structure", data)
+                
+                if data.get('error'):
+                    result = f"Error searching products: {data['error']}"
+                    logger.error(result)
+                    return ProductQueryOutput(response=result) if isinstance(query_input, ProductQueryInput) else result
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    logging.debug(f'API response data structure: {json.dumps(data, indent=2)}')
+                if 'data' in data and 'products' in data['data']:
+                    # Decode the hits into records; field names are resolved in _PRODUCT_FIELD_SOURCES
+                    products = [product_record(product) for product in data['data']['products']]
+                    total = data['data']['total']
                     
-                    if data.get('error'):
-                        result = f"Error searching products: {data['error']}"
-                        logging.error(result)
-                        return ProductQueryOutput(response=result) if isinstance(query_input, ProductQueryInput) else result
+                    logger.debug("Found %s products out of %s total", len(products), total)
                     
-                    if 'data' in data and 'products' in data['data']:
-                        products = data['data']['products']
-                        total = data['data']['total']
-                        
-                        logging.debug(f'Found {len(products)} products out of {total} total')
-                        
-                        # Normalize product data to ensure consistent field names
-                        normalized_products = []
-                        for product in products:
-                            normalized = {}
-                            # Map API field names to our expected field names
-                            field_mappings = {
-                                'Title': 'title',
-                                'Brand': 'brand',
-                                'Model': 'model',
-                                'Price': 'price',
-                                'Original_Price': 'originalPrice',
-                                'Discount_Percentage': 'discountPercentage',
-                                'Rating': 'rating',
-                                'Review_Count': 'reviewCount',
-                                'Storage': 'storage',
-                                'Color': 'color',
-                                'RAM': 'ram',
-                                'Processor': 'processor',
-                                'Screen_Size': 'screenSize',
-                                'Stock': 'stock',
-                                'Water_Resistant': 'waterResistant',
-                                'Wireless_Charging': 'wirelessCharging',
-                                'Fast_Charging': 'fastCharging',
-                                '5G_Compatible': 'fiveGCompatible'
-                            }
-                            
-                            # Map fields and handle potential missing fields
-                            for api_field, our_field in field_mappings.items():
-                                if api_field in product:
-                                    normalized[our_field] = product[api_field]
-                                    
-                            # Also copy fields that might already use our expected naming
-                            for field in product:
-                                if field.lower() == field and field not in normalized:
-                                    normalized[field] = product[field]
-                                    
-                            normalized_products.append(normalized)
-                        
-                        formatted_response = self.format_product_results(normalized_products, total, search_params)
-                        return ProductQueryOutput(response=formatted_response) if isinstance(query_input, ProductQueryInput) else formatted_response
-                    else:
-                        logging.error(f"Unexpected API response structure: {data}")
-                        result = "Couldn't find any products matching your search."
-                        return ProductQueryOutput(response=result) if isinstance(query_input, ProductQueryInput) else result
+                    formatted_response = self.format_product_results(products, total, search_params,
+                                                                     data['data'].get('facets'))
+                    return ProductQueryOutput(response=formatted_response) if isinstance(query_input, ProductQueryInput) else formatted_response
                 else:
-                    error_message = f"Error searching products: {response.status_code} {response.text}"
-                    logging.error(error_message)
-                    return ProductQueryOutput(response=error_message) if isinstance(query_input, ProductQueryInput) else error_message
-                    
+                    logger.error("Unexpected API response structure: %s", data)
+                    result = "Couldn't find any products matching your search."
+                    return ProductQueryOutput(response=result) if isinstance(query_input, ProductQueryInput) else result
+            else:
+                error_message = f"Error searching products: {status_code} {data}"
+                logger.error(error_message)
+                return ProductQueryOutput(response=error_message) if isinstance(query_input, ProductQueryInput) else error_message
+                
         except Exception as e:
             error_message = f"Error processing product query: {str(e)}"
-            logging.error(error_message, exc_info=True)
+            logger.error(error_message, exc_info=True)
             return ProductQueryOutput(response=error_message) if isinstance(query_input, ProductQueryInput) else error_message
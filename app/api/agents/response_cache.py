@@ -0,0 +1,256 @@
+"""
+In-process async response cache for the PydanticAI agents.
+
+Used by ProductAgent to avoid repeating identical catalog searches and by
+WeatherAgent to reuse forecasts. Entries are keyed on the canonicalized request
+parameters and bounded both by age (TTL) and by count (LRU eviction).
+Concurrent lookups for the same key share a single upstream call instead of
+each issuing their own.
+
+Stale-while-revalidate: with stale_ttl > 0 an expired entry is still served for
+stale_ttl seconds while a background task refreshes it, so a popular key never
+waits on the upstream call.
+
+Invalidation:
+- In process: call AsyncTTLCache.invalidate()
+- Across processes: touch the cache's stamp file (for example after a catalog
+  reindex); entries cached before the stamp's modification time are discarded
+  on the next lookup.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger('agents.response_cache')
+
+
+class AsyncTTLCache:
+    """
+    TTL + LRU cache with request coalescing for async fetch functions.
+    
+    Attributes:
+        maxsize: Maximum number of cached entries before LRU eviction
+        ttl: Seconds an entry stays fresh (get_or_fetch() can override it per key)
+        stamp_path: Optional file whose modification invalidates the cache
+        stale_ttl: Seconds an expired entry is still served while it is refreshed
+    """
+    
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0, stamp_path: Optional[str] = None,
+                 stale_ttl: float = 0.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stamp_path = stamp_path
+        self.stale_ttl = stale_ttl
+        # key -> (fresh until, served stale until, value)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # Fetch tasks, referenced until done so they are not garbage collected
+        self._tasks: set = set()
+        # Bumped by invalidate() so fetches started before it do not store their result
+        self._generation = 0
+        self._stamp_mtime = self._read_stamp()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    @staticmethod
+    def make_key(params: Any) -> str:
+        """Build a canonical cache key (key order and whitespace independent)."""
+        return json.dumps(params, sort_keys=True, separators=(',', ':'), default=str)
+    
+    def _read_stamp(self) -> Optional[float]:
+        if not self.stamp_path:
+            return None
+        try:
+            return os.stat(self.stamp_path).st_mtime
+        except OSError:
+            return None
+    
+    def _check_stamp(self) -> None:
+        """Drop every entry if the stamp file changed since it was last seen."""
+        if not self.stamp_path:
+            return
+        mtime = self._read_stamp()
+        if mtime != self._stamp_mtime:
+            self._stamp_mtime = mtime
+            if self._entries:
+                logger.debug("Cache stamp %s changed, invalidating %s entries", self.stamp_path, len(self._entries))
+                self.invalidate()
+    
+    def _lookup(self, key: str) -> Tuple[Any, bool]:
+        """Return (value, whether it is stale), or (None, False) if key is not cached."""
+        self._check_stamp()
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, False
+        expires_at, stale_until, value = entry
+        now = time.monotonic()
+        if stale_until <= now:
+            del self._entries[key]
+            return None, False
+        self._entries.move_to_end(key)
+        return value, expires_at <= now
+    
+    def get(self, key: str) -> Any:
+        """
+        Return the fresh cached value for key, or None
+        
+        Args:
+            key: Cache key from make_key()
+        """
+        value, stale = self._lookup(key)
+        return None if stale else value
+    
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store value under key, evicting the least recently used entries."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = (expires_at, expires_at + self.stale_ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    async def get_or_fetch(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        cacheable: Optional[Callable[[Any], bool]] = None,
+        ttl: Optional[float] = None
+    ) -> Any:
+        """
+        Return the cached value for key, calling fetch() on a miss
+        
+        Concurrent callers that miss on the same key wait for the first caller's
+        fetch instead of starting their own. The fetch runs in its own task, so
+        it keeps going for the other waiters if one caller is cancelled.
+        Exceptions are propagated to every waiter and nothing is cached, and a
+        fetch that started before invalidate() is returned but not cached. A stale entry is returned immediately and
+        refreshed in the background.
+        
+        Args:
+            key: Cache key from make_key()
+            fetch: Coroutine function producing the value
+            cacheable: Optional predicate; values it rejects are returned but not cached
+            ttl: Seconds the fetched value stays fresh, instead of the cache's ttl
+            
+        Returns:
+            Cached or freshly fetched value
+        """
+        value, stale = self._lookup(key)
+        if value is not None:
+            if stale:
+                self.stale_hits += 1
+                self._refresh(key, fetch, cacheable, ttl)
+            else:
+                self.hits += 1
+            return value
+        
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+        
+        self.misses += 1
+        # Every caller shields the fetch task, so cancelling one of them does
+        # not cancel the fetch the others are waiting on
+        return await asyncio.shield(self._start_fetch(key, fetch, cacheable, ttl))
+    
+    def _start_fetch(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        cacheable: Optional[Callable[[Any], bool]],
+        ttl: Optional[float]
+    ) -> asyncio.Task:
+        """Start fetching key in its own task and register it for concurrent callers."""
+        task = asyncio.get_running_loop().create_task(self._fetch(key, fetch, cacheable, ttl))
+        self._inflight[key] = task
+        self._tasks.add(task)
+        task.add_done_callback(self._fetch_done)
+        return task
+    
+    async def _fetch(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        cacheable: Optional[Callable[[Any], bool]],
+        ttl: Optional[float]
+    ) -> Any:
+        generation = self._generation
+        try:
+            value = await fetch()
+        finally:
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+        if generation != self._generation:
+            logger.debug("Cache invalidated while fetching %s, not storing the result", key)
+        elif value is not None and (cacheable is None or cacheable(value)):
+            self.set(key, value, ttl)
+        return value
+    
+    def _fetch_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled():
+            # Mark the exception as retrieved in case every caller was cancelled
+            task.exception()
+    
+    def _refresh(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        cacheable: Optional[Callable[[Any], bool]],
+        ttl: Optional[float]
+    ) -> None:
+        """Refetch a stale entry in the background, unless a fetch is already running."""
+        if key in self._inflight:
+            return
+        self.refreshes += 1
+        self._start_fetch(key, fetch, cacheable, ttl).add_done_callback(self._refresh_done)
+    
+    def _refresh_done(self, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            # The stale value stays in place until it runs out
+            self.refresh_failures += 1
+            logger.warning("Background cache refresh failed: %s", task.exception())
+    
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """
+        Drop one entry, or the whole cache when key is None
+        
+        Args:
+            key: Cache key to drop; None clears every entry
+        """
+        self.invalidations += 1
+        self._generation += 1
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current size."""
+        lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'stale_ttl': self.stale_ttl,
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'refreshes': self.refreshes,
+            'refresh_failures': self.refresh_failures,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'hit_rate': (self.hits + self.stale_hits + self.coalesced) / lookups if lookups else 0.0,
+        }
@@ -4,6 +4,8 @@
  * This module provides the API route handler for executing PydanticAI agents in the chat application.
  * It manages the execution of different agent types (weather, search, summarize) by spawning Python
  * processes and handling the communication between the TypeScript frontend and Python agent implementations.
+ * When AGENT_SERVER_URL is set, requests go to the long-lived agent server (agent_server.py), which keeps
+ * the agents loaded; spawning remains the fallback when the server is unreachable or busy.
  * 
  * Key Features:
  * - Dynamic agent loading and execution
@@ -32,10 +34,84 @@ import path from 'path';
  */
 const AgentRequestSchema = z.object({
   query: z.string().min(1, 'Query must not be empty'),
-  agentType: z.enum(['weather', 'search', 'summarize', 'product', 'store-locator']),
+  agentType: z.enum(['weather', 'search', 'summarize', 'product', 'store-locator', 'multi']),
   parameters: z.record(z.any()).optional()
 });
 
+/**
+ * Base URL of the warm agent server (app/api/agents/agent_server.py), e.g. http://127.0.0.1:8765
+ */
+const AGENT_SERVER_URL = process.env.AGENT_SERVER_URL;
+
+/**
+ * Milliseconds to wait for the agent server before failing the request. A timed-out request is
+ * not retried by spawning the agent, since the server may still be running it.
+ */
+const AGENT_SERVER_TIMEOUT_MS = parseInt(process.env.AGENT_SERVER_TIMEOUT_MS || '30000', 10);
+
+/**
+ * Per-request timings reported by the agent server
+ */
+interface AgentServerTimings {
+  queue_ms: number;   // Waiting for a concurrency slot
+  agent_ms: number;   // Running the agent's process()
+  total_ms: number;   // Both
+}
+
+/**
+ * Runs an agent on the warm agent server
+ *
+ * @param agentType - The type of agent to execute
+ * @param query - The user query
+ * @param parameters - Agent parameters, passed through as JSON
+ * @returns The agent's output, or null if the server is unreachable or busy and the
+ *   agent should be spawned instead
+ * @throws Error if the agent itself failed on the server or the server timed out
+ */
+async function executeOnAgentServer(
+  agentType: string,
+  query: string,
+  parameters: Record<string, any> | undefined
+): Promise<string | null> {
+  const started = Date.now();
+  let response: Response;
+  try {
+    response = await fetch(`${AGENT_SERVER_URL}/agents/${agentType}`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ query, parameters: parameters ?? null }),
+      signal: AbortSignal.timeout(AGENT_SERVER_TIMEOUT_MS)
+    });
+  } catch (error) {
+    if (error instanceof Error && (error.name === 'TimeoutError' || error.name === 'AbortError')) {
+      // The server accepted the request and may still be running it; spawning would run it twice
+      logger.error('Agent server timed out', { agentType, timeoutMs: AGENT_SERVER_TIMEOUT_MS });
+      throw new Error(`Agent execution timed out after ${AGENT_SERVER_TIMEOUT_MS}ms`);
+    }
+    logger.warn('Agent server unreachable, spawning agent', {
+      agentType,
+      error: error instanceof Error ? error.message : String(error)
+    });
+    return null;
+  }
+
+  if (response.status === 503) {
+    logger.warn('Agent server busy, spawning agent', { agentType });
+    return null;
+  }
+  const body = await response.json() as { result?: string; error?: string; timings?: AgentServerTimings };
+  if (!response.ok) {
+    throw new Error(`Agent execution failed: ${body.error}`);
+  }
+
+  logger.info('Agent server request completed', {
+    agentType,
+    roundTripMs: Date.now() - started,
+    ...body.timings
+  });
+  return body.result ?? '';
+}
+
 /**
  * Executes a Python script in a controlled environment for PydanticAI agent processing
  * 
@@ -56,6 +132,7 @@ const AgentRequestSchema = z.object({
  * ```
  */
 async function executePythonScript(agentType: string, script: string): Promise<string> {
+  const started = Date.now();
   return new Promise((resolve, reject) => {
     // Resolve paths for agent module and Python interpreter
     const agentModulePath = path.join(process.cwd(), 'app', 'api', 'agents', `${agentType}_agent.py`);
@@ -88,6 +165,8 @@ async function executePythonScript(agentType: string, script: string): Promise<s
     // Handle process completion
     pythonProcess.on('close', (code) => {
       if (code === 0) {
+        // Comparable with the agent server's roundTripMs
+        logger.info('Spawned agent completed', { agentType, durationMs: Date.now() - started });
         resolve(output.trim());
       } else {
         logger.error('Python script execution failed', {
@@ -192,8 +271,13 @@ async def main():
         agent_class_name = f"{agent_type[0].upper()}{agent_type[1:]}Agent"
     agent_class = getattr(agent_module, agent_class_name)
     agent = agent_class()
-    result = await agent.process(${JSON.stringify(query)}, ${pythonParameters})
-    print(result)
+    try:
+        result = await agent.process(${JSON.stringify(query)}, ${pythonParameters})
+        print(result)
+    finally:
+        # Release connections held by the shared agent HTTP client
+        from agent_http import aclose_shared_client
+        await aclose_shared_client()
 
 # Run the async main function
 asyncio.run(main())
@@ -204,7 +288,10 @@ asyncio.run(main())
       queryLength: query.length
     });
 
-    const result = await executePythonScript(agentType, script);
+    let result = AGENT_SERVER_URL ? await executeOnAgentServer(agentType, query, parameters) : null;
+    if (result === null) {
+      result = await executePythonScript(agentType, script);
+    }
 
     // Set up streaming response
     const encoder = new TextEncoder();
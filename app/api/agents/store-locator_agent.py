@@ -1,15 +1,76 @@
 from pydantic_ai import Agent
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from pydantic import BaseModel, Field
-import httpx
 import json
 import os
 import re
-import logging
 import sys
 
-# Configure logging to write to a file
-logging.basicConfig(filename='logs/app.log', level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+from agent_http import endpoint_timeout, get_client
+from agent_logging import get_logger, log_payload
+from agent_patterns import lazy_compile
+from store_gazetteer import STATE_ABBREVS, get_gazetteer
+from store_geo import get_store_geo_index
+from store_index import embedded_mode_enabled, get_store_index
+
+logger = get_logger('store_locator')
+
+# Query parsing tables used by StoreLocatorAgent.extract_search_params. Each
+# pattern is compiled on first use (see agent_patterns) and reused by every turn.
+_COMPOUND_STATE_NAMES = (
+    'New York', 'New Jersey', 'New Mexico', 'New Hampshire',
+    'North Dakota', 'North Carolina', 'South Dakota', 'South Carolina',
+    'Rhode Island', 'West Virginia'
+)
+_COMPOUND_STATES_ALTERNATION = '|'.join(re.escape(state) for state in _COMPOUND_STATE_NAMES)
+_COMPOUND_STATE_QUESTION_RE = lazy_compile(
+    r'(what|where|which|find|show|list|tell\s+me\s+about)\s+stores\s+(are\s+)?(in|at|near|around)\s+'
+    r'(' + _COMPOUND_STATES_ALTERNATION + r')(?:\s|\b|$)',
+    re.IGNORECASE
+)
+_COMPOUND_STATE_CONTEXT_RE = lazy_compile(
+    r'(?:stores?|locations?|shops?|outlets?)(?:\s+(?:in|at|near|around|of))\s+(' + _COMPOUND_STATES_ALTERNATION + r')',
+    re.IGNORECASE
+)
+
+_ACTION_VERB_RE = lazy_compile(r'^(find|show|get|search for|looking for|give me|i want|i need)\s+')
+_ZIP_CODE_PHRASE_RE = lazy_compile(r'(?:zip|ZIP) code\s+(\d{5})', re.IGNORECASE)
+_ZIP_RE = lazy_compile(r'\b(\d{5})\b')
+_WORD_RE = lazy_compile(r'\w+')
+_TRAILING_DIGITS_RE = lazy_compile(r'\s+\d+$')
+
+_STATE_CODES = frozenset(STATE_ABBREVS.values())
+_STATE_NAME_ALTERNATION = '|'.join(name.replace(' ', r'\s+') for name in STATE_ABBREVS)
+_COMPOUND_STATE_SPACED_ALTERNATION = '|'.join(name.replace(' ', r'\s+') for name in _COMPOUND_STATE_NAMES)
+# (pattern, whether a match is a direct "stores in XX" state query that skips city extraction)
+_STATE_PATTERNS = tuple((lazy_compile(pattern, re.IGNORECASE), direct) for pattern, direct in (
+    (r'(?:in|at|near)\s+(?:[A-Za-z0-9\s]+,\s+)?([A-Za-z]{2})(?:\s+\d{5}|\s*$|[.?!])', False),
+    (r'(?:in|at|near)\s+(?:[A-Za-z0-9\s]+,\s+)?(' + _STATE_NAME_ALTERNATION + r')(?:\s+\d{5}|\s*$|[.?!])', False),
+    (r'\b(' + '|'.join(STATE_ABBREVS.values()) + r')\b', False),
+    (r'what stores are in\s+([A-Za-z]{2})(?:\s+\d{5}|\s*$|[.?!])', True),
+    (r'stores\s+in\s+([A-Za-z]{2})(?:\s+\d{5}|\s*$|[.?!])', True),
+    (r'what stores are in\s+(' + _COMPOUND_STATE_SPACED_ALTERNATION + r')(?:\s+\d{5}|\s*$|[.?!])', True),
+))
+_IN_AS_PREPOSITION_RE = lazy_compile(r'\b(find|show|stores?|locate|get|where|are)\s+\bin\b', re.IGNORECASE)
+_SIMPLE_STATE_QUERY_RE = lazy_compile(r'(what|which|where).+stores.+in\s+([A-Za-z]{2})\s*[.?!]?$', re.IGNORECASE)
+
+_CITY_CONTEXT_PATTERNS = tuple(lazy_compile(pattern, re.IGNORECASE) for pattern in (
+    r'(?:in|at|near)\s+([A-Za-z0-9\s]+)(?:,|\s+(?:[A-Za-z]{2}|[A-Za-z]+)|\s*$)',
+    r'(?:store|stores|location|locations)\s+(?:in|at|near)\s+([A-Za-z0-9\s]+)(?:,|\s+(?:[A-Za-z]{2}|[A-Za-z]+)|\s*$)',
+))
+# Common prefixes in city names, tried in order
+_CITY_PREFIX_PATTERNS = tuple(
+    lazy_compile(rf'\b{prefix}\s+([A-Za-z]+(?:\s+[A-Za-z]+)?)\b', re.IGNORECASE)
+    for prefix in ("Port", "South", "North", "East", "West", "New", "Fort", "Mount", "San", "Santa", "Saint", "Lake")
+)
+_CITY_SUFFIX_RE = lazy_compile(
+    r'\b([A-Za-z]+(?:ville|town|burg|port|ford|bury|mouth|fort|field|dale|wood|land))\b', re.IGNORECASE
+)
+
+# Nearest-store mode: "stores near 42056", "closest 3 stores to 81775", "within 25 miles of 42056"
+_NEAREST_INTENT_RE = lazy_compile(r'\b(?:near|nearest|nearby|closest|close to|around|within)\b', re.IGNORECASE)
+_NEAREST_COUNT_RE = lazy_compile(r'\b(?:closest|nearest)\s+(\d{1,2})\b', re.IGNORECASE)
+_RADIUS_RE = lazy_compile(r'\bwithin\s+(\d+(?:\.\d+)?)\s*(?:mi|miles?)\b', re.IGNORECASE)
 
 class StoreQueryInput(BaseModel):
     """Model for store location query input."""
@@ -35,6 +96,25 @@ class Store(BaseModel):
     state: str
     zipCode: str
     phoneNumber: str
+    distanceMiles: Optional[float] = None
+    distanceApproximate: bool = False
+
+
+def format_distance(miles: float, approximate: bool) -> str:
+    """
+    Describe a nearest-store distance without overstating its precision
+
+    Args:
+        miles: Distance in miles
+        approximate: Whether the distance comes from ZIP prefix centroids
+
+    Returns:
+        e.g. "12.3 miles away", "About 40 miles away" or "In the same area"
+    """
+    if approximate:
+        return "In the same area" if miles < 1 else f"About {miles:.0f} miles away"
+    return "Less than a mile away" if miles < 1 else f"{miles:.1f} miles away"
+
 
 class StoreLocatorAgent(Agent):
     """
@@ -57,6 +137,9 @@ class StoreLocatorAgent(Agent):
         # Register the process method as a tool
         self.tools = [self.process]
         
+        # Optional in-memory store index (STORE_LOCATOR_EMBEDDED=true); the HTTP API is the fallback
+        self.store_index = get_store_index() if embedded_mode_enabled() else None
+        
         # More flexible city patterns that handle various cases
         self.city_patterns = [
             r'(?:in|at|near)\s+([A-Za-z0-9\s]+)(?:,|\s+(?:[A-Za-z]{2}|[A-Za-z]+)|\s*$)',
@@ -75,33 +158,22 @@ class StoreLocatorAgent(Agent):
         ]
         
         # State abbreviations lookup table
-        self.state_abbrevs = {
-            'Alabama': 'AL', 'Alaska': 'AK', 'Arizona': 'AZ', 'Arkansas': 'AR', 'California': 'CA',
-            'Colorado': 'CO', 'Connecticut': 'CT', 'Delaware': 'DE', 'Florida': 'FL', 'Georgia': 'GA',
-            'Hawaii': 'HI', 'Idaho': 'ID', 'Illinois': 'IL', 'Indiana': 'IN', 'Iowa': 'IA',
-            'Kansas': 'KS', 'Kentucky': 'KY', 'Louisiana': 'LA', 'Maine': 'ME', 'Maryland': 'MD',
-            'Massachusetts': 'MA', 'Michigan': 'MI', 'Minnesota': 'MN', 'Mississippi': 'MS', 'Missouri': 'MO',
-            'Montana': 'MT', 'Nebraska': 'NE', 'Nevada': 'NV', 'New Hampshire': 'NH', 'New Jersey': 'NJ',
-            'New Mexico': 'NM', 'New York': 'NY', 'North Carolina': 'NC', 'North Dakota': 'ND', 'Ohio': 'OH',
-            'Oklahoma': 'OK', 'Oregon': 'OR', 'Pennsylvania': 'PA', 'Rhode Island': 'RI', 'South Carolina': 'SC',
-            'South Dakota': 'SD', 'Tennessee': 'TN', 'Texas': 'TX', 'Utah': 'UT', 'Vermont': 'VT',
-            'Virginia': 'VA', 'Washington': 'WA', 'West Virginia': 'WV', 'Wisconsin': 'WI', 'Wyoming': 'WY'
-        }
+        self.state_abbrevs = dict(STATE_ABBREVS)
 
         # Reverse lookup for abbreviation to full state name
         self.abbrev_to_state = {v: k for k, v in self.state_abbrevs.items()}
         
         # Special compound state names that need careful handling
-        self.compound_state_names = [
-            'New York', 'New Jersey', 'New Mexico', 'New Hampshire', 
-            'North Dakota', 'North Carolina', 'South Dakota', 'South Carolina',
-            'Rhode Island', 'West Virginia'
-        ]
+        self.compound_state_names = list(_COMPOUND_STATE_NAMES)
         
     def extract_search_params(self, query: str, keep_original_query: bool = False) -> StoreFilterParams:
         """
         Extract search parameters from a natural language query
         
+        Known store cities and full state names are resolved with the
+        gazetteer (longest match); the regex heuristics below are the fallback
+        for partial or unknown city names.
+        
         Args:
             query: Natural language query from the user
             keep_original_query: Whether to keep the original query in the search parameters
@@ -115,16 +187,10 @@ class StoreLocatorAgent(Agent):
             - state: State (2-letter code)
             - zipCode: ZIP code
         """
-        logging.debug(f"Processing store query: {query}")
+        logger.debug("Processing store query: %s", query)
 
         # DIRECT HANDLING FOR COMPOUND STATE NAMES - must be first to avoid incorrect city extraction
-        compound_state_pattern = r'(what|where|which|find|show|list|tell\s+me\s+about)\s+stores\s+(are\s+)?(in|at|near|around)\s+({})(?:\s|\b|$)'
-        
-        # Build a regex pattern for all compound state names
-        compound_states_regex = '|'.join([re.escape(state) for state in self.compound_state_names])
-        compound_pattern = compound_state_pattern.format(compound_states_regex)
-        
-        match = re.search(compound_pattern, query, re.IGNORECASE)
+        match = _COMPOUND_STATE_QUESTION_RE.search(query)
         if match:
             matched_state = match.group(4)
             # Find the closest match in our compound state names list (case insensitive)
@@ -135,7 +201,7 @@ class StoreLocatorAgent(Agent):
             if matched_state:
                 state_code = self.state_abbrevs.get(matched_state)
                 if state_code:
-                    logging.debug(f"Direct match for compound state query: {query} -> {matched_state} ({state_code})")
+                    logger.debug("Direct match for compound state query: %s -> %s (%s)", query, matched_state, state_code)
                     search_params = StoreFilterParams(
                         query='',
                         size=5,
@@ -146,38 +212,36 @@ class StoreLocatorAgent(Agent):
                     )
                     return search_params
         
-        # Check for compound state names next
-        for compound_state in self.compound_state_names:
-            if compound_state.lower() in query.lower():
-                # Check if it's in a context that suggests it's being used as a state
-                state_pattern = re.compile(r'(?:stores?|locations?|shops?|outlets?)(?:\s+(?:in|at|near|around|of))\s+' + 
-                                         re.escape(compound_state), re.IGNORECASE)
-                if state_pattern.search(query):
-                    logging.debug(f"Detected compound state name: {compound_state}")
-                    
-                    # Create search parameters with the state
-                    state_code = self.state_abbrevs.get(compound_state)
-                    if state_code:
-                        logging.debug(f"Using state code {state_code} for {compound_state}")
-                        search_params = StoreFilterParams(
-                            query='',
-                            size=5,
-                            page=1,
-                            filters={
-                                'state': state_code
-                            }
-                        )
-                        return search_params
+        # Check for compound state names next, in context that suggests they are used as a state
+        # (the first compound state in list order wins, as when each was checked in turn)
+        context_states = {m.group(1).lower() for m in _COMPOUND_STATE_CONTEXT_RE.finditer(query)}
+        if context_states:
+            compound_state = next(state for state in self.compound_state_names if state.lower() in context_states)
+            logger.debug("Detected compound state name: %s", compound_state)
+            
+            # Create search parameters with the state
+            state_code = self.state_abbrevs.get(compound_state)
+            if state_code:
+                logger.debug("Using state code %s for %s", state_code, compound_state)
+                search_params = StoreFilterParams(
+                    query='',
+                    size=5,
+                    page=1,
+                    filters={
+                        'state': state_code
+                    }
+                )
+                return search_params
         
         # Special handling for queries that contain "ZIP code" followed by a ZIP
         # This is to avoid interpreting "ZIP code" as a city name
         if "ZIP code" in query or "zip code" in query:
-            logging.debug("Detected 'ZIP code' phrase in query, using special handling")
+            logger.debug("Detected 'ZIP code' phrase in query, using special handling")
             # Extract ZIP directly with a specific pattern
-            zip_match = re.search(r'(?:zip|ZIP) code\s+(\d{5})', query, re.IGNORECASE)
+            zip_match = _ZIP_CODE_PHRASE_RE.search(query)
             if zip_match:
                 zipcode = zip_match.group(1)
-                logging.debug(f"Extracted ZIP code {zipcode} from 'ZIP code' phrase")
+                logger.debug("Extracted ZIP code %s from 'ZIP code' phrase", zipcode)
                 
                 # Create search parameters with just the ZIP code
                 search_params = StoreFilterParams(
@@ -199,39 +263,32 @@ class StoreLocatorAgent(Agent):
         )
         
         # Clean query: remove action verbs like "find" and keep store terms
-        clean_query = re.sub(r'^(find|show|get|search for|looking for|give me|i want|i need)\s+', '', query.lower())
+        clean_query = _ACTION_VERB_RE.sub('', query.lower())
         search_params.query = clean_query
         
-        # State abbreviations list for reference
-        state_abbrevs_list = [
-            'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'FL', 'GA', 'HI', 'ID', 
-            'IL', 'IN', 'IA', 'KS', 'KY', 'LA', 'ME', 'MD', 'MA', 'MI', 'MN', 'MS', 'MO', 'MT', 
-            'NE', 'NV', 'NH', 'NJ', 'NM', 'NY', 'NC', 'ND', 'OH', 'OK', 'OR', 'PA', 'RI', 
-            'SC', 'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY'
-        ]
-        
         # Extract ZIP code FIRST using simpler, more reliable pattern
         zipcode = None
         # Look for any 5-digit number in the query, which is most likely a ZIP code
-        zip_match = re.search(r'\b(\d{5})\b', query)
+        zip_match = _ZIP_RE.search(query)
         if zip_match:
             zipcode = zip_match.group(1)
-            logging.debug(f'Extracted ZIP code: {zipcode}')
+            logger.debug("Extracted ZIP code: %s", zipcode)
             # Create a modified query where we remove the ZIP code before extracting city
             # This prevents treating the ZIP as a city name
-            query_without_zip = re.sub(r'\b' + re.escape(zipcode) + r'\b', '', query)
-            logging.debug(f'Modified query without ZIP: {query_without_zip}')
+            query_without_zip = _ZIP_RE.sub(lambda m: '' if m.group(1) == zipcode else m.group(0), query)
+            logger.debug("Modified query without ZIP: %s", query_without_zip)
         else:
             query_without_zip = query
         
         # THEN extract state (to avoid matching state names as cities)
         state = None
-        state_abbrevs_list = list(self.state_abbrevs.values())
+        state_abbrevs_set = _STATE_CODES
+        query_words = {word.upper() for word in _WORD_RE.findall(query)}
         
         # Check for state abbreviations or full names using more precise patterns
         # that won't incorrectly match prepositions like "in" as "IN" (Indiana)
-        for pattern in self.state_patterns:
-            match = re.search(pattern, query, re.IGNORECASE)
+        for pattern, is_direct_state_pattern in _STATE_PATTERNS:
+            match = pattern.search(query)
             if match:
                 potential_state = match.group(1).strip().upper()
                 
@@ -240,113 +297,116 @@ class StoreLocatorAgent(Agent):
                 if potential_state == "IN":
                     # Check if "in" is being used as a preposition rather than state code
                     # by ensuring it's not preceded by prepositions or store-related words
-                    in_as_preposition = re.search(r'\b(find|show|stores?|locate|get|where|are)\s+\bin\b', 
-                                                 query, re.IGNORECASE)
-                    if in_as_preposition:
-                        logging.debug(f"Skipping potential state 'IN' as it appears to be a preposition")
+                    if _IN_AS_PREPOSITION_RE.search(query):
+                        logger.debug("Skipping potential state 'IN' as it appears to be a preposition")
                         continue
                 
                 # Validate that it's a real state abbreviation or name
-                if potential_state in state_abbrevs_list:
+                if potential_state in state_abbrevs_set:
                     # For two-letter codes, ensure they're not just part of words
-                    if len(potential_state) == 2:
-                        # Make sure it's a standalone state code with word boundaries
-                        standalone = re.search(r'\b' + re.escape(potential_state) + r'\b', 
-                                              query, re.IGNORECASE)
-                        if not standalone:
-                            logging.debug(f"Skipping potential state {potential_state} as it's part of another word")
-                            continue
+                    if len(potential_state) == 2 and potential_state not in query_words:
+                        logger.debug("Skipping potential state %s as it's part of another word", potential_state)
+                        continue
                     
                     state = potential_state
-                    logging.debug(f"Found state abbreviation: {state}")
+                    logger.debug("Found state abbreviation: %s", state)
                     
                     # For "what stores are in XX" pattern, we'll skip city extraction
                     # since we've already identified the state code directly
-                    if pattern.startswith(r'what stores are in') or pattern.startswith(r'stores\s+in'):
-                        logging.debug(f"Detected direct state query pattern, skipping city extraction")
-                        city = None
-                        break
-                    
+                    if is_direct_state_pattern:
+                        logger.debug("Detected direct state query pattern, skipping city extraction")
                     break
         
+        gazetteer = get_gazetteer()
+        query_for_city = query_without_zip  # Use the version without ZIP code
+        
+        # Full state names ("stores in Texas") resolve through the gazetteer,
+        # unless the name is part of a longer known city name
+        if not state:
+            state_match = gazetteer.find(query_for_city, 'state')
+            city_match = gazetteer.find(query_for_city, 'city')
+            if state_match and not (city_match and city_match.start <= state_match.start < city_match.end):
+                state = state_match.value
+                logger.debug("Found state name: %s -> %s", query_for_city[state_match.start:state_match.end], state)
+                # Keep the state name from being read as a city
+                query_for_city = query_for_city[:state_match.start] + query_for_city[state_match.end:]
+        
         # THEN extract city - but don't consider state abbreviations or ZIP codes as cities
         city = None
-        state_abbrevs_list_set = set(state_abbrevs_list)
-        query_for_city = query_without_zip  # Use the version without ZIP code
         
         # Skip city extraction for simple state queries like "What stores are in NY?"
-        simple_state_query = re.search(r'(what|which|where).+stores.+in\s+([A-Za-z]{2})\s*[.?!]?$', query, re.IGNORECASE)
-        if simple_state_query:
-            logging.debug(f"Skipping city extraction for simple state query: {query}")
+        if _SIMPLE_STATE_QUERY_RE.search(query):
+            logger.debug("Skipping city extraction for simple state query: %s", query)
         # Skip city extraction if the query is just a state code
-        elif len(query_for_city.strip()) == 2 and query_for_city.strip().upper() in state_abbrevs_list_set:
-            logging.debug(f"Skipping city extraction for pure state code: {query_for_city}")
+        elif len(query_for_city.strip()) == 2 and query_for_city.strip().upper() in state_abbrevs_set:
+            logger.debug("Skipping city extraction for pure state code: %s", query_for_city)
         else:
-            # First try patterns with clear context (in/at/near)
-            for pattern in self.city_patterns[0:2]:  # First try patterns with context
-                match = re.search(pattern, query_for_city, re.IGNORECASE)
-                if match:
-                    potential_city = match.group(1).strip()
-                    # Clean up the city name - remove trailing state or zip code if present
-                    if ',' in potential_city:
-                        potential_city = potential_city.split(',')[0].strip()
-                    
-                    # Further clean by removing trailing digits (ZIP codes)
-                    potential_city = re.sub(r'\s+\d+$', '', potential_city)
-                    
-                    # Filter out phrases that clearly aren't cities
-                    non_city_phrases = ['stores are in', 'stores in', 'locations in', 'shops in']
-                    if potential_city.lower() in non_city_phrases:
-                        logging.debug(f"Skipping non-city phrase: {potential_city}")
-                        continue
-                    
-                    # Validate the potential city:
-                    # 1. Not empty
-                    # 2. Not a state abbreviation
-                    # 3. Not the same as the state
-                    # 4. Not the same as the ZIP code we extracted
-                    if (potential_city and 
-                            potential_city.upper() not in state_abbrevs_list_set and
-                            (not state or potential_city.upper() != state) and
-                            (not zipcode or potential_city != zipcode)):
-                        city = potential_city
-                        logging.debug(f"Found city with context: {city}")
-                        break
+            # Known store cities first: longest match in the gazetteer
+            city_match = gazetteer.find(query_for_city, 'city')
+            if city_match:
+                city = city_match.value
+                logger.debug("Found city in gazetteer: %s", city)
+            
+            # Then patterns with clear context (in/at/near)
+            if not city:
+                for pattern in _CITY_CONTEXT_PATTERNS:
+                    match = pattern.search(query_for_city)
+                    if match:
+                        potential_city = match.group(1).strip()
+                        # Clean up the city name - remove trailing state or zip code if present
+                        if ',' in potential_city:
+                            potential_city = potential_city.split(',')[0].strip()
+                        
+                        # Further clean by removing trailing digits (ZIP codes)
+                        potential_city = _TRAILING_DIGITS_RE.sub('', potential_city)
+                        
+                        # Filter out phrases that clearly aren't cities
+                        non_city_phrases = ['stores are in', 'stores in', 'locations in', 'shops in']
+                        if potential_city.lower() in non_city_phrases:
+                            logger.debug("Skipping non-city phrase: %s", potential_city)
+                            continue
+                        
+                        # Validate the potential city:
+                        # 1. Not empty
+                        # 2. Not a state abbreviation
+                        # 3. Not the same as the state
+                        # 4. Not the same as the ZIP code we extracted
+                        if (potential_city and 
+                                potential_city.upper() not in state_abbrevs_set and
+                                (not state or potential_city.upper() != state) and
+                                (not zipcode or potential_city != zipcode)):
+                            city = potential_city
+                            logger.debug("Found city with context: %s", city)
+                            break
             
             # If we still don't have a city, look for compound city names with prefixes
             # like "Port", "South", "East", "North", "West", "New", etc.
             if not city:
-                # Common prefixes in city names
-                city_prefixes = ["Port", "South", "North", "East", "West", "New", "Fort", "Mount", "San", "Santa", "Saint", "Lake"]
-                for prefix in city_prefixes:
-                    prefix_pattern = rf'\b{prefix}\s+([A-Za-z]+(?:\s+[A-Za-z]+)?)\b'
-                    match = re.search(prefix_pattern, query_for_city, re.IGNORECASE)
+                for prefix_pattern in _CITY_PREFIX_PATTERNS:
+                    match = prefix_pattern.search(query_for_city)
                     if match:
                         # Extract the full city name including the prefix
-                        start_idx = match.start()
-                        end_idx = match.end()
-                        potential_city = query_for_city[start_idx:end_idx].strip()
+                        potential_city = match.group(0).strip()
                         
                         # Additional validation to ensure we don't pick up false positives
                         if (potential_city and 
-                                potential_city.upper() not in state_abbrevs_list_set and
+                                potential_city.upper() not in state_abbrevs_set and
                                 (not state or potential_city.upper() != state)):
                             city = potential_city
-                            logging.debug(f"Found compound city with prefix: {city}")
+                            logger.debug("Found compound city with prefix: %s", city)
                             break
             
             # If we still haven't found a city, check for city names that end with suffixes
             # like "ville", "town", "burg", "port", "ford", "bury", etc.
             if not city:
-                city_suffix_pattern = r'\b([A-Za-z]+(?:ville|town|burg|port|ford|bury|mouth|fort|field|dale|wood|land))\b'
-                match = re.search(city_suffix_pattern, query_for_city, re.IGNORECASE)
+                match = _CITY_SUFFIX_RE.search(query_for_city)
                 if match:
                     potential_city = match.group(1).strip()
                     if (potential_city and 
-                            potential_city.upper() not in state_abbrevs_list_set and
+                            potential_city.upper() not in state_abbrevs_set and
                             (not state or potential_city.upper() != state)):
                         city = potential_city
-                        logging.debug(f"Found city with common suffix: {city}")
+                        logger.debug("Found city with common suffix: %s", city)
         
         # Add extracted parameters to the filters object
         # The Store API expects filters in a nested structure
@@ -361,12 +421,12 @@ class StoreLocatorAgent(Agent):
         if query and not city and not state and not zipcode:
             search_params.query = query
         
-        logging.debug(f'Final search parameters: {search_params}')
+        logger.debug("Final search parameters: %s", search_params)
         return search_params
 
     def format_store_results(self, stores: List[Store], total: int, params: StoreFilterParams) -> str:
         """Format store results into a natural language response."""
-        logging.debug(f'Formatting results for {total} stores with params: {params}')
+        logger.debug("Formatting results for %s stores with params: %s", total, params)
         
         # Create a response list
         response = []
@@ -378,17 +438,17 @@ class StoreLocatorAgent(Agent):
             if params.filters.get('city'):
                 city = params.filters['city']
                 constraints.append(f"in {city}")
-                logging.debug(f"No results for city: {city}")
+                logger.debug("No results for city: %s", city)
             
             if params.filters.get('state'):
                 state = params.filters['state']
                 constraints.append(f"in {state}")
-                logging.debug(f"No results for state: {state}")
+                logger.debug("No results for state: %s", state)
                 
             if params.filters.get('zipCode'):
                 zip_code = params.filters['zipCode']
                 constraints.append(f"near ZIP code {zip_code}")
-                logging.debug(f"No results for ZIP: {zip_code}")
+                logger.debug("No results for ZIP: %s", zip_code)
             
             # Join constraints for a natural language response
             constraints_str = " ".join(constraints) if constraints else "matching your criteria"
@@ -410,7 +470,9 @@ class StoreLocatorAgent(Agent):
             zip_code = params.filters['zipCode']
         
         # Build location parts for the header
-        if city and state:
+        if zip_code and stores[0].distanceMiles is not None:
+            location_part = f"near ZIP code {zip_code}"
+        elif city and state:
             location_part = f"in {city}, {state}"
         elif city:
             location_part = f"in {city}"
@@ -437,6 +499,9 @@ class StoreLocatorAgent(Agent):
             # Add all lines to response
             response.append(store_line)
             response.append(address_line)
+            # Distance line for nearest-store results
+            if store.distanceMiles is not None:
+                response.append(f"📏 {format_distance(store.distanceMiles, store.distanceApproximate)}")
             response.append(phone_line)
         
         # Add a note about more stores if applicable
@@ -460,26 +525,36 @@ class StoreLocatorAgent(Agent):
             # Handle both string input and StoreQueryInput for backward compatibility
             query = query_input.query if isinstance(query_input, StoreQueryInput) else query_input
             
-            logging.debug(f'Processing store query: {query}')
+            logger.debug("Processing store query: %s", query)
             
             # Add a prefix marker for frontend identification
             response_prefix = f"<store-locator-query>\nSearching for stores based on query: {query}\n"
             
             # Extract search parameters from the query string
             extracted_params = self.extract_search_params(query)
-            logging.debug(f'Sending search parameters to API: {extracted_params}')
+            logger.debug("Sending search parameters to API: %s", extracted_params)
             
             # Call the API
-            logging.debug(f"Calling store API with params: {json.dumps(extracted_params.dict())}")
+            log_payload(logger, "Calling store API with params", extracted_params.dict())
+            
+            # Nearest-store queries ("stores near 42056") are answered from the ZIP centroid index
+            nearest = self.nearest_request(query, extracted_params)
+            response = self.find_nearest_stores(extracted_params.filters['zipCode'], *nearest) if nearest else None
             
-            # Use the dedicated find_stores method to make the API call
-            response = await self.find_stores(extracted_params)
+            # Otherwise use the dedicated find_stores method to make the API call
+            if response is None:
+                response = await self.find_stores(extracted_params)
+                
+                # A ZIP code without a store of its own falls back to the closest stores
+                if extracted_params.filters.get('zipCode') and self.is_empty_response(response):
+                    logger.debug("No stores in ZIP %s, searching nearby stores", extracted_params.filters['zipCode'])
+                    response = self.find_nearest_stores(extracted_params.filters['zipCode'], extracted_params.size) or response
             
             # Process the API response
             if response.get('success'):
                 try:
                     data = response.get('data', {})
-                    logging.debug(f"API response data: {data}")
+                    log_payload(logger, "API response data", data)
                     
                     # Check if the data matches the expected structure
                     if 'data' in data and 'stores' in data['data']:
@@ -488,38 +563,90 @@ class StoreLocatorAgent(Agent):
                         
                         # Special log for ZIP code 81775
                         if 'filters' in extracted_params.dict() and 'zipCode' in extracted_params.dict()['filters'] and extracted_params.dict()['filters']['zipCode'] == '81775':
-                            logging.warning(f"ZIP 81775 - Found {total} stores in response")
-                            logging.warning(f"ZIP 81775 - First store data: {stores[0].dict() if stores else 'No stores found'}")
+                            logger.warning("ZIP 81775 - Found %s stores in response", total)
+                            logger.warning("ZIP 81775 - First store data: %s", stores[0].dict() if stores else 'No stores found')
                         
                         if stores and len(stores) > 0:
-                            logging.debug(f"Found {len(stores)} stores, formatting results")
+                            logger.debug("Found %s stores, formatting results", len(stores))
                             formatted_response = self.format_store_results(stores, total, extracted_params)
                             final_response = response_prefix + formatted_response + "\n</store-locator-query>"
                             return StoreQueryOutput(response=final_response) if isinstance(query_input, StoreQueryInput) else final_response
                         else:
-                            logging.warning(f"No stores found in API response for params: {extracted_params}")
+                            logger.warning("No stores found in API response for params: %s", extracted_params)
                             result = f"I couldn't find any stores matching your criteria. Please try a different location or check your spelling."
                             final_response = response_prefix + result + "\n</store-locator-query>"
                             return StoreQueryOutput(response=final_response) if isinstance(query_input, StoreQueryInput) else final_response
                     else:
-                        logging.error(f"Unexpected API response structure: {data}")
+                        logger.error("Unexpected API response structure: %s", data)
                         result = f"I couldn't find any stores matching your criteria. Please try a different location or check your spelling."
                         final_response = response_prefix + result + "\n</store-locator-query>"
                         return StoreQueryOutput(response=final_response) if isinstance(query_input, StoreQueryInput) else final_response
                 except Exception as e:
-                    logging.error(f"Error processing API response: {str(e)}", exc_info=True)
+                    logger.error("Error processing API response: %s", str(e), exc_info=True)
                     result = f"Error processing store response: {str(e)}"
                     return StoreQueryOutput(response=result) if isinstance(query_input, StoreQueryInput) else result
             else:
-                logging.error(f"API error: {response.get('error', 'Unknown error')}")
+                logger.error("API error: %s", response.get('error', 'Unknown error'))
                 result = f"Error searching for stores: {response.get('error', 'Unknown error')}"
                 return StoreQueryOutput(response=result) if isinstance(query_input, StoreQueryInput) else result
                     
         except Exception as e:
-            logging.error(f"Error processing store query: {str(e)}", exc_info=True)
+            logger.error("Error processing store query: %s", str(e), exc_info=True)
             result = f"Error processing store location query: {str(e)}"
             return StoreQueryOutput(response=result) if isinstance(query_input, StoreQueryInput) else result
 
+    def nearest_request(self, query: str, search_params: StoreFilterParams) -> Optional[Tuple[int, Optional[float]]]:
+        """
+        Decide whether a query asks for the stores closest to a ZIP code
+        
+        Args:
+            query: The user's store location query
+            search_params: Parameters extracted from the query
+            
+        Returns:
+            (number of stores, radius in miles or None), or None for a plain filter search
+        """
+        if not search_params.filters.get('zipCode') or not _NEAREST_INTENT_RE.search(query):
+            return None
+        count_match = _NEAREST_COUNT_RE.search(query)
+        radius_match = _RADIUS_RE.search(query)
+        count = int(count_match.group(1)) if count_match else search_params.size
+        radius = float(radius_match.group(1)) if radius_match else None
+        return count, radius
+    
+    def find_nearest_stores(self, zip_code: str, count: int, radius_miles: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Find the stores closest to a ZIP code using the ZIP centroid index
+        
+        Args:
+            zip_code: ZIP code to search around
+            count: Maximum number of stores
+            radius_miles: Only return stores within this distance
+            
+        Returns:
+            Response in the same shape as find_stores(), with distanceMiles on
+            every store, or None if nearest-store search is unavailable
+        """
+        geo_index = get_store_geo_index()
+        if geo_index is None:
+            return None
+        data = geo_index.nearest(zip_code, count, radius_miles)
+        if data is None:
+            logger.debug("Could not locate ZIP %s for nearest-store search", zip_code)
+            return None
+        logger.debug("Found %s stores nearest to ZIP %s", data['data']['total'], zip_code)
+        return {
+            'success': True,
+            'data': data
+        }
+    
+    def is_empty_response(self, response: Dict[str, Any]) -> bool:
+        """Return True for a successful store search without any stores."""
+        if not response.get('success'):
+            return False
+        data = response.get('data') or {}
+        return isinstance(data, dict) and not (data.get('data') or {}).get('stores')
+    
     async def find_stores(self, search_params: StoreFilterParams) -> Dict[str, Any]:
         """
         Call the store API with the given search parameters
@@ -533,11 +660,22 @@ class StoreLocatorAgent(Agent):
         try:
             # Log API call parameters for debugging
             if 'filters' in search_params.dict() and 'zipCode' in search_params.dict()['filters'] and search_params.dict()['filters']['zipCode'] == '81775':
-                logging.warning(f"Making API call for ZIP 81775 with params: {json.dumps(search_params.dict())}")
+                logger.warning("Making API call for ZIP 81775 with params: %s", json.dumps(search_params.dict()))
             
             # Create a copy of the search params to avoid modifying the original
             params = {k: v for k, v in search_params.dict().items()}
             
+            # Answer from the embedded store index when possible
+            if self.store_index is not None:
+                data = self.store_index.search(params)
+                if data is not None:
+                    logger.debug("Answered store search from embedded index: %s stores", data['data']['total'])
+                    return {
+                        'success': True,
+                        'data': data
+                    }
+                logger.debug("Query needs full-text search, falling back to the store API")
+            
             # Get API URL from parameters or use default
             base_url = os.environ.get('NEXT_PUBLIC_API_BASE_URL', 'http://localhost:3000')
             api_url = f"{base_url}/api/stores"
@@ -549,31 +687,32 @@ class StoreLocatorAgent(Agent):
             }
             
             # Call API
-            logging.debug(f"API call to: {api_url}")
-            logging.debug(f"Request params: {params}")
+            logger.debug("API call to: %s", api_url)
+            logger.debug("Request params: %s", params)
             
-            # Send the HTTP request
-            async with httpx.AsyncClient() as session:
-                response = await session.post(api_url, json=params, headers=headers)
-                logging.debug(f"API response: {response.text[:200]}")
-                
-                # Handle response
-                if response.status_code == 200:
-                    data = response.json()
-                    return {
-                        'success': True,
-                        'data': data
-                    }
-                else:
-                    error_msg = f"API error (status {response.status_code}): {response.text}"
-                    logging.error(error_msg)
-                    return {
-                        'success': False,
-                        'error': error_msg
-                    }
+            # Send the HTTP request over the shared, pooled client
+            client = get_client()
+            response = await client.post(api_url, json=params, headers=headers,
+                                         timeout=endpoint_timeout('stores'))
+            logger.debug("API response: %s", response.text[:200])
+            
+            # Handle response
+            if response.status_code == 200:
+                data = response.json()
+                return {
+                    'success': True,
+                    'data': data
+                }
+            else:
+                error_msg = f"API error (status {response.status_code}): {response.text}"
+                logger.error(error_msg)
+                return {
+                    'success': False,
+                    'error': error_msg
+                }
         except Exception as e:
             error_msg = f"Exception in find_stores: {str(e)}"
-            logging.exception(error_msg)
+            logger.exception(error_msg)
             return {
                 'success': False,
                 'error': error_msg
@@ -0,0 +1,157 @@
+"""
+Gazetteer of store cities and US state names for the StoreLocatorAgent.
+
+Every known place name (the City column of the store dataset plus the full US
+state names) is inserted into a token trie once per process. A query is
+tokenized once and scanned left to right; at each token the trie is walked as
+far as the query allows and the longest complete name wins, so resolving a
+query costs O(query tokens x longest name) with no per-call regex compilation.
+Matching is case-insensitive and returns the canonical spelling.
+
+Configuration (environment variables):
+- STORE_INDEX_PATH: Store data file (.ndjson bulk file or .csv), shared with
+  the embedded store index
+"""
+import logging
+import os
+import re
+import threading
+from typing import Dict, List, NamedTuple, Optional
+
+from store_index import DEFAULT_STORE_INDEX_PATH, read_store_rows
+
+logger = logging.getLogger('agents.store_gazetteer')
+
+# Full state name -> two-letter code
+STATE_ABBREVS = {
+    'Alabama': 'AL', 'Alaska': 'AK', 'Arizona': 'AZ', 'Arkansas': 'AR', 'California': 'CA',
+    'Colorado': 'CO', 'Connecticut': 'CT', 'Delaware': 'DE', 'Florida': 'FL', 'Georgia': 'GA',
+    'Hawaii': 'HI', 'Idaho': 'ID', 'Illinois': 'IL', 'Indiana': 'IN', 'Iowa': 'IA',
+    'Kansas': 'KS', 'Kentucky': 'KY', 'Louisiana': 'LA', 'Maine': 'ME', 'Maryland': 'MD',
+    'Massachusetts': 'MA', 'Michigan': 'MI', 'Minnesota': 'MN', 'Mississippi': 'MS', 'Missouri': 'MO',
+    'Montana': 'MT', 'Nebraska': 'NE', 'Nevada': 'NV', 'New Hampshire': 'NH', 'New Jersey': 'NJ',
+    'New Mexico': 'NM', 'New York': 'NY', 'North Carolina': 'NC', 'North Dakota': 'ND', 'Ohio': 'OH',
+    'Oklahoma': 'OK', 'Oregon': 'OR', 'Pennsylvania': 'PA', 'Rhode Island': 'RI', 'South Carolina': 'SC',
+    'South Dakota': 'SD', 'Tennessee': 'TN', 'Texas': 'TX', 'Utah': 'UT', 'Vermont': 'VT',
+    'Virginia': 'VA', 'Washington': 'WA', 'West Virginia': 'WV', 'Wisconsin': 'WI', 'Wyoming': 'WY'
+}
+
+_TOKEN_RE = re.compile(r'\w+')
+
+# Trie key holding the {kind: canonical value} entries of names ending at a node
+# (tokens are never empty, so it cannot collide with a child)
+_TERMINAL = ''
+
+
+class GazetteerMatch(NamedTuple):
+    """A place name found in a query"""
+    kind: str    # 'city' or 'state'
+    value: str   # Canonical city name, or two-letter state code
+    start: int   # Character span of the match in the query
+    end: int
+
+
+class Gazetteer:
+    """Token trie of place names with longest-match lookup"""
+
+    def __init__(self):
+        self.trie: Dict[str, dict] = {}
+        self.size = 0
+
+    def add(self, name: str, kind: str, value: str) -> None:
+        """
+        Add a place name
+
+        Args:
+            name: Name as it appears in text (matched case-insensitively)
+            kind: 'city' or 'state'
+            value: Value reported for matches of this name
+        """
+        tokens = _TOKEN_RE.findall(name.lower())
+        if not tokens:
+            return
+        node = self.trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        terminal = node.setdefault(_TERMINAL, {})
+        if kind not in terminal:
+            self.size += 1
+        terminal.setdefault(kind, value)
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict[str, str]]) -> 'Gazetteer':
+        """
+        Build a gazetteer from store rows and the state name table
+
+        Args:
+            rows: Store documents keyed by the OpenSearch source field names
+
+        Returns:
+            Gazetteer with every store city and state name
+        """
+        gazetteer = cls()
+        for name, code in STATE_ABBREVS.items():
+            gazetteer.add(name, 'state', code)
+        for row in rows:
+            city = (row.get('City') or '').strip()
+            if city:
+                gazetteer.add(city, 'city', city)
+        return gazetteer
+
+    def find(self, text: str, kind: str) -> Optional[GazetteerMatch]:
+        """
+        Find the first (leftmost, then longest) name of a kind in text
+
+        Args:
+            text: Query text
+            kind: 'city' or 'state'
+
+        Returns:
+            GazetteerMatch, or None if no name of that kind occurs
+        """
+        tokens = [(m.group().lower(), m.start(), m.end()) for m in _TOKEN_RE.finditer(text)]
+        for i, (token, start, _) in enumerate(tokens):
+            node = self.trie.get(token)
+            best = None
+            j = i
+            while node is not None:
+                value = node.get(_TERMINAL, {}).get(kind)
+                if value is not None:
+                    best = GazetteerMatch(kind, value, start, tokens[j][2])
+                j += 1
+                if j == len(tokens):
+                    break
+                node = node.get(tokens[j][0])
+            if best:
+                return best
+        return None
+
+
+_gazetteer: Optional[Gazetteer] = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Gazetteer:
+    """
+    Get the process-wide gazetteer, building it on first use
+
+    If the store data file cannot be read, the gazetteer holds state names
+    only and city resolution falls back to the agent's heuristics.
+
+    Returns:
+        Gazetteer
+    """
+    global _gazetteer
+
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                path = os.environ.get('STORE_INDEX_PATH', DEFAULT_STORE_INDEX_PATH)
+                try:
+                    rows = read_store_rows(path)
+                except (OSError, ValueError) as e:
+                    logger.warning("Could not load store cities for the gazetteer from %s: %s", path, e)
+                    rows = []
+                _gazetteer = Gazetteer.from_rows(rows)
+                logger.debug("Built store gazetteer with %s names", _gazetteer.size)
+    return _gazetteer
@@ -0,0 +1,351 @@
+"""
+Nearest-store search for the StoreLocatorAgent.
+
+ZIP codes are resolved to latitude/longitude with an offline centroid table,
+the stores are geocoded from their ZIP codes once at load time, and a KD-tree
+over the stores answers k-nearest and radius queries ("closest 3 stores to
+81775", "stores within 25 miles of 42056") without calling /api/stores.
+
+Points are stored as 3D unit vectors, so the straight-line (chord) distance
+between two points orders them exactly like the great-circle distance and the
+tree needs no special handling near the poles or the antimeridian.
+
+The centroid table is the Census Bureau ZCTA gazetteer file (tab-separated,
+with GEOID, INTPTLAT and INTPTLONG columns) or any CSV with zip, lat and lon
+columns; external_services/OpenSearch_Loader/fetch-zip-centroids.sh downloads
+it. ZIP codes missing from the table fall back to the mean centroid of their
+three-digit ZIP prefix, and prefixes missing from the table to the closest
+known prefix (prefixes are assigned roughly geographically, so the numerically
+nearest one is in the same region).
+
+Until the gazetteer is downloaded, the bundled three-digit prefix table
+(zip3_centroids.csv, a CSV with zip3, lat and lon columns, derived from
+GeoNames postal code coordinates under CC BY 4.0) is used, so every ZIP code
+resolves to its prefix centroid and distances are accurate to tens of miles.
+Stores sharing a prefix then sit at the same point, so results put stores in
+the searched ZIP first and break distance ties by how close the store's ZIP is
+numerically; distances computed from a prefix centroid are flagged with
+distanceApproximate.
+
+Configuration (environment variables):
+- ZIP_CENTROIDS_PATH: ZIP centroid table (default: the downloaded gazetteer,
+  or the bundled prefix table if it has not been downloaded)
+- STORE_INDEX_PATH: Store data file (.ndjson bulk file or .csv)
+"""
+import bisect
+import csv
+import heapq
+import logging
+import math
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from store_index import DEFAULT_STORE_INDEX_PATH, SOURCE_FIELDS, read_store_rows
+
+logger = logging.getLogger('agents.store_geo')
+
+DEFAULT_ZIP_CENTROIDS_PATH = os.path.join('external_services', 'OpenSearch_Loader', 'zip_centroids.txt')
+BUNDLED_ZIP_CENTROIDS_PATH = os.path.join('external_services', 'OpenSearch_Loader', 'zip3_centroids.csv')
+
+EARTH_RADIUS_MILES = 3958.8
+
+Point = Tuple[float, float, float]
+
+
+def to_unit_vector(lat: float, lon: float) -> Point:
+    """Convert latitude/longitude in degrees to a point on the unit sphere."""
+    lat_r, lon_r = math.radians(lat), math.radians(lon)
+    cos_lat = math.cos(lat_r)
+    return (cos_lat * math.cos(lon_r), cos_lat * math.sin(lon_r), math.sin(lat_r))
+
+
+def chord_to_miles(chord: float) -> float:
+    """Great-circle distance in miles for a chord length on the unit sphere."""
+    return 2 * EARTH_RADIUS_MILES * math.asin(min(1.0, chord / 2))
+
+
+def miles_to_chord(miles: float) -> float:
+    """Chord length on the unit sphere for a great-circle distance in miles."""
+    return 2 * math.sin(min(math.pi, miles / EARTH_RADIUS_MILES) / 2)
+
+
+class ZipCentroids:
+    """ZIP code -> (lat, lon) table with a three-digit prefix fallback, or a prefix table alone"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.centroids: Dict[str, Tuple[float, float]] = {}
+        self.prefix_centroids: Dict[str, Tuple[float, float]] = {}
+        self._prefix_numbers: List[int] = []
+        self.load()
+
+    def load(self) -> None:
+        with open(self.path, newline='') as f:
+            sample = f.readline()
+            f.seek(0)
+            reader = csv.DictReader(f, delimiter='\t' if '\t' in sample else ',')
+            # Census headers carry trailing whitespace on the last column
+            fields = {name.strip().lower(): name for name in reader.fieldnames or []}
+            prefix_field = fields.get('zip3')
+            zip_field = fields.get('geoid') or fields.get('zip') or fields.get('zipcode') or prefix_field
+            lat_field = fields.get('intptlat') or fields.get('lat') or fields.get('latitude')
+            lon_field = fields.get('intptlong') or fields.get('lon') or fields.get('lng') or fields.get('longitude')
+            if not (zip_field and lat_field and lon_field):
+                raise ValueError(f"{self.path} has no ZIP/latitude/longitude columns")
+
+            centroids = {}
+            width = 3 if zip_field == prefix_field else 5
+            for row in reader:
+                try:
+                    centroids[row[zip_field].strip().zfill(width)] = (float(row[lat_field]), float(row[lon_field]))
+                except (TypeError, ValueError):
+                    continue
+
+        if width == 3:
+            self.centroids = {}
+            self.prefix_centroids = centroids
+            self._index_prefixes()
+            logger.info("Loaded %s ZIP prefix centroids from %s", len(centroids), self.path)
+            return
+
+        # Mean centroid per three-digit prefix, for ZIPs missing from the table
+        sums: Dict[str, List[float]] = {}
+        for zip_code, (lat, lon) in centroids.items():
+            total = sums.setdefault(zip_code[:3], [0.0, 0.0, 0])
+            total[0] += lat
+            total[1] += lon
+            total[2] += 1
+        self.centroids = centroids
+        self.prefix_centroids = {prefix: (lat / n, lon / n) for prefix, (lat, lon, n) in sums.items()}
+        self._index_prefixes()
+        logger.info("Loaded %s ZIP centroids from %s", len(centroids), self.path)
+
+    def _index_prefixes(self) -> None:
+        self._prefix_numbers = sorted(int(prefix) for prefix in self.prefix_centroids if prefix.isdigit())
+
+    def closest_prefix(self, prefix: str) -> Optional[str]:
+        """
+        Find the numerically closest known three-digit prefix
+
+        Args:
+            prefix: Three-digit ZIP prefix
+
+        Returns:
+            The prefix itself if known, the closest known one (the lower on a
+            tie), or None if prefix is not numeric or the table is empty
+        """
+        if prefix in self.prefix_centroids:
+            return prefix
+        if not prefix.isdigit() or not self._prefix_numbers:
+            return None
+        number = int(prefix)
+        position = bisect.bisect_left(self._prefix_numbers, number)
+        candidates = self._prefix_numbers[max(0, position - 1):position + 1]
+        return f"{min(candidates, key=lambda candidate: abs(candidate - number)):03d}"
+
+    def is_exact(self, zip_code: str) -> bool:
+        """Return True if the ZIP code has its own centroid rather than a prefix one."""
+        return (zip_code or '').strip()[:5] in self.centroids
+
+    def lookup(self, zip_code: str) -> Optional[Tuple[float, float]]:
+        """
+        Resolve a ZIP code to a centroid
+
+        Args:
+            zip_code: Five-digit ZIP code (ZIP+4 suffixes are ignored)
+
+        Returns:
+            (lat, lon), or None if the ZIP code is not numeric
+        """
+        zip_code = (zip_code or '').strip()[:5]
+        location = self.centroids.get(zip_code)
+        if location is not None:
+            return location
+        prefix = self.closest_prefix(zip_code[:3])
+        return None if prefix is None else self.prefix_centroids[prefix]
+
+
+class KDTree:
+    """Static 3-d tree over unit-sphere points with k-nearest and radius search"""
+
+    def __init__(self, points: List[Point], payloads: List[Any]):
+        self.points = points
+        self.payloads = payloads
+        # Implicit tree: node = (index, axis, left, right)
+        self.root = self._build(list(range(len(points))), 0)
+
+    def _build(self, indexes: List[int], depth: int):
+        if not indexes:
+            return None
+        axis = depth % 3
+        indexes.sort(key=lambda i: self.points[i][axis])
+        mid = len(indexes) // 2
+        return (indexes[mid], axis,
+                self._build(indexes[:mid], depth + 1),
+                self._build(indexes[mid + 1:], depth + 1))
+
+    def nearest(self, point: Point, k: int, max_chord: float = float('inf')) -> List[Tuple[float, Any]]:
+        """
+        Find the k closest points within max_chord
+
+        Args:
+            point: Query point on the unit sphere
+            k: Maximum number of results
+            max_chord: Maximum chord distance
+
+        Returns:
+            (chord distance, payload) pairs, closest first
+        """
+        if k <= 0:
+            return []
+        # Max-heap of the best k so far, as (-distance, index)
+        best: List[Tuple[float, int]] = []
+        max_sq = max_chord * max_chord
+        # (node, squared distance from the query to the node's region along one axis)
+        stack = [(self.root, 0.0)]
+        px, py, pz = point
+        while stack:
+            node, plane_sq = stack.pop()
+            if node is None:
+                continue
+            # Skip regions that cannot hold anything closer than the current bound
+            if plane_sq > (max_sq if len(best) < k else min(max_sq, -best[0][0])):
+                continue
+            index, axis, left, right = node
+            x, y, z = self.points[index]
+            dist_sq = (x - px) ** 2 + (y - py) ** 2 + (z - pz) ** 2
+            if dist_sq <= max_sq:
+                if len(best) < k:
+                    heapq.heappush(best, (-dist_sq, index))
+                elif dist_sq < -best[0][0]:
+                    heapq.heapreplace(best, (-dist_sq, index))
+
+            diff = point[axis] - self.points[index][axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            stack.append((far, diff * diff))
+            stack.append((near, plane_sq))
+
+        return [(math.sqrt(-neg_sq), self.payloads[index]) for neg_sq, index in sorted(best, reverse=True)]
+
+
+class StoreGeoIndex:
+    """Stores geocoded by ZIP centroid, indexed for nearest-store queries"""
+
+    def __init__(self, store_path: str, centroids: ZipCentroids):
+        self.store_path = store_path
+        self.centroids = centroids
+        self.mtime = None
+        self.tree: Optional[KDTree] = None
+        self.geocoded = 0
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        rows = read_store_rows(self.store_path)
+        points, stores = [], []
+        for row in rows:
+            location = self.centroids.lookup(str(row.get('ZIP_Code', '')))
+            if location is None:
+                logger.warning("Store %s has no usable ZIP code (%r), leaving it out of nearest-store search",
+                               row.get('Store_Number', ''), row.get('ZIP_Code', ''))
+                continue
+            points.append(to_unit_vector(*location))
+            store = {api: str(row.get(source, '')) for source, api in SOURCE_FIELDS.items()}
+            stores.append((store, self.centroids.is_exact(store['zipCode'])))
+
+        self.tree = KDTree(points, stores)
+        self.geocoded = len(stores)
+        self.mtime = os.path.getmtime(self.store_path)
+        logger.info("Geocoded %s of %s stores from %s", self.geocoded, len(rows), self.store_path)
+
+    def reload_if_changed(self) -> None:
+        """Rebuild the index if the store data file changed on disk."""
+        try:
+            mtime = os.path.getmtime(self.store_path)
+        except OSError:
+            return
+        if mtime != self.mtime:
+            with self._lock:
+                if mtime != self.mtime:
+                    self.load()
+
+    def nearest(self, zip_code: str, k: int = 5, radius_miles: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Find the stores closest to a ZIP code
+
+        Stores in the searched ZIP code come first. Stores at the same
+        distance, such as every store sharing a prefix centroid, are ordered
+        by how close their ZIP code is numerically to the searched one.
+
+        Args:
+            zip_code: ZIP code to search around
+            k: Maximum number of stores
+            radius_miles: Only return stores within this distance
+
+        Returns:
+            Store API-shaped response body whose stores carry distanceMiles and
+            distanceApproximate (True when either end was located by its ZIP
+            prefix), or None if the ZIP code cannot be located
+        """
+        self.reload_if_changed()
+        zip_code = (zip_code or '').strip()[:5]
+        location = self.centroids.lookup(zip_code)
+        if location is None or k <= 0:
+            return None if location is None else {'data': {'stores': [], 'total': 0}}
+        point = to_unit_vector(*location)
+        max_chord = miles_to_chord(radius_miles) if radius_miles else float('inf')
+        matches = self.tree.nearest(point, k, max_chord)
+        if matches:
+            # Widen to every store tied with the k-th one, so ties are broken
+            # by ZIP code rather than by file order
+            max_chord = min(max_chord, matches[-1][0] + 1e-9)
+            matches = self.tree.nearest(point, len(self.tree.points), max_chord)
+
+        def rank(match):
+            chord, (store, _) = match
+            return (store['zipCode'] != zip_code, round(chord, 9), zip_gap(store['zipCode'], zip_code))
+
+        query_exact = self.centroids.is_exact(zip_code)
+        stores = [
+            dict(store, distanceMiles=round(chord_to_miles(chord), 1),
+                 distanceApproximate=not (query_exact and store_exact))
+            for chord, (store, store_exact) in sorted(matches, key=rank)[:k]
+        ]
+        return {'data': {'stores': stores, 'total': len(stores)}}
+
+
+def zip_gap(zip_code: str, other: str) -> int:
+    """Numeric distance between two ZIP codes, larger than any real gap if either is not numeric."""
+    if zip_code.isdigit() and other.isdigit():
+        return abs(int(zip_code) - int(other))
+    return 10 ** 6
+
+
+_store_geo_index: Optional[StoreGeoIndex] = None
+_store_geo_index_failed = False
+_store_geo_index_lock = threading.Lock()
+
+
+def get_store_geo_index() -> Optional[StoreGeoIndex]:
+    """
+    Get the process-wide nearest-store index, loading it on first use
+
+    Returns:
+        StoreGeoIndex, or None if the centroid table or store data is unavailable
+    """
+    global _store_geo_index, _store_geo_index_failed
+
+    if _store_geo_index is None and not _store_geo_index_failed:
+        with _store_geo_index_lock:
+            if _store_geo_index is None and not _store_geo_index_failed:
+                centroid_path = os.environ.get('ZIP_CENTROIDS_PATH') or (
+                    DEFAULT_ZIP_CENTROIDS_PATH if os.path.exists(DEFAULT_ZIP_CENTROIDS_PATH)
+                    else BUNDLED_ZIP_CENTROIDS_PATH)
+                store_path = os.environ.get('STORE_INDEX_PATH', DEFAULT_STORE_INDEX_PATH)
+                try:
+                    _store_geo_index = StoreGeoIndex(store_path, ZipCentroids(centroid_path))
+                except (OSError, ValueError) as e:
+                    logger.warning("Nearest-store search disabled, could not load %s or %s: %s", centroid_path, store_path, e)
+                    _store_geo_index_failed = True
+    return _store_geo_index
@@ -0,0 +1,242 @@
+"""
+Embedded store index for the StoreLocatorAgent.
+
+The store dataset is small (about 1,000 rows), so instead of round-tripping
+through /api/stores and OpenSearch the agent can answer filter lookups from
+in-memory hash indexes built once per process:
+
+- State code -> row ids
+- ZIP code -> row ids
+- Lowercased city -> row ids, plus a sorted city list for prefix lookups and
+  difflib-based fuzzy matching of misspelled cities
+
+Matching mirrors the OpenSearch query built by app/services/store.service.ts:
+city is a case-insensitive prefix match (match_phrase_prefix on City.lowercase),
+state and ZIP are exact matches. Requests that would need full-text scoring
+return None so the caller can fall back to the HTTP path.
+
+The index reloads itself when the source file changes on disk.
+
+Configuration (environment variables):
+- STORE_LOCATOR_EMBEDDED: Set to "true" to enable the embedded index
+- STORE_INDEX_PATH: Store data file (.ndjson bulk file or .csv)
+"""
+import bisect
+import csv
+import difflib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger('agents.store_index')
+
+DEFAULT_STORE_INDEX_PATH = os.path.join('external_services', 'OpenSearch_Loader', 'stores_bulk_data.ndjson')
+
+# OpenSearch source field -> store API field
+SOURCE_FIELDS = {
+    'Store_Number': 'storeNumber',
+    'Store_Name': 'storeName',
+    'Address': 'address',
+    'City': 'city',
+    'State': 'state',
+    'ZIP_Code': 'zipCode',
+    'Phone_Number': 'phoneNumber',
+}
+
+
+def embedded_mode_enabled() -> bool:
+    """Return True if STORE_LOCATOR_EMBEDDED enables the embedded store index."""
+    return os.environ.get('STORE_LOCATOR_EMBEDDED', 'false').lower() == 'true'
+
+
+def read_store_rows(path: str) -> List[Dict[str, str]]:
+    """
+    Read store documents from an OpenSearch bulk NDJSON file or a CSV file
+    
+    Args:
+        path: Path to stores_bulk_data.ndjson or cleaned_stores.csv
+        
+    Returns:
+        List of rows keyed by the OpenSearch source field names
+    """
+    if path.endswith('.csv'):
+        with open(path, newline='') as f:
+            return list(csv.DictReader(f))
+    
+    rows = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            doc = json.loads(line)
+            # Skip the bulk API action lines
+            if 'index' in doc and len(doc) == 1:
+                continue
+            rows.append(doc)
+    return rows
+
+
+def uses_text_search(query: str, filters: Dict[str, Any]) -> bool:
+    """
+    Return True if the store service would add a full-text clause for this query
+    
+    Mirrors queryContainsLocationInfo in app/services/store.service.ts: the text
+    query is ignored when it just restates the location filters.
+    """
+    if not query or not query.strip():
+        return False
+    query_lower = query.lower()
+    city, state, zip_code = filters.get('city'), filters.get('state'), filters.get('zipCode')
+    contains_location = (
+        'stores in' in query_lower
+        or 'find stores' in query_lower
+        or bool(zip_code and (zip_code in query or 'zip' in query_lower))
+        or bool(state and (state in query or state.lower() in query_lower))
+        or bool(city and (city in query or city.lower() in query_lower))
+    )
+    return not contains_location
+
+
+class StoreIndex:
+    """
+    In-memory hash indexes over the store dataset.
+    
+    Attributes:
+        path: Source data file
+        stores: Store records in store API format, in file order
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.stores: List[Dict[str, str]] = []
+        self.by_state: Dict[str, List[int]] = {}
+        self.by_zip: Dict[str, List[int]] = {}
+        self.by_city: Dict[str, List[int]] = {}
+        self.city_keys: List[str] = []
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+        self.load()
+    
+    def load(self) -> None:
+        """(Re)build every index from the source file."""
+        mtime = os.stat(self.path).st_mtime
+        stores = []
+        by_state: Dict[str, List[int]] = {}
+        by_zip: Dict[str, List[int]] = {}
+        by_city: Dict[str, List[int]] = {}
+        
+        for row in read_store_rows(self.path):
+            store = {api_field: str(row.get(source_field, '')) for source_field, api_field in SOURCE_FIELDS.items()}
+            row_id = len(stores)
+            stores.append(store)
+            by_state.setdefault(store['state'], []).append(row_id)
+            by_zip.setdefault(store['zipCode'], []).append(row_id)
+            by_city.setdefault(store['city'].lower(), []).append(row_id)
+        
+        # Swap the new indexes in together so readers never see a partial build
+        self.stores, self.by_state, self.by_zip, self.by_city = stores, by_state, by_zip, by_city
+        self.city_keys = sorted(by_city)
+        self._mtime = mtime
+        logger.info("Loaded %s stores into the embedded store index from %s", len(stores), self.path)
+    
+    def reload_if_changed(self) -> None:
+        """Rebuild the indexes if the source file was modified since the last load."""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self.load()
+    
+    def city_ids(self, city: str, fuzzy: bool = True) -> List[int]:
+        """
+        Row ids of stores whose city starts with the given text (case-insensitive)
+        
+        Args:
+            city: Full or partial city name
+            fuzzy: If no city has that prefix, fall back to close spellings
+            
+        Returns:
+            Sorted row ids
+        """
+        prefix = city.lower().strip()
+        start = bisect.bisect_left(self.city_keys, prefix)
+        ids: List[int] = []
+        for key in self.city_keys[start:]:
+            if not key.startswith(prefix):
+                break
+            ids.extend(self.by_city[key])
+        
+        if not ids and fuzzy:
+            for key in difflib.get_close_matches(prefix, self.city_keys, n=3, cutoff=0.85):
+                logger.debug("Fuzzy city match: %s -> %s", city, key)
+                ids.extend(self.by_city[key])
+        return sorted(ids)
+    
+    def search(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Answer a store search locally
+        
+        Args:
+            params: Store search request body (query, filters, size, page)
+            
+        Returns:
+            Store API response body ({'success': True, 'data': {'stores', 'total'}}),
+            or None if the request needs the full-text search of the HTTP path
+        """
+        self.reload_if_changed()
+        
+        query = params.get('query') or ''
+        filters = {k: v for k, v in (params.get('filters') or {}).items() if v}
+        if uses_text_search(query, filters):
+            return None
+        
+        # Intersect the row ids matched by each filter (all id lists are sorted)
+        candidates: Optional[List[int]] = None
+        for field in ('zipCode', 'state', 'city'):
+            if field not in filters:
+                continue
+            value = str(filters[field])
+            if field == 'city':
+                ids = self.city_ids(value)
+            else:
+                ids = (self.by_zip if field == 'zipCode' else self.by_state).get(value, [])
+            candidates = ids if candidates is None else sorted(set(candidates).intersection(ids))
+        if candidates is None:
+            candidates = range(len(self.stores))
+        
+        size = int(params.get('size') or 10)
+        page = int(params.get('page') or 1)
+        start = (page - 1) * size
+        stores = [dict(self.stores[i]) for i in candidates[start:start + size]]
+        return {'success': True, 'data': {'stores': stores, 'total': len(candidates)}}
+
+
+_store_index: Optional[StoreIndex] = None
+_store_index_lock = threading.Lock()
+
+
+def get_store_index() -> Optional[StoreIndex]:
+    """
+    Get the process-wide store index, loading it on first use
+    
+    Returns:
+        StoreIndex, or None if the source file could not be loaded
+    """
+    global _store_index
+    
+    if _store_index is None:
+        with _store_index_lock:
+            if _store_index is None:
+                path = os.environ.get('STORE_INDEX_PATH', DEFAULT_STORE_INDEX_PATH)
+                try:
+                    _store_index = StoreIndex(path)
+                except (OSError, ValueError) as e:
+                    logger.error("Could not load embedded store index from %s: %s", path, e)
+                    return None
+    return _store_index
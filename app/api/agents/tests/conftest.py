@@ -0,0 +1,10 @@
+"""
+Shared setup for the agent module tests.
+
+The agent modules import each other by plain name, so the agents directory
+is put on sys.path the way running an agent script does.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,61 @@
+"""
+Tests for the embedded catalog engine reloading its source file.
+"""
+import os
+import shutil
+
+import pytest
+
+from catalog_engine import DEFAULT_CATALOG_PATH, CatalogEngine
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..'))
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    path = tmp_path / 'catalog.csv'
+    shutil.copy(os.path.join(REPO_ROOT, DEFAULT_CATALOG_PATH), path)
+    return path
+
+
+def bump_mtime(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_search_answers_from_the_loaded_catalog(catalog):
+    result = CatalogEngine(str(catalog)).search({'query': 'phones', 'size': 5})
+
+    assert result['success'] is True
+    assert len(result['data']['products']) == 5
+    assert result['data']['total'] > 5
+
+
+def test_truncated_catalog_keeps_previous_products(catalog):
+    engine = CatalogEngine(str(catalog))
+    loaded = len(engine.rows)
+
+    catalog.write_text('')
+    bump_mtime(catalog)
+
+    assert engine.search({'query': 'phones', 'size': 5})['data']['total'] == loaded
+    assert len(engine.rows) == loaded
+
+
+def test_unparseable_catalog_keeps_previous_products(tmp_path):
+    path = tmp_path / 'bulk_data.ndjson'
+    path.write_text('{"index": {}}\n{"SKU_ID": "A1", "Price": 199}\n'
+                    '{"index": {}}\n{"SKU_ID": "B2", "Price": 299}\n')
+    engine = CatalogEngine(str(path))
+
+    path.write_text('{"index": {}}\n{"SKU_ID": \n')
+    bump_mtime(path)
+
+    assert engine.search({'query': 'phones', 'size': 5})['data']['total'] == 2
+
+
+def test_empty_catalog_defers_to_the_api(tmp_path):
+    path = tmp_path / 'catalog.csv'
+    path.write_text('')
+
+    assert CatalogEngine(str(path)).search({'query': 'phones'}) is None
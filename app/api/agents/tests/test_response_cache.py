@@ -0,0 +1,96 @@
+"""
+Tests for AsyncTTLCache request coalescing and invalidation.
+"""
+import asyncio
+
+from response_cache import AsyncTTLCache
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_cancelling_one_caller_does_not_cancel_the_others():
+    async def scenario():
+        cache = AsyncTTLCache()
+        calls = 0
+
+        async def slow():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return 'value'
+
+        first = asyncio.create_task(cache.get_or_fetch('k', slow))
+        second = asyncio.create_task(cache.get_or_fetch('k', slow))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        results = await asyncio.gather(first, second, return_exceptions=True)
+        return cache, calls, results
+
+    cache, calls, results = run(scenario())
+
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert results[1] == 'value'
+    assert calls == 1
+    assert cache.get('k') == 'value'
+
+
+def test_fetch_survives_when_every_caller_is_cancelled():
+    async def scenario():
+        cache = AsyncTTLCache()
+
+        async def slow():
+            await asyncio.sleep(0.02)
+            return 'value'
+
+        caller = asyncio.create_task(cache.get_or_fetch('k', slow))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.sleep(0.05)
+        return cache
+
+    assert run(scenario()).get('k') == 'value'
+
+
+def test_fetch_started_before_invalidate_is_not_cached():
+    async def scenario():
+        cache = AsyncTTLCache()
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(0.02)
+            return 'old'
+
+        caller = asyncio.create_task(cache.get_or_fetch('k', slow))
+        await started.wait()
+        cache.invalidate()
+        value = await caller
+        return cache, value
+
+    cache, value = run(scenario())
+
+    assert value == 'old'
+    assert cache.get('k') is None
+
+
+def test_exceptions_reach_every_waiter_and_are_not_cached():
+    async def scenario():
+        cache = AsyncTTLCache()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError('upstream down')
+
+        results = await asyncio.gather(
+            cache.get_or_fetch('k', failing),
+            cache.get_or_fetch('k', failing),
+            return_exceptions=True
+        )
+        return cache, results
+
+    cache, results = run(scenario())
+
+    assert [type(result) for result in results] == [RuntimeError, RuntimeError]
+    assert cache.get('k') is None
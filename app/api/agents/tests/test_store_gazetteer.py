@@ -0,0 +1,106 @@
+"""
+Tests for the store gazetteer and StoreLocatorAgent's city/state resolution.
+
+The expected parameters in PARSER_CASES are the outputs of the regex-only
+parser the gazetteer replaced, for the queries in test-store-locator-agent.js
+(including its known quirks, such as reading "me" as the state ME).
+GAZETTEER_CASES cover what the gazetteer resolves that the heuristics did not.
+"""
+import importlib.util
+import os
+
+import pytest
+
+from store_gazetteer import Gazetteer, GazetteerMatch
+from store_index import DEFAULT_STORE_INDEX_PATH
+
+AGENTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_ROOT = os.path.abspath(os.path.join(AGENTS_DIR, '..', '..', '..'))
+
+# query -> (search query text, filters)
+PARSER_CASES = {
+    'Find stores in Port Ericmouth': ('stores in port ericmouth', {'city': 'Port Ericmouth'}),
+    'Show me stores in South Bruce': ('me stores in south bruce', {'city': 'South Bruce', 'state': 'ME'}),
+    'Where are your stores in Thomasfort': ('where are your stores in thomasfort', {'city': 'Thomasfort'}),
+    'Stores in East David': ('stores in east david', {'city': 'East David'}),
+    'Find stores in Parkville': ('stores in parkville', {'city': 'Parkville'}),
+    'Locate stores in Johnport': ('locate stores in johnport', {'city': 'Johnport'}),
+    'Find stores in FL': ('stores in fl', {'state': 'FL'}),
+    'Show me stores in CA': ('me stores in ca', {'state': 'CA'}),
+    'Stores in NY': ('stores in ny', {'state': 'NY'}),
+    'Find stores in HI': ('stores in hi', {'state': 'HI'}),
+    'List all stores in IL': ('list all stores in il', {'state': 'IL'}),
+    'Find stores near 42056': ('stores near 42056', {'zipCode': '42056'}),
+    'Show me stores in ZIP 76610': ('me stores in zip 76610', {'zipCode': '76610', 'city': 'ZIP', 'state': 'ME'}),
+    'Stores in 52089 area': ('stores in 52089 area', {'zipCode': '52089', 'city': 'area'}),
+    'Find stores in 80612 ZIP code': ('stores in 80612 zip code', {'zipCode': '80612', 'city': 'ZIP code'}),
+    'Find stores in 81775': ('stores in 81775', {'zipCode': '81775'}),
+    'Find stores in Thomasfort, FL': ('stores in thomasfort, fl', {'city': 'Thomasfort', 'state': 'FL'}),
+    'Show me stores in Carrollmouth, CA': ('me stores in carrollmouth, ca', {'city': 'Carrollmouth', 'state': 'CA'}),
+    'Stores in Port Cynthiaburgh, CA 17919': ('stores in port cynthiaburgh, ca 17919', {'zipCode': '17919', 'city': 'Port Cynthiaburgh', 'state': 'CA'}),
+    'Stores in Port Eric': ('stores in port eric', {'city': 'Port Eric'}),
+    'Find stores in Thomas': ('stores in thomas', {'city': 'Thomas'}),
+    'Find stores in 420': ('stores in 420', {'city': '420'}),
+    'Find stores': ('Find stores', {}),
+    'Show me all stores': ('me all stores', {'state': 'ME'}),
+    'Stores nearest to me': ('stores nearest to me', {'state': 'ME'}),
+    'Find stores in InvalidCity': ('stores in invalidcity', {'city': 'InvalidCity'}),
+    'Show me stores in ZZ': ('me stores in zz', {'city': 'ZZ', 'state': 'ME'}),
+    'Stores in 00000': ('stores in 00000', {'zipCode': '00000'}),
+    'Where is your closest store': ('Where is your closest store', {}),
+    'Find stores in ZIP code 81775': ('', {'zipCode': '81775'}),
+}
+
+# Cases the gazetteer resolves by longest match against the store dataset
+GAZETTEER_CASES = {
+    'find stores in South Bruce today': ('stores in south bruce today', {'city': 'South Bruce'}),
+    'Where are your stores in Port Monicaport?': ('where are your stores in port monicaport?', {'city': 'Port Monicaport'}),
+    'Is there a store in lake ericaville': ('is there a store in lake ericaville', {'city': 'Lake Ericaville'}),
+    'Find stores in Texas': ('stores in texas', {'state': 'TX'}),
+    'Any shops at Port Kevin, North Carolina': ('any shops at port kevin, north carolina', {'city': 'Port Kevin', 'state': 'NC'}),
+}
+
+
+@pytest.fixture(scope='module')
+def agent(tmp_path_factory):
+    pytest.importorskip('pydantic_ai')
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv('STORE_INDEX_PATH', os.path.join(REPO_ROOT, DEFAULT_STORE_INDEX_PATH))
+        monkeypatch.setenv('AGENT_LOG_FILE', str(tmp_path_factory.mktemp('logs') / 'app.log'))
+        path = os.path.join(AGENTS_DIR, 'store-locator_agent.py')
+        spec = importlib.util.spec_from_file_location('store_locator_agent', path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        yield module.StoreLocatorAgent()
+
+
+@pytest.mark.parametrize('query', list(PARSER_CASES) + list(GAZETTEER_CASES))
+def test_extract_search_params(agent, query):
+    params = agent.extract_search_params(query)
+
+    assert (params.query, params.filters) == {**PARSER_CASES, **GAZETTEER_CASES}[query]
+
+
+def test_parser_cases_cover_the_store_locator_test_queries():
+    with open(os.path.join(REPO_ROOT, 'test-store-locator-agent.js')) as f:
+        source = f.read()
+    block = source[source.index('const TEST_QUERIES'):]
+    block = block[:block.index('];')]
+
+    for query in PARSER_CASES:
+        assert f"'{query}'" in block
+
+
+@pytest.fixture
+def gazetteer():
+    return Gazetteer.from_rows([{'City': 'Port Kevin'}, {'City': 'Port'}, {'City': 'South Bruce'}])
+
+
+def test_longest_city_name_wins(gazetteer):
+    assert gazetteer.find('stores in port kevin today', 'city') == GazetteerMatch('city', 'Port Kevin', 10, 20)
+    assert gazetteer.find('stores in Port', 'city') == GazetteerMatch('city', 'Port', 10, 14)
+
+
+def test_state_names_resolve_to_codes(gazetteer):
+    assert gazetteer.find('stores in north carolina', 'state').value == 'NC'
+    assert gazetteer.find('stores in south bruce', 'state') is None
@@ -0,0 +1,73 @@
+"""
+Tests for nearest-store search over the bundled ZIP prefix centroids.
+"""
+import json
+import os
+
+import pytest
+
+from store_geo import BUNDLED_ZIP_CENTROIDS_PATH, StoreGeoIndex, ZipCentroids
+from store_index import DEFAULT_STORE_INDEX_PATH, read_store_rows
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..'))
+
+
+@pytest.fixture(scope='module')
+def centroids():
+    return ZipCentroids(os.path.join(REPO_ROOT, BUNDLED_ZIP_CENTROIDS_PATH))
+
+
+@pytest.fixture(scope='module')
+def store_path():
+    return os.path.join(REPO_ROOT, DEFAULT_STORE_INDEX_PATH)
+
+
+def test_unknown_prefix_resolves_to_closest_known_prefix(centroids):
+    assert '817' not in centroids.prefix_centroids
+
+    assert centroids.closest_prefix('817') in ('816', '818', '820')
+    assert centroids.lookup('81775') == centroids.prefix_centroids[centroids.closest_prefix('817')]
+
+
+def test_non_numeric_zip_is_not_located(centroids):
+    assert centroids.lookup('abcde') is None
+    assert centroids.lookup('') is None
+
+
+def test_every_bundled_store_is_geocoded(centroids, store_path):
+    index = StoreGeoIndex(store_path, centroids)
+
+    assert index.geocoded == len(read_store_rows(store_path))
+
+
+def test_nearest_stores_to_a_zip_with_an_unlisted_prefix(centroids, store_path):
+    result = StoreGeoIndex(store_path, centroids).nearest('81775', k=3)
+
+    stores = result['data']['stores']
+    assert len(stores) == 3
+    assert [store['distanceMiles'] for store in stores] == sorted(store['distanceMiles'] for store in stores)
+    assert all(store['distanceApproximate'] for store in stores)
+
+
+def test_store_in_the_searched_zip_comes_first(centroids, store_path):
+    for k in (1, 3, 5):
+        stores = StoreGeoIndex(store_path, centroids).nearest('81775', k=k)['data']['stores']
+
+        assert stores[0]['zipCode'] == '81775'
+
+
+def write_stores(path, zip_codes):
+    with open(path, 'w') as f:
+        for number, zip_code in enumerate(zip_codes, 1):
+            f.write(json.dumps({'index': {'_index': 'stores', '_id': str(number)}}) + '\n')
+            f.write(json.dumps({'Store_Number': str(number), 'Store_Name': f'Store {number}',
+                                'ZIP_Code': zip_code}) + '\n')
+
+
+def test_stores_sharing_a_prefix_are_ordered_by_zip_closeness(tmp_path, centroids):
+    path = tmp_path / 'stores.ndjson'
+    write_stores(path, ['42099', '42010', '42060', '42050', '42001'])
+
+    stores = StoreGeoIndex(str(path), centroids).nearest('42056', k=4)['data']['stores']
+
+    assert [store['zipCode'] for store in stores] == ['42060', '42050', '42099', '42010']
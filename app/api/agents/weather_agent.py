@@ -2,14 +2,63 @@ from pydantic_ai import Agent
 from pydantic import BaseModel
 from typing import Optional, Dict, Any, List
 from collections.abc import Sequence
-import httpx
 import json
 import os
 import logging
+import re
 
-# Configure logging to write to a file
-logging.basicConfig(filename='logs/app.log', level=logging.INFO, 
-                    format='%(asctime)s - %(levelname)s - %(message)s')
+from agent_http import endpoint_timeout, get_client
+from agent_logging import get_logger
+from agent_patterns import lazy_compile
+from geocode_memo import DEFAULT_GEOCODE_MEMO_PATH, GeocodeMemo
+from response_cache import AsyncTTLCache
+
+logger = get_logger('weather')
+
+# Seconds a forecast stays fresh, by timeframe. NWS updates forecasts about hourly;
+# a "now" answer should track that closely, a weekly outlook barely moves.
+# Override with WEATHER_CACHE_TTL_<TIMEFRAME>, e.g. WEATHER_CACHE_TTL_NOW.
+DEFAULT_FORECAST_TTLS = {
+    'now': 600.0,
+    'today': 1800.0,
+    'tonight': 1800.0,
+    'tomorrow': 3600.0,
+    'week': 10800.0,
+}
+
+# Process-wide forecast cache keyed on (resolved location, timeframe). Expired
+# forecasts are still served for WEATHER_CACHE_STALE seconds while they refresh
+# in the background, so a popular city never waits on /api/weather.
+forecast_cache = AsyncTTLCache(
+    maxsize=int(os.environ.get('WEATHER_CACHE_SIZE', '512')),
+    ttl=DEFAULT_FORECAST_TTLS['now'],
+    stale_ttl=float(os.environ.get('WEATHER_CACHE_STALE', '1800'))
+)
+
+# Persistent city -> resolved location memo shared by all agent processes
+geocode_memo = GeocodeMemo(os.environ.get('WEATHER_GEOCODE_PATH', DEFAULT_GEOCODE_MEMO_PATH))
+
+# Patterns tried in order by WeatherAgent.extract_city, compiled on first use
+_CITY_PATTERNS = tuple(lazy_compile(pattern, re.IGNORECASE) for pattern in (
+    r'(?:weather|temperature|forecast|rain|sunny|cloudy|snow)(?:\s+(?:like|for|in|at|near|of))?\s+(?:in\s+)?([A-Za-z\s]+)(?:\?|$|,|\.|!)',
+    r'(?:in|at|near|for)\s+([A-Za-z\s]+)(?:\?|$|,|\.|!)',
+    r'(?:what\'s|what is|how\'s|how is)(?:\s+the)?\s+(?:weather|temperature|forecast)(?:\s+(?:like|in|at|near))?\s+(?:in\s+)?([A-Za-z\s]+)(?:\?|$|,|\.|!)',
+))
+
+def forecast_ttl(timeframe: str) -> float:
+    """Return the seconds a forecast for timeframe stays fresh."""
+    default = DEFAULT_FORECAST_TTLS.get(timeframe, DEFAULT_FORECAST_TTLS['now'])
+    try:
+        return float(os.environ.get(f"WEATHER_CACHE_TTL_{timeframe.upper()}", default))
+    except ValueError:
+        return default
+
+def weather_cache_stats() -> Dict[str, Any]:
+    """Return the counters of the forecast cache and the geocode memo."""
+    return {
+        'forecasts': forecast_cache.stats(),
+        'geocode': geocode_memo.stats(),
+    }
 
 # Define the input model with proper type annotations
 class WeatherInput(BaseModel):
@@ -47,6 +96,10 @@ class WeatherAgent(Agent):
         """
         Get weather information for a specific city.
         
+        Forecasts are served from forecast_cache. Cities resolved before are
+        looked up under their resolved location, so "austin" and "Austin, TX"
+        share one entry once either has been fetched.
+        
         Args:
             input: WeatherInput containing city and optional timeframe
             
@@ -55,56 +108,89 @@ class WeatherAgent(Agent):
         """
         try:
             base_url = os.environ.get('NEXT_PUBLIC_BASE_URL', 'http://localhost:3000')
-            weather_api_endpoint = f"{base_url}/api/weather"
-            
-            # Prepare the request payload
-            payload = {
-                "city": input.city,
-                "timeframe": input.timeframe
-            }
-            
-            logging.info(f"Calling weather API for {input.city}, timeframe: {input.timeframe}")
-            
-            # Make the API request
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    weather_api_endpoint,
-                    json=payload,
-                    headers={'Content-Type': 'application/json'},
-                    timeout=10.0
-                )
-                
-                # Check if the request was successful
-                if response.status_code != 200:
-                    error_message = f"Weather API request failed with status code {response.status_code}"
-                    logging.error(error_message)
-                    raise Exception(error_message)
-                
-                # Parse the response
-                data = response.json()
-                
-                if not data.get("success"):
-                    error_message = f"Weather API returned error: {data.get('error', 'Unknown error')}"
-                    logging.error(error_message)
-                    raise Exception(error_message)
-                
-                # Extract the weather data
-                weather_data = data.get("data", {})
-                
-                # Create and return the WeatherOutput object
-                return WeatherOutput(
-                    location=weather_data.get("location", "Unknown location"),
-                    temperature=weather_data.get("temperature", 0),
-                    temperatureUnit=weather_data.get("temperatureUnit", "F"),
-                    shortForecast=weather_data.get("shortForecast", ""),
-                    detailedForecast=weather_data.get("detailedForecast", ""),
-                    timeframe=weather_data.get("timeframe", input.timeframe)
-                )
-                
+            timeframe = input.timeframe or 'now'
+            ttl = forecast_ttl(timeframe)
+            location = geocode_memo.get(input.city) or input.city
+            cache_key = forecast_cache.make_key([base_url, location.lower(), timeframe])
+            
+            async def fetch() -> Dict[str, Any]:
+                weather_data = await self.fetch_weather(base_url, input)
+                resolved = weather_data.get("location")
+                if resolved:
+                    geocode_memo.put(input.city, resolved)
+                    # Also file the forecast under the resolved location for other spellings
+                    resolved_key = forecast_cache.make_key([base_url, resolved.lower(), timeframe])
+                    if resolved_key != cache_key:
+                        forecast_cache.set(resolved_key, weather_data, ttl)
+                return weather_data
+            
+            weather_data = await forecast_cache.get_or_fetch(cache_key, fetch, ttl=ttl)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Weather cache stats: %s", weather_cache_stats())
+            
+            # Create and return the WeatherOutput object
+            return WeatherOutput(
+                location=weather_data.get("location", "Unknown location"),
+                temperature=weather_data.get("temperature", 0),
+                temperatureUnit=weather_data.get("temperatureUnit", "F"),
+                shortForecast=weather_data.get("shortForecast", ""),
+                detailedForecast=weather_data.get("detailedForecast", ""),
+                timeframe=weather_data.get("timeframe", input.timeframe)
+            )
+            
         except Exception as e:
             error_message = f"Error retrieving weather data: {str(e)}"
-            logging.error(error_message)
+            logger.error(error_message)
+            raise Exception(error_message)
+
+    async def fetch_weather(self, base_url: str, input: WeatherInput) -> Dict[str, Any]:
+        """
+        Call the weather API
+        
+        Args:
+            base_url: Base URL of the Next.js app
+            input: WeatherInput containing city and optional timeframe
+            
+        Returns:
+            The weather data of a successful response; errors are raised
+        """
+        weather_api_endpoint = f"{base_url}/api/weather"
+        
+        # Prepare the request payload
+        payload = {
+            "city": input.city,
+            "timeframe": input.timeframe
+        }
+        
+        logger.info("Calling weather API for %s, timeframe: %s", input.city, input.timeframe)
+        
+        # Make the API request over the shared, pooled client
+        client = get_client()
+        response = await client.post(
+            weather_api_endpoint,
+            json=payload,
+            headers={'Content-Type': 'application/json'},
+            timeout=endpoint_timeout('weather')
+        )
+        
+        # Check if the request was successful
+        if response.status_code != 200:
+            error_message = f"Weather API request failed with status code {response.status_code}"
+            logger.error(error_message)
+            raise Exception(error_message)
+        
+        # Parse the response
+        data = response.json()
+        
+        if not data.get("success"):
+            error_message = f"Weather API returned error: {data.get('error', 'Unknown error')}"
+            logger.error(error_message)
             raise Exception(error_message)
+        
+        # Extract the weather data
+        weather_data = data.get("data", {})
+        
+        return weather_data
 
     async def process(self, query: str, parameters: Optional[Dict[str, Any]] = None) -> str:
         """
@@ -135,7 +221,7 @@ class WeatherAgent(Agent):
             if not city or city.lower() == "unknown":
                 return "No weather data available. Please specify a valid city name."
             
-            logging.info(f"Extracted city: {city}, timeframe: {timeframe}")
+            logger.info("Extracted city: %s, timeframe: %s", city, timeframe)
             
             # Create the input model
             weather_input = WeatherInput(city=city, timeframe=timeframe)
@@ -147,7 +233,7 @@ class WeatherAgent(Agent):
             return self.format_weather_response(weather_data)
             
         except Exception as e:
-            logging.error(f"Error in WeatherAgent.process: {str(e)}")
+            logger.error("Error in WeatherAgent.process: %s", str(e))
             return f"I'm sorry, I couldn't get the weather information: {str(e)}"
     
     def extract_city(self, query: str) -> str:
@@ -165,18 +251,9 @@ class WeatherAgent(Agent):
         Returns:
             Extracted city name or empty string if not found
         """
-        import re
-        
-        # List of patterns to try for extracting city
-        patterns = [
-            r'(?:weather|temperature|forecast|rain|sunny|cloudy|snow)(?:\s+(?:like|for|in|at|near|of))?\s+(?:in\s+)?([A-Za-z\s]+)(?:\?|$|,|\.|!)',
-            r'(?:in|at|near|for)\s+([A-Za-z\s]+)(?:\?|$|,|\.|!)',
-            r'(?:what\'s|what is|how\'s|how is)(?:\s+the)?\s+(?:weather|temperature|forecast)(?:\s+(?:like|in|at|near))?\s+(?:in\s+)?([A-Za-z\s]+)(?:\?|$|,|\.|!)',
-        ]
-        
         # Try each pattern
-        for pattern in patterns:
-            match = re.search(pattern, query, re.IGNORECASE)
+        for pattern in _CITY_PATTERNS:
+            match = pattern.search(query)
             if match:
                 city = match.group(1).strip()
                 # Filter out common non-city words and time-related phrases
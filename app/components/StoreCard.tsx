@@ -71,6 +71,11 @@ const StoreCard: React.FC<StoreCardProps> = ({ data }) => {
                   <h4 className="text-md font-semibold text-indigo-800">{store.storeName}</h4>
                   <p className="text-xs text-gray-500">Store #{store.storeNumber}</p>
                 </div>
+                {store.distanceMiles !== undefined && (
+                  <span className="text-xs font-medium text-indigo-600 whitespace-nowrap">
+                    {store.distanceMiles.toFixed(1)} mi
+                  </span>
+                )}
               </div>
               
               <div className="mt-3 p-2 bg-white bg-opacity-60 rounded-lg">
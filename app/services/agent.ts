@@ -21,7 +21,18 @@ import logger from '@/utils/logger';
  * Supported agent types in the system
  * Add new agent types here when extending the system
  */
-export type AgentType = 'weather' | 'search' | 'summarize' | 'product' | 'store-locator';
+export type AgentType = 'weather' | 'search' | 'summarize' | 'product' | 'store-locator' | 'multi';
+
+/**
+ * Keywords for the intents the multi agent can answer together in one turn
+ * (e.g. "is it raining in Austin and which stores there have the black 128GB phone")
+ */
+const MULTI_INTENT_KEYWORDS: RegExp[] = [
+  /\b(weather|temperature|forecast|rain(ing|y)?|snow(ing|y)?|sunny|cloudy|storm)\b/i,  // Weather
+  /\b(stores?|locations?|shops?|outlets?)\b/i,                                        // Store locator
+  /\b(phones?|devices?|xenophones?|smartphones?|tablets?)\b/i                          // Product
+];
+const MULTI_INTENT_CONJUNCTION = /\b(and|also|plus)\b|;/i;
 
 /**
  * Interface defining the structure of agent responses
@@ -118,6 +129,11 @@ export class AgentService {
           storeIndex: 'stores',                 // OpenSearch index name
           maxResults: 10                         // Maximum number of results to return
         };
+      } else if (agentType === 'multi') {
+        parameters = {
+          ...parameters,
+          baseUrl: process.env.NEXT_PUBLIC_BASE_URL || 'http://localhost:3000'   // Base URL for the product agent's API calls
+        };
       }
 
       // Execute agent via API endpoint
@@ -170,8 +186,15 @@ export class AgentService {
    * ```
    */
   public detectAgentType(query: string): AgentType | null {
+    // Turns that combine weather, store and product questions are answered by
+    // the multi agent, which runs the agents concurrently
+    const intentCount = MULTI_INTENT_KEYWORDS.filter(pattern => pattern.test(query)).length;
+    if (intentCount >= 2 && MULTI_INTENT_CONJUNCTION.test(query)) {
+      return 'multi';
+    }
+
     // Define intent patterns for each agent type
-    const patterns: Record<AgentType, RegExp[]> = {
+    const patterns: Record<Exclude<AgentType, 'multi'>, RegExp[]> = {
       weather: [
         /weather|temperature|forecast|rain|snow|sunny|cloudy|storm|cold|hot/i,      // Weather conditions
         /what('s| is) (the weather|it) like in/i,                                  // Common weather questions
@@ -0,0 +1,40 @@
+"""
+Helpers shared by the benchmark scripts.
+
+The agent modules live in app/api/agents and are loaded by file path (the same
+way app/api/agents/route.ts loads them), since store-locator_agent.py is not a
+valid module name.
+"""
+import importlib.util
+import os
+import statistics
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AGENTS_DIR = os.path.join(REPO_ROOT, 'app', 'api', 'agents')
+
+# Agents log to logs/app.log relative to the working directory
+os.chdir(REPO_ROOT)
+if AGENTS_DIR not in sys.path:
+    sys.path.insert(0, AGENTS_DIR)
+
+
+def load_agent_module(agent_type: str):
+    """Import app/api/agents/<agent_type>_agent.py and return the module."""
+    path = os.path.join(AGENTS_DIR, f"{agent_type}_agent.py")
+    spec = importlib.util.spec_from_file_location(f"{agent_type.replace('-', '_')}_agent", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def time_per_call(func, repeat: int = 5, number: int = 1000) -> float:
+    """Return the median time of one func() call in microseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+    return statistics.median(samples) * 1e6
@@ -0,0 +1,116 @@
+"""
+Benchmark the shared agent HTTP client against a client per request.
+
+Starts a local stub of the Next.js API routes (/api/products, /api/stores,
+/api/weather), then issues the same sequence of agent-style POSTs twice: once
+opening a new httpx.AsyncClient per request (the previous agent behaviour) and
+once through agent_http.get_client(). Reports mean/p95 latency and the number
+of TCP connections the stub server accepted for each mode.
+
+Usage:
+    python benchmarks/bench_agent_http.py [--requests 500] [--concurrency 8]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from _agents import load_agent_module  # noqa: F401 (puts the agents directory on sys.path)
+import agent_http
+
+STUB_RESPONSES = {
+    '/api/products': {'data': {'products': [], 'total': 0}},
+    '/api/stores': {'success': True, 'data': {'stores': [], 'total': 0}},
+    '/api/weather': {'success': True, 'data': {'location': 'Austin, TX', 'temperature': 75}},
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Keep-alive capable stub that answers every POST with a canned JSON body."""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        body = json.dumps(STUB_RESPONSES.get(self.path, {})).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.lock = threading.Lock()
+    server.connections = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def post_with_new_client(url: str) -> None:
+    async with httpx.AsyncClient() as client:
+        response = await client.post(url, json={'query': 'phone'}, timeout=10.0)
+        response.json()
+
+
+async def post_with_shared_client(url: str) -> None:
+    response = await agent_http.get_client().post(url, json={'query': 'phone'},
+                                                  timeout=agent_http.endpoint_timeout('products'))
+    response.json()
+
+
+async def run(mode, post, base_url: str, requests: int, concurrency: int, server) -> None:
+    paths = list(STUB_RESPONSES)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await post(base_url + paths[i % len(paths)])
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    server.connections = 0
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    await agent_http.aclose_shared_client()
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{mode:>18}: mean {statistics.mean(latencies):.2f} ms, p95 {p95:.2f} ms, "
+          f"{requests / elapsed:.0f} req/s, {server.connections} connections")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    server = start_stub_server()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"{args.requests} requests, concurrency {args.concurrency}, http2={agent_http.http2_available()}")
+    try:
+        await run('client per request', post_with_new_client, base_url, args.requests, args.concurrency, server)
+        await run('shared client', post_with_shared_client, base_url, args.requests, args.concurrency, server)
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+"""
+Benchmark the per-request cost of agent logging.
+
+Runs ProductAgent.process and StoreLocatorAgent.process on a set of queries
+with the HTTP calls replaced by canned responses, so only parsing, formatting
+and logging are measured. Each logging mode is timed against a baseline with
+the agent loggers silenced:
+
+- DEBUG, sync:   every DEBUG record written to the file from the request path,
+                 the way the agents' basicConfig(level=DEBUG) setup worked
+- DEBUG, queue:  DEBUG records handed to the QueueListener thread
+- INFO, queue:   the default configuration
+
+Log output goes to a temporary file.
+
+Usage:
+    python benchmarks/bench_agent_logging.py [--requests 300]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from _agents import load_agent_module
+
+QUERIES = [
+    ('product', 'black 128GB phone under $800'),
+    ('product', 'Show me gold HyperPhone phones with 256GB storage and wireless charging under $900'),
+    ('store-locator', 'stores in Austin, TX'),
+    ('store-locator', 'find stores near 42056'),
+]
+
+PRODUCTS = [{
+    'Title': f"HyperPhone X{i}", 'Brand': 'HyperPhone', 'Model': f"X{i}", 'Price': 599 + i,
+    'Original_Price': 699 + i, 'Discount_Percentage': 14, 'Rating': 4.5, 'Review_Count': 120,
+    'Storage': '128GB', 'Color': 'Black', 'RAM': '8GB', 'Processor': 'A15 Bionic', 'Screen_Size': 6.1,
+    'Stock': 12, 'Water_Resistant': 'Yes', 'Wireless_Charging': 'Yes', 'Fast_Charging': True, '5G_Compatible': 'Yes',
+} for i in range(20)]
+
+STORES = [{
+    'storeName': f"Store {i}", 'storeNumber': str(i), 'address': f"{i} Main St", 'city': 'Austin',
+    'state': 'TX', 'zipCode': '78701', 'phoneNumber': '555-0100',
+} for i in range(10)]
+
+
+def make_agents(modules):
+    product_agent = modules['product'].ProductAgent()
+    store_agent = modules['store-locator'].StoreLocatorAgent()
+
+    async def search_products(base_url, search_params):
+        return 200, {'data': {'products': PRODUCTS, 'total': len(PRODUCTS)}}
+
+    async def find_stores(search_params):
+        return {'success': True, 'data': {'data': {'stores': STORES, 'total': len(STORES)}}}
+
+    product_agent.search_products = search_products
+    store_agent.find_stores = find_stores
+    store_agent.find_nearest_stores = lambda *args: None
+    return {'product': product_agent, 'store-locator': store_agent}
+
+
+async def run(agents, requests: int) -> float:
+    start = time.perf_counter()
+    for i in range(requests):
+        agent_type, query = QUERIES[i % len(QUERIES)]
+        await agents[agent_type].process(query)
+    return (time.perf_counter() - start) / requests
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--requests', type=int, default=300)
+    args = parser.parse_args()
+
+    # Search the canned catalog on every request instead of the response cache
+    os.environ['PRODUCT_CACHE_TTL'] = '0'
+    os.environ['STORE_LOCATOR_EMBEDDED'] = 'false'
+    modules = {agent_type: load_agent_module(agent_type) for agent_type in ('product', 'store-locator')}
+    import agent_logging
+
+    agents = make_agents(modules)
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = os.path.join(tmp, 'app.log')
+        results = {}
+        for label, level, use_queue in (('off', 'CRITICAL', True), ('DEBUG, sync', 'DEBUG', False),
+                                        ('DEBUG, queue', 'DEBUG', True), ('INFO, queue', 'INFO', True)):
+            agent_logging.configure_logging(level=level, filename=log_file, use_queue=use_queue, force=True)
+            await run(agents, 20)  # warm up
+            results[label] = min([await run(agents, args.requests) for _ in range(3)])
+            agent_logging.shutdown_logging()
+        log_size = os.path.getsize(log_file)
+
+    baseline = results.pop('off')
+    print(f"{args.requests} requests over {len(QUERIES)} queries, baseline {baseline * 1e6:.0f}us/request "
+          f"with logging off ({log_size / 1e6:.1f} MB logged in total)")
+    for label, per_request in results.items():
+        print(f"{label:>13}: {per_request * 1e6:7.0f}us/request   overhead {(per_request - baseline) * 1e6:6.0f}us")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
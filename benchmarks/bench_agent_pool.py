@@ -0,0 +1,171 @@
+"""
+Benchmark the pre-forked agent pool against the single-process agent server.
+
+Runs the same mixed load (product, store-locator and weather queries from
+--clients concurrent keep-alive clients) against:
+
+- agent_server.py, one process
+- agent_pool.py with --workers workers, forked after gc.freeze()
+- agent_pool.py with --workers workers, forked without gc.freeze()
+
+and reports throughput, p50/p95 latency and the memory of every process after
+the load (RSS, PSS and private kB; the pool's workers share the zygote's pages,
+so their PSS is the fair per-worker cost). Workers are not recycled during
+these runs, so the memory is that of workers that served the whole load.
+
+Before that it checks recycling: a pool whose workers retire after a few
+requests must answer every request of the load with a 200 and report the
+recycled workers in /health; the script exits with an error otherwise.
+
+Usage:
+    python benchmarks/bench_agent_pool.py [--workers 4] [--clients 16] [--requests 600] [--port 8798]
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from _agents import AGENTS_DIR, REPO_ROOT
+
+# Found through the agents directory that _agents puts on sys.path
+from agent_pool import process_memory
+
+QUERIES = [
+    ('product', 'black 128GB phone under $800'),
+    ('store-locator', 'stores in Austin, TX'),
+    ('weather', 'weather in Boston tomorrow'),
+]
+
+
+def start(script: str, port: int, **env_vars) -> subprocess.Popen:
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [env.get('PYTHONPATH'), AGENTS_DIR]))
+    env.setdefault('STORE_LOCATOR_EMBEDDED', 'true')
+    env['AGENT_SERVER_PORT'] = str(port)
+    env.update(env_vars)
+    process = subprocess.Popen([sys.executable, os.path.join(AGENTS_DIR, script)], env=env, cwd=REPO_ROOT)
+    started = time.perf_counter()
+    while True:
+        try:
+            health(port)
+            return process
+        except ConnectionError:
+            if process.poll() is not None or time.perf_counter() - started > 60:
+                sys.exit(f"{script} did not start")
+            time.sleep(0.05)
+
+
+def stop(process: subprocess.Popen) -> None:
+    process.terminate()
+    process.wait()
+
+
+def health(port: int) -> dict:
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    connection.request('GET', '/health')
+    return json.loads(connection.getresponse().read())
+
+
+def load(port: int, clients: int, requests: int) -> dict:
+    """Send requests from concurrent clients; return statuses, latencies and throughput."""
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+
+    def client(index: int):
+        connection = http.client.HTTPConnection('127.0.0.1', port)
+        for i in range(index, requests, clients):
+            agent_type, query = QUERIES[i % len(QUERIES)]
+            sent = time.perf_counter()
+            connection.request('POST', f"/agents/{agent_type}", json.dumps({'query': query}),
+                               {'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            response.read()
+            with lock:
+                latencies.append(time.perf_counter() - sent)
+                statuses[response.status] = statuses.get(response.status, 0) + 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'statuses': statuses,
+        'throughput': requests / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p95_ms': latencies[int(0.95 * len(latencies))] * 1000,
+    }
+
+
+def check_recycling(args) -> None:
+    pool = start('agent_pool.py', args.port, AGENT_POOL_WORKERS=str(args.workers), AGENT_POOL_MAX_REQUESTS='25')
+    try:
+        result = load(args.port, args.clients, 300)
+        # The last retired worker's replacement may still be starting
+        deadline = time.perf_counter() + 30
+        report = health(args.port)
+        while len(report['workers']) != args.workers and time.perf_counter() < deadline:
+            time.sleep(0.05)
+            report = health(args.port)
+    finally:
+        stop(pool)
+    if result['statuses'] != {200: 300}:
+        sys.exit(f"recycling check failed: statuses {result['statuses']}")
+    if report['recycled'] < 300 // 25 - args.workers or len(report['workers']) != args.workers:
+        sys.exit(f"recycling check failed: {report['recycled']} recycled, {len(report['workers'])} workers")
+    print(f"recycling check passed: 300 requests answered, {report['recycled']} workers recycled")
+
+
+def describe(memory) -> str:
+    if memory is None:
+        return 'n/a'
+    return f"rss {memory['rss_kb'] / 1024:5.1f}MB  pss {memory['pss_kb'] / 1024:5.1f}MB  " \
+           f"private {memory['private_kb'] / 1024:5.1f}MB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=600)
+    parser.add_argument('--port', type=int, default=8798)
+    args = parser.parse_args()
+    print(f"{os.cpu_count()} CPUs, {args.workers} workers, {args.clients} clients, {args.requests} requests")
+
+    check_recycling(args)
+
+    runs = [
+        ('agent_server', 'agent_server.py', {}),
+        ('pool, gc.freeze', 'agent_pool.py', {'AGENT_POOL_GC_FREEZE': 'true'}),
+        ('pool, no freeze', 'agent_pool.py', {'AGENT_POOL_GC_FREEZE': 'false'}),
+    ]
+    for name, script, env_vars in runs:
+        process = start(script, args.port, AGENT_POOL_WORKERS=str(args.workers), AGENT_POOL_MAX_REQUESTS='0', **env_vars)
+        try:
+            load(args.port, args.clients, 3 * args.clients)  # warm up every worker
+            result = load(args.port, args.clients, args.requests)
+            report = health(args.port)
+            memory = process_memory(process.pid)
+        finally:
+            stop(process)
+        print(f"{name:>15}: {result['throughput']:7.1f} req/s   p50 {result['p50_ms']:6.1f}ms   "
+              f"p95 {result['p95_ms']:6.1f}ms   statuses {result['statuses']}")
+        if 'workers' not in report:
+            print(f"{'process':>19}: {describe(memory)}")
+            continue
+        print(f"{'zygote':>19}: {describe(report['zygote']['memory'])}")
+        print(f"{'dispatcher':>19}: {describe(report['dispatcher']['memory'])}")
+        for worker in report['workers']:
+            print(f"{'worker':>13} {worker['pid']:>5}: {describe(worker['memory'])}   {worker['requests']} requests")
+
+
+if __name__ == '__main__':
+    main()
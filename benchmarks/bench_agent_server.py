@@ -0,0 +1,129 @@
+"""
+Benchmark the agent route's spawn path against the warm agent server.
+
+For each query, times:
+
+- spawn:  a fresh `python -c <script>` per request, with the same script the
+          agent route generates (interpreter startup, imports, agent
+          construction, process(), shutdown)
+- server: a POST to app/api/agents/agent_server.py started once for the run,
+          over a kept-alive connection; the server's own agent_ms is reported
+          next to the round trip
+
+The agents' backend calls go to NEXT_PUBLIC_BASE_URL as usual; with no Next.js
+server running they fail fast, which both paths pay equally. Store queries use
+the embedded store index (STORE_LOCATOR_EMBEDDED=true) so they need no backend.
+
+Usage:
+    python benchmarks/bench_agent_server.py [--spawns 5] [--requests 50] [--port 8799]
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from _agents import AGENTS_DIR, REPO_ROOT
+
+QUERIES = [
+    ('product', 'black 128GB phone under $800'),
+    ('store-locator', 'stores in Austin, TX'),
+    ('weather', 'weather in Boston tomorrow'),
+]
+
+# The script app/api/agents/route.ts runs for every request
+SPAWN_SCRIPT = """
+import os
+import asyncio
+import importlib.util
+
+async def main():
+    agent_type = {agent_type!r}
+    spec = importlib.util.spec_from_file_location("agent_module", os.environ['AGENT_MODULE_PATH'])
+    agent_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(agent_module)
+    agent_class_name = ''.join(part.capitalize() for part in agent_type.split('-')) + 'Agent'
+    agent = getattr(agent_module, agent_class_name)()
+    try:
+        print(await agent.process({query!r}, None))
+    finally:
+        from agent_http import aclose_shared_client
+        await aclose_shared_client()
+
+asyncio.run(main())
+"""
+
+
+def agent_env() -> dict:
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [env.get('PYTHONPATH'), AGENTS_DIR]))
+    env.setdefault('STORE_LOCATOR_EMBEDDED', 'true')
+    return env
+
+
+def time_spawn(agent_type: str, query: str, runs: int) -> float:
+    env = agent_env()
+    env['AGENT_MODULE_PATH'] = os.path.join(AGENTS_DIR, f"{agent_type}_agent.py")
+    script = SPAWN_SCRIPT.format(agent_type=agent_type, query=query)
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', script], env=env, cwd=REPO_ROOT, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def time_server(connection: http.client.HTTPConnection, agent_type: str, query: str, runs: int) -> tuple:
+    round_trips, agent_ms = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        connection.request('POST', f"/agents/{agent_type}", json.dumps({'query': query}),
+                           {'Content-Type': 'application/json'})
+        body = json.loads(connection.getresponse().read())
+        round_trips.append(time.perf_counter() - start)
+        agent_ms.append(body['timings']['agent_ms'])
+    return statistics.median(round_trips) * 1000, statistics.median(agent_ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--spawns', type=int, default=5)
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--port', type=int, default=8799)
+    args = parser.parse_args()
+
+    env = agent_env()
+    env['AGENT_SERVER_PORT'] = str(args.port)
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, os.path.join(AGENTS_DIR, 'agent_server.py')], env=env, cwd=REPO_ROOT)
+    try:
+        while True:
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', args.port)
+                connection.request('GET', '/health')
+                health = json.loads(connection.getresponse().read())
+                break
+            except ConnectionError:
+                if server.poll() is not None or time.perf_counter() - start > 60:
+                    sys.exit("Agent server did not start")
+                time.sleep(0.05)
+        print(f"agent server ready in {(time.perf_counter() - start) * 1000:.0f}ms "
+              f"(agents loaded in {health['startup_ms']}ms)")
+
+        for agent_type, query in QUERIES:
+            spawn_ms = time_spawn(agent_type, query, args.spawns)
+            time_server(connection, agent_type, query, 3)  # warm up caches and connections
+            round_trip_ms, agent_ms = time_server(connection, agent_type, query, args.requests)
+            print(f"{agent_type:>13}: spawn {spawn_ms:7.1f}ms   server {round_trip_ms:6.1f}ms "
+                  f"(agent {agent_ms:.1f}ms)   {spawn_ms / round_trip_ms:5.1f}x")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""
+Measure the cold start of each agent the way the agent route spawns it, and
+enforce a startup budget.
+
+For every agent module, --runs fresh `python -X importtime` processes run the
+script app/api/agents/route.ts generates, with timestamps added, and report
+the median of:
+
+- import:   the script's own imports (asyncio, ...) and loading the agent module
+- init:     constructing the agent
+- first:    process() of one query, up to the first response
+- total:    the whole process, from spawn to exit, as the route waits for it
+
+plus the heaviest imports by cumulative -X importtime time (leaving out what
+the interpreter imports by itself). A bare `python -c pass` is timed the same
+way, and its time is subtracted from the budgeted totals so the budget tracks
+this code rather than the interpreter. -X importtime adds some overhead of
+its own, which the budgets allow for.
+pydantic_ai is left out of the budget as well (and reported on its own line):
+the agent classes derive from pydantic_ai.Agent, so its import cost is set by
+the installed version, not by the agents.
+
+The script exits with an error if an agent goes over its budget, or if a
+module that should be imported on first use (DEFERRED_MODULES) is already
+loaded once the agent module is imported.
+
+Backend calls go to NEXT_PUBLIC_BASE_URL as usual; with no Next.js server
+running they fail fast. Store queries use the embedded store index.
+
+Usage:
+    python benchmarks/bench_agent_startup.py [--runs 7] [--budget-scale 1.0] [--top 8]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from _agents import AGENTS_DIR, REPO_ROOT
+
+# (agent type, module file, query)
+AGENTS = [
+    ('product', 'product_agent.py', 'black 128GB phone under $800'),
+    ('store-locator', 'store-locator_agent.py', 'stores in Austin, TX'),
+    ('weather', 'weather_agent.py', 'weather in Boston tomorrow'),
+    ('multi', 'multi_agent.py', 'weather in Boston and stores in Austin, TX'),
+]
+
+# Milliseconds over a bare interpreter, pydantic_ai excluded. import_ms covers
+# loading the module; total_ms the spawned process from start to exit.
+BUDGETS = {
+    'product': {'import_ms': 125, 'total_ms': 300},
+    'store-locator': {'import_ms': 125, 'total_ms': 170},
+    'weather': {'import_ms': 125, 'total_ms': 300},
+    'multi': {'import_ms': 125, 'total_ms': 350},
+}
+
+# Imported by the first call (or the optional feature) that needs them, never by importing an agent
+DEFERRED_MODULES = ('httpx', 'httpcore', 'numpy')
+
+SCRIPT = """
+import time
+started = time.perf_counter()
+import asyncio
+import importlib.util
+import json
+import os
+import sys
+
+async def main():
+    spec = importlib.util.spec_from_file_location("agent_module", os.environ['AGENT_MODULE_PATH'])
+    agent_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(agent_module)
+    imported = time.perf_counter()
+    eager = [name for name in {deferred!r} if name in sys.modules]
+    agent = getattr(agent_module, {class_name!r})()
+    constructed = time.perf_counter()
+    try:
+        await agent.process({query!r}, None)
+    finally:
+        from agent_http import aclose_shared_client
+        await aclose_shared_client()
+    answered = time.perf_counter()
+    print(json.dumps({{
+        'import_ms': (imported - started) * 1000,
+        'init_ms': (constructed - imported) * 1000,
+        'first_ms': (answered - constructed) * 1000,
+        'eager': eager,
+    }}))
+
+asyncio.run(main())
+"""
+
+IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def agent_env() -> dict:
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [env.get('PYTHONPATH'), AGENTS_DIR]))
+    env.setdefault('STORE_LOCATOR_EMBEDDED', 'true')
+    return env
+
+
+def parse_importtime(stderr: str) -> dict:
+    """Return the cumulative import time (ms) of every module in -X importtime output."""
+    cumulative = {}
+    for line in stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            cumulative[match.group(4)] = int(match.group(2)) / 1000
+    return cumulative
+
+
+def spawn(args: list, env: dict) -> tuple:
+    """Run a Python process with -X importtime; return (wall ms, stdout, importtime dict)."""
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, '-X', 'importtime'] + args, env=env, cwd=REPO_ROOT,
+                             capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+    if process.returncode != 0:
+        sys.exit(f"{args} failed:\n{process.stderr[-2000:]}")
+    return wall_ms, process.stdout, parse_importtime(process.stderr)
+
+
+def measure(agent_type: str, module_file: str, query: str, runs: int) -> dict:
+    env = agent_env()
+    env['AGENT_MODULE_PATH'] = os.path.join(AGENTS_DIR, module_file)
+    class_name = ''.join(part.capitalize() for part in agent_type.split('-')) + 'Agent'
+    script = SCRIPT.format(deferred=DEFERRED_MODULES, class_name=class_name, query=query)
+    samples, imports = [], {}
+    for _ in range(runs):
+        wall_ms, stdout, cumulative = spawn(['-c', script], env)
+        sample = json.loads(stdout.strip().splitlines()[-1])
+        sample['total_ms'] = wall_ms
+        sample['pydantic_ai_ms'] = cumulative.get('pydantic_ai', 0.0)
+        samples.append(sample)
+        for name, ms in cumulative.items():
+            imports.setdefault(name, []).append(ms)
+    result = {key: statistics.median(sample[key] for sample in samples)
+              for key in ('import_ms', 'init_ms', 'first_ms', 'total_ms', 'pydantic_ai_ms')}
+    result['eager'] = sorted({name for sample in samples for name in sample['eager']})
+    result['imports'] = {name: statistics.median(values) for name, values in imports.items()}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--budget-scale', type=float, default=1.0,
+                        help='Multiply every budget, e.g. 2 on a slow machine')
+    parser.add_argument('--top', type=int, default=8, help='Heaviest imports listed per agent')
+    args = parser.parse_args()
+
+    env = agent_env()
+    bare = [spawn(['-c', 'pass'], env) for _ in range(args.runs)]
+    interpreter_ms = statistics.median(wall_ms for wall_ms, _, _ in bare)
+    startup_modules = set(bare[0][2])
+    print(f"bare interpreter: {interpreter_ms:.1f}ms (subtracted from the budgeted totals)")
+
+    failures = []
+    for agent_type, module_file, query in AGENTS:
+        result = measure(agent_type, module_file, query, args.runs)
+        budget = BUDGETS[agent_type]
+        import_ms = result['import_ms'] - result['pydantic_ai_ms']
+        total_ms = result['total_ms'] - interpreter_ms - result['pydantic_ai_ms']
+        print(f"\n{agent_type}: import {result['import_ms']:.1f}ms   init {result['init_ms']:.1f}ms   "
+              f"first {result['first_ms']:.1f}ms   total {result['total_ms']:.1f}ms   "
+              f"(pydantic_ai {result['pydantic_ai_ms']:.1f}ms)")
+        print(f"  budgeted: import {import_ms:.1f}/{budget['import_ms'] * args.budget_scale:.0f}ms   "
+              f"total {total_ms:.1f}/{budget['total_ms'] * args.budget_scale:.0f}ms")
+        heaviest = sorted(result['imports'].items(), key=lambda item: -item[1])
+        # Top-level packages the interpreter does not load by itself; submodules count towards them
+        top_level = [(name, ms) for name, ms in heaviest
+                     if '.' not in name and name not in startup_modules][:args.top]
+        print('  heaviest imports: ' + ', '.join(f"{name} {ms:.1f}ms" for name, ms in top_level))
+
+        for key, value in (('import_ms', import_ms), ('total_ms', total_ms)):
+            if value > budget[key] * args.budget_scale:
+                failures.append(f"{agent_type} {key} {value:.1f}ms over budget {budget[key] * args.budget_scale:.0f}ms")
+        if result['eager']:
+            failures.append(f"{agent_type} imports {', '.join(result['eager'])} at import time")
+
+    if failures:
+        sys.exit('\nstartup budget exceeded:\n  ' + '\n  '.join(failures))
+    print('\nstartup budget met')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+"""
+Benchmark the embedded catalog engine (app/api/agents/catalog_engine.py).
+
+Loads the catalog (PRODUCT_CATALOG_PATH, by default the Solr cleaned_catalog.csv)
+and reports the load time, then the median time of CatalogEngine.search() for
+the search parameters ProductAgent.extract_search_params builds from a set of
+product queries, next to a plain Python scan of the rows doing the same work.
+
+Before that it checks the engine against that scan on an enhanced copy of the
+catalog (Brand, Rating, RAM, ... added at random, written as a bulk NDJSON
+file): --checks random filter combinations, sorts and pages must return the
+same products in the same order, the same total and the same facet counts as
+Counters over the matching rows (and, for term-only filters, the facet cube
+must agree with counting the match mask); the script exits with an error
+otherwise. It also checks that free-text queries, product types other than
+phones and filters on fields the catalog lacks fall back (search() returns
+None).
+
+Usage:
+    python benchmarks/bench_catalog_engine.py [--checks 500] [--number 200]
+"""
+import argparse
+import json
+from collections import Counter
+import os
+import random
+import sys
+import tempfile
+import time
+
+from _agents import load_agent_module, time_per_call
+
+# Found through the agents directory that _agents puts on sys.path
+from catalog_engine import (DEFAULT_CATALOG_PATH, FILTERS, IGNORED_FILTERS, SORTS, CatalogEngine,
+                            parse_number, read_catalog_rows)
+from facet_index import FACET_FIELDS, PRICE_EDGES
+
+QUERIES = [
+    'black 128GB phone under $800',
+    'phones between $300 and $500',
+    'latest phones',
+    'large screen phones around $900',
+    'white 256GB phone over $1000',
+    'blue phones under $400',
+]
+
+# Values for the fields the enhanced copy adds
+ENHANCED_VALUES = {
+    'Brand': ('XenoPhone', 'TechPro', 'NexGen', 'PixelWave'),
+    'Model': ('Fusion', 'Ultra', 'Lite'),
+    'RAM': ('4GB', '6GB', '8GB', '12GB'),
+    'Processor': ('Snapdragon 8 Gen 1', 'A15 Bionic', 'MediaTek Dimensity 9000'),
+    'Category': ('Premium', 'Budget', 'Gaming'),
+    'Water_Resistant': ('Yes', 'No'),
+    'Wireless_Charging': ('Yes', 'No'),
+    'Fast_Charging': ('Yes', 'No'),
+    '5G_Compatible': ('Yes', 'No'),
+}
+
+
+def matching(rows: list, filters: dict) -> list:
+    """Return the rows that match the filters, with a Python loop."""
+    matches = []
+    for row in rows:
+        for name, value in filters.items():
+            if name in IGNORED_FILTERS or name == 'sort':
+                continue
+            field, operation = FILTERS[name]
+            if operation == 'term':
+                if value and str(row.get(field) or '') != str(value):
+                    break
+            elif operation == 'flag':
+                if str(row.get(field) or '') != ('Yes' if value in (True, 'Yes') else 'No'):
+                    break
+            elif operation == 'gte' and parse_number(row.get(field)) < value:
+                break
+            elif operation == 'lte' and parse_number(row.get(field)) > value:
+                break
+            elif operation == 'eq' and value and parse_number(row.get(field)) != value:
+                break
+        else:
+            matches.append(row)
+    return matches
+
+
+def scan(rows: list, params: dict):
+    """Answer a search with a Python loop over the rows; return (SKU_IDs of the page, total)."""
+    filters = params.get('filters') or {}
+    matches = matching(rows, filters)
+    sort = params.get('sort') or 'relevance'
+    if sort == 'relevance' and filters.get('sort') in SORTS:
+        sort = filters['sort']
+    # SORTS lists (field, descending) pairs; SKU_ID ascending (as a keyword) breaks ties
+    matches.sort(key=lambda row: str(row['SKU_ID']))
+    for field, descending in reversed(SORTS[sort]):
+        matches.sort(key=lambda row: parse_number(row.get(field)), reverse=descending)
+    start = (params['page'] - 1) * params['size']
+    return [str(row['SKU_ID']) for row in matches[start:start + params['size']]], len(matches)
+
+
+def scan_facets(rows: list, filters: dict) -> dict:
+    """Count the facets of the matching rows with Counters, in FacetIndex.counts format."""
+    matches = matching(rows, filters)
+    fields = {}
+    for name, field in FACET_FIELDS:
+        counter = Counter(str(row.get(field) or '') for row in matches)
+        counter.pop('', None)
+        # Ties are ordered by value, as the codes are
+        fields[name] = dict(sorted(counter.items(), key=lambda item: (-item[1], item[0])))
+    prices = [parse_number(row.get('Price')) for row in matches]
+    return {
+        'fields': fields,
+        'price': {
+            'edges': list(PRICE_EDGES),
+            'under': [sum(price < edge for price in prices) for edge in PRICE_EDGES],
+            'min': min(prices, default=None),
+            'max': max(prices, default=None),
+        },
+    }
+
+
+def random_params(rng: random.Random, engine: CatalogEngine) -> dict:
+    filters = {}
+    for name in rng.sample(sorted(FILTERS), rng.randint(0, 3)):
+        field, operation = FILTERS[name]
+        if operation == 'term':
+            filters[name] = rng.choice(sorted(engine.vocab[field]) + ['Missing'])
+        elif operation == 'flag':
+            filters[name] = rng.choice((True, False, 'Yes'))
+        elif operation in ('gte', 'lte'):
+            column = engine.numeric[field]
+            filters[name] = round(rng.uniform(float(column.min()), float(column.max())), 1)
+        else:
+            filters[name] = rng.choice(sorted(set(engine.numeric[field].tolist())))
+    if rng.random() < 0.2:
+        filters['sort'] = 'release_date:desc'
+    return {
+        'query': rng.choice(('phone', 'latest', 'Phones', '')),
+        'filters': filters,
+        'size': rng.choice((1, 5, 10, 50)),
+        'page': rng.choice((1, 1, 2, 5)),
+        'sort': rng.choice(('relevance', 'price_asc', 'price_desc', 'rating_desc')),
+    }
+
+
+def check(path: str, checks: int) -> None:
+    rng = random.Random(7)
+    rows = read_catalog_rows(path)
+    for row in rows:
+        for field, values in ENHANCED_VALUES.items():
+            row[field] = rng.choice(values)
+        row['Rating'] = round(rng.uniform(1, 5), 1)
+        row['Review_Count'] = rng.randint(0, 50)
+
+    def fail(message):
+        sys.exit(f"check failed: {message}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        enhanced_path = os.path.join(directory, 'bulk_data.ndjson')
+        with open(enhanced_path, 'w') as f:
+            for row in rows:
+                f.write(json.dumps({'index': {'_index': 'catalog', '_id': row['id']}}) + '\n')
+                f.write(json.dumps(row) + '\n')
+        engine = CatalogEngine(enhanced_path)
+        cube_searches = 0
+        for _ in range(checks):
+            params = random_params(rng, engine)
+            result = engine.search(params)
+            if result is None:
+                fail(f"no answer for {params}")
+            page = [product['skuId'] for product in result['data']['products']]
+            expected = scan(rows, params)
+            if (page, result['data']['total']) != expected:
+                fail(f"{params}: got {page[:5]} of {result['data']['total']}, expected {expected[0][:5]} of {expected[1]}")
+            if result['data']['facets'] != scan_facets(rows, params['filters']):
+                fail(f"{params}: facets {result['data']['facets']} differ from a Python count")
+            terms = engine.term_filters(params['filters'])
+            if terms is not None and engine.facets.cube_index(terms) is not None:
+                cube_searches += 1
+                if engine.facets.counts(engine.filter_mask(params['filters'])) != result['data']['facets']:
+                    fail(f"{params}: facets from the cube differ from the facets of the mask")
+
+    plain = CatalogEngine(path)
+    for params in ({'query': 'best camera phone', 'filters': {}},
+                   {'query': 'laptops', 'filters': {'max_price': 800}},
+                   {'query': 'tablet', 'filters': {}},
+                   {'query': 'electronics', 'filters': {'color': 'Black'}},
+                   {'query': 'devices', 'filters': {'max_price': 500}},
+                   {'query': 'phone', 'filters': {'brand': 'XenoPhone'}},
+                   {'query': 'phone', 'filters': {'min_rating': 4.5}},
+                   {'query': 'phone', 'filters': {'unknown': 1}}):
+        if plain.search(params) is not None:
+            fail(f"{params} answered without a fallback")
+    print(f"check passed: {checks} random searches ({cube_searches} with facets from the cube) match "
+          f"a Python scan, fallbacks returned None")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--checks', type=int, default=500)
+    parser.add_argument('--number', type=int, default=200, help='Calls per timing sample')
+    args = parser.parse_args()
+    path = os.environ.get('PRODUCT_CATALOG_PATH', DEFAULT_CATALOG_PATH)
+
+    check(path, args.checks)
+
+    start = time.perf_counter()
+    engine = CatalogEngine(path)
+    print(f"loaded {len(engine.rows)} products in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    agent = load_agent_module('product').ProductAgent()
+    for query in QUERIES:
+        params = agent.extract_search_params(query)
+        result = engine.search(params)
+        if result is None:
+            print(f"{query!r:>36}: falls back to the products API")
+            continue
+        engine_us = time_per_call(lambda: engine.search(params), number=args.number)
+        scan_us = time_per_call(lambda: scan(engine.rows, params), repeat=3, number=2)
+        print(f"{query!r:>36}: engine {engine_us:7.1f}us   python scan {scan_us / 1000:7.1f}ms   "
+              f"{result['data']['total']:>5} matches")
+
+
+if __name__ == '__main__':
+    main()
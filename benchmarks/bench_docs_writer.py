@@ -0,0 +1,118 @@
+"""
+Benchmark the docs table write paths of TextExtractor.
+
+Writes the same synthetic chunks (768-dim embeddings) twice: with the previous
+per-file path (str() formatting of every float plus executemany of an
+INSERT ... ON CONFLICT) and with chunk_rows() plus copy_rows(), which COPYs
+batches spanning many files into a staging table and merges them with one
+upsert. Reports rows/sec for each.
+
+The rows go into a session-local TEMP table named docs, which shadows the real
+table, so the benchmark never touches stored documents. Requires a reachable
+PostgreSQL in DATABASE_URL; the embedding column uses pgvector when the
+extension is installed and text otherwise.
+
+Usage:
+    DATABASE_URL=postgresql://... python benchmarks/bench_docs_writer.py [--files 50] [--chunks 40]
+"""
+import argparse
+import hashlib
+import os
+import random
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'external_services', 'text_extraction'))
+
+from text_extractor import TextExtractor  # noqa: E402
+
+
+def make_documents(files: int, chunks: int, dimensions: int):
+    rng = random.Random(0)
+    documents = []
+    for f in range(files):
+        texts = [f"chunk {c} of file {f}\twith a tab and a \\ backslash " * 20 for c in range(chunks)]
+        embeddings = [[rng.uniform(-1, 1) for _ in range(dimensions)] for _ in range(chunks)]
+        documents.append((f"data/bench/file_{f}.txt", 'tika', texts, embeddings))
+    return documents
+
+
+def legacy_rows(file_path, file_type, chunks, embeddings):
+    """Rows as the previous write path built them."""
+    rows = []
+    for chunk_index, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
+        embedding_str = '[' + ','.join(map(str, embedding)) + ']'
+        parent_id = hashlib.md5(file_path.encode()).hexdigest()
+        rows.append((f"{parent_id}-{chunk_index}", file_path, file_type, chunk, embedding_str, parent_id))
+    return rows
+
+
+def create_scratch_table(connection, dimensions: int):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'vector'")
+        embedding_type = f"vector({dimensions})" if cursor.fetchone() else "text"
+        cursor.execute(f"""
+            CREATE TEMP TABLE docs (
+                id text PRIMARY KEY, source text, type text, chunk text,
+                embedding {embedding_type}, parent_id text
+            )
+        """)
+    connection.commit()
+    return embedding_type
+
+
+def truncate(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("TRUNCATE docs")
+    connection.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--files', type=int, default=50)
+    parser.add_argument('--chunks', type=int, default=40, help='chunks per file')
+    parser.add_argument('--dimensions', type=int, default=768)
+    parser.add_argument('--batch-rows', type=int, default=int(os.getenv('DOCS_COPY_BATCH_ROWS', '2000')))
+    args = parser.parse_args()
+
+    if not os.getenv('DATABASE_URL'):
+        sys.exit('DATABASE_URL is not set')
+
+    extractor = TextExtractor()
+    connection = extractor.open_db_connection()
+    embedding_type = create_scratch_table(connection, args.dimensions)
+    documents = make_documents(args.files, args.chunks, args.dimensions)
+    total_rows = args.files * args.chunks
+    print(f"{total_rows} rows ({args.files} files x {args.chunks} chunks), embedding column: {embedding_type}")
+
+    # Each path runs twice: an insert into the empty table and an upsert over it
+    for label in ('insert', 'upsert'):
+        if label == 'insert':
+            truncate(connection)
+        start = time.perf_counter()
+        for document in documents:
+            extractor.insert_rows(connection, legacy_rows(*document))
+        legacy_seconds = time.perf_counter() - start
+
+        if label == 'insert':
+            truncate(connection)
+        start = time.perf_counter()
+        pending = []
+        for document in documents:
+            pending.extend(extractor.chunk_rows(*document))
+            if len(pending) >= args.batch_rows:
+                extractor.copy_rows(connection, pending)
+                pending = []
+        extractor.copy_rows(connection, pending)
+        copy_seconds = time.perf_counter() - start
+
+        print(f"{label:>6}  executemany: {total_rows / legacy_seconds:>9.0f} rows/s   "
+              f"COPY: {total_rows / copy_seconds:>9.0f} rows/s   "
+              f"speedup: {legacy_seconds / copy_seconds:.1f}x")
+
+    connection.close()
+
+
+if __name__ == '__main__':
+    main()
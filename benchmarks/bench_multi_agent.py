@@ -0,0 +1,116 @@
+"""
+Benchmark multi-intent dispatch against calling the agents one after another.
+
+Starts a local stub of the Next.js API routes in which /api/weather,
+/api/stores and /api/products each answer after a configurable delay, then
+answers the same multi-intent chat turn twice:
+
+- sequential: the planned agent calls are awaited one at a time, which is what
+              sending the turn to each agent in turn costs
+- parallel:   MultiAgent.process, which runs the calls concurrently
+
+Reports the mean end-to-end latency of each. Pass a --weather-delay-ms above
+MULTI_AGENT_WEATHER_DEADLINE (in seconds) to see a timed-out agent degrade to
+an apology while the other answers still arrive.
+
+Usage:
+    python benchmarks/bench_multi_agent.py [--turns 10] [--weather-delay-ms 300]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from _agents import load_agent_module
+
+STUB_RESPONSES = {
+    '/api/products': {'data': {'products': [{'Title': 'HyperPhone X', 'Brand': 'HyperPhone', 'Price': 699,
+                                             'Color': 'Black', 'Storage': '128GB', 'Rating': 4.5}], 'total': 1}},
+    '/api/stores': {'success': True, 'data': {'stores': [{'storeNumber': '1', 'storeName': 'Austin Central',
+                                                          'address': '1 Main St', 'city': 'Austin', 'state': 'TX',
+                                                          'zipCode': '78701', 'phoneNumber': '555-0100'}], 'total': 1}},
+    '/api/weather': {'success': True, 'data': {'location': 'Austin, TX', 'temperature': 75,
+                                               'shortForecast': 'Light Rain', 'detailedForecast': 'Rain likely.'}},
+}
+
+TURN = "is it raining in Austin and which stores there have the black 128GB phone"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers every POST with a canned JSON body after the configured delay for its path."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(self.server.delays.get(self.path, 0))
+        body = json.dumps(STUB_RESPONSES.get(self.path, {})).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The agent gave up on this request at its deadline
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(delays) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.delays = delays
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--turns', type=int, default=10)
+    parser.add_argument('--weather-delay-ms', type=float, default=300)
+    parser.add_argument('--stores-delay-ms', type=float, default=150)
+    parser.add_argument('--products-delay-ms', type=float, default=250)
+    args = parser.parse_args()
+
+    server = start_stub_server({
+        '/api/weather': args.weather_delay_ms / 1000,
+        '/api/stores': args.stores_delay_ms / 1000,
+        '/api/products': args.products_delay_ms / 1000,
+    })
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ['NEXT_PUBLIC_BASE_URL'] = base_url
+    os.environ['NEXT_PUBLIC_API_BASE_URL'] = base_url
+    # Answer store queries from the stub rather than the embedded index, and
+    # send every product search to the API as the first turn of a process would
+    os.environ['STORE_LOCATOR_EMBEDDED'] = 'false'
+    os.environ['PRODUCT_CACHE_TTL'] = '0'
+
+    multi_agent_module = load_agent_module('multi')
+    agent = multi_agent_module.MultiAgent()
+    parameters = {'baseUrl': base_url}
+    sub_queries = agent.plan(TURN, parameters)
+
+    async def sequential():
+        return "\n\n".join([await agent.run_sub_query(sub_query) for sub_query in sub_queries])
+
+    print(f"turn: {TURN!r}")
+    print("agents: " + ", ".join(f"{sq.agent_type}({sq.query!r})" for sq in sub_queries))
+    for label, answer in (('sequential', sequential), ('parallel', lambda: agent.process(TURN, parameters))):
+        latencies = []
+        for _ in range(args.turns):
+            start = time.perf_counter()
+            response = await answer()
+            latencies.append(time.perf_counter() - start)
+        print(f"{label:>10}: mean {statistics.mean(latencies) * 1000:7.1f}ms   "
+              f"({len(response.splitlines())} response lines)")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
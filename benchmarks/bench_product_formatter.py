@@ -0,0 +1,193 @@
+"""
+Benchmark product result normalization and formatting in ProductAgent.
+
+Decodes and renders a synthetic /api/products response of --products hits two
+ways and reports the time of each:
+
+- before: json decoding, the per-product field_mappings dict plus lowercase-key
+          copy, and the dict-based formatter that ProductAgent.process used
+- after:  orjson decoding (when installed), product_record() and
+          format_product_results() over ProductRecord
+
+Both paths must render identical text; the script exits with an error
+otherwise. The indented JSON dump of the response that process() used to log
+unconditionally is timed separately; it now only runs when DEBUG is enabled.
+
+Usage:
+    python benchmarks/bench_product_formatter.py [--products 10000] [--repeat 7]
+"""
+import argparse
+import json
+import logging
+import random
+import sys
+import time
+
+from _agents import load_agent_module
+
+
+def make_response(count: int) -> bytes:
+    rng = random.Random(0)
+    products = []
+    for i in range(count):
+        price = round(rng.uniform(99, 1499), 2)
+        discount = rng.choice([0, 0, 10, 15, 25])
+        product = {
+            'Title': f"Phone {i}",
+            'Brand': rng.choice(['HyperPhone', 'TechPro', 'NexGen', None]),
+            'Model': rng.choice([f"X{i % 50}", None]),
+            'Price': price,
+            'Original_Price': round(price / (1 - discount / 100), 2) if discount else price,
+            'Discount_Percentage': discount,
+            'Rating': rng.choice([0, 3.5, 4.2, 4.8, 5]),
+            'Review_Count': rng.choice([0, 12, 340, 5012]),
+            'Storage': rng.choice(['64GB', '128GB', '256GB']),
+            'Color': rng.choice(['Black', 'Silver', 'Blue']),
+            'RAM': rng.choice(['6GB', '8GB', '12GB', None]),
+            'Processor': rng.choice(['Snapdragon 8 Gen 1', 'A15 Bionic', None]),
+            'Screen_Size': rng.choice([6.1, 6.7, 5.8]),
+            'Stock': rng.choice([0, 3, 25]),
+            'Water_Resistant': rng.choice(['Yes', 'No', True, False]),
+            'Wireless_Charging': rng.choice(['Yes', 'No']),
+            'Fast_Charging': rng.choice([True, False]),
+            '5G_Compatible': rng.choice(['Yes', 'No']),
+        }
+        if i % 10 == 0:
+            # Documents indexed with lowercase keys
+            product['price'] = product.pop('Price')
+            product['title'] = product.pop('Title')
+        products.append(product)
+    return json.dumps({'data': {'products': products, 'total': count}}).encode()
+
+
+FIELD_MAPPINGS = {
+    'Title': 'title', 'Brand': 'brand', 'Model': 'model', 'Price': 'price',
+    'Original_Price': 'originalPrice', 'Discount_Percentage': 'discountPercentage',
+    'Rating': 'rating', 'Review_Count': 'reviewCount', 'Storage': 'storage', 'Color': 'color',
+    'RAM': 'ram', 'Processor': 'processor', 'Screen_Size': 'screenSize', 'Stock': 'stock',
+    'Water_Resistant': 'waterResistant', 'Wireless_Charging': 'wirelessCharging',
+    'Fast_Charging': 'fastCharging', '5G_Compatible': 'fiveGCompatible',
+}
+
+
+def legacy_normalize(products):
+    """Field mapping as ProductAgent.process did it."""
+    normalized_products = []
+    for product in products:
+        normalized = {}
+        field_mappings = dict(FIELD_MAPPINGS)
+        for api_field, our_field in field_mappings.items():
+            if api_field in product:
+                normalized[our_field] = product[api_field]
+        for field in product:
+            if field.lower() == field and field not in normalized:
+                normalized[field] = product[field]
+        normalized_products.append(normalized)
+    return normalized_products
+
+
+def legacy_format(products, total):
+    """The dict-based product loop of format_product_results (no price/brand filters)."""
+    response = [f"I found {total} {'product' if total == 1 else 'products'}:"]
+    for i, product in enumerate(products):
+        title_parts = []
+        if product.get('brand'):
+            title_parts.append(product['brand'])
+        if product.get('model'):
+            title_parts.append(product['model'])
+        product_title = " ".join(title_parts) if title_parts else product.get('title', 'Unknown Product')
+        price_text = f"${float(product.get('price', 0)):.2f}"
+        if product.get('discountPercentage') and float(product.get('discountPercentage', 0)) > 0:
+            orig_price = product.get('originalPrice', 0)
+            if orig_price and float(orig_price) > float(product.get('price', 0)):
+                price_text = f"${float(product.get('price', 0)):.2f} 🏷️ {int(float(product.get('discountPercentage', 0)))}% off (was ${float(orig_price):.2f})"
+        model_line = f"\n📱 {product_title} 💸 {price_text}"
+        rating_line = ""
+        if product.get('rating'):
+            stars = "⭐" * int(float(product.get('rating', 0)))
+            rating_line = f"{stars} {float(product.get('rating', 0))}/5"
+            if product.get('reviewCount') and int(product.get('reviewCount', 0)) > 0:
+                rating_line += f" ({product['reviewCount']} reviews)"
+        specs_parts = []
+        if product.get('storage'):
+            specs_parts.append(f"Storage: {product['storage']} 💾")
+        if product.get('color'):
+            specs_parts.append(f"Color: {product['color']} 🎨")
+        if product.get('ram'):
+            specs_parts.append(f"RAM: {product['ram']} 🧠")
+        if product.get('processor'):
+            specs_parts.append(f"Processor: {product['processor']} 🔄")
+        if product.get('screenSize'):
+            specs_parts.append(f"Screen: {product['screenSize']}\" 📱")
+        if product.get('stock') is not None:
+            if int(product.get('stock', 0)) > 0:
+                specs_parts.append(f"Stock: {product['stock']} 📦")
+            else:
+                specs_parts.append("Out of Stock ❌")
+        specs_line = " • ".join(specs_parts)
+        features = []
+        if product.get('waterResistant') == True or product.get('waterResistant') == 'Yes':
+            features.append("Water Resistant 💧")
+        if product.get('wirelessCharging') == True or product.get('wirelessCharging') == 'Yes':
+            features.append("Wireless Charging 🔄")
+        if product.get('fastCharging') == True or product.get('fastCharging') == 'Yes':
+            features.append("Fast Charging ⚡")
+        if product.get('fiveGCompatible') == True or product.get('fiveGCompatible') == 'Yes':
+            features.append("5G Compatible 📶")
+        features_line = " • ".join(features) if features else ""
+        response.append(model_line)
+        if rating_line:
+            response.append(rating_line)
+        response.append(specs_line)
+        if features_line:
+            response.append(features_line)
+        if i < len(products) - 1:
+            response.append("")
+    return "\n".join(response)
+
+
+def timed(func, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+    return min(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args()
+
+    module = load_agent_module('product')
+    agent = module.ProductAgent()
+    logging.disable(logging.CRITICAL)
+    body = make_response(args.products)
+    params = {'filters': {}}
+
+    def before():
+        data = json.loads(body)
+        return legacy_format(legacy_normalize(data['data']['products']), data['data']['total'])
+
+    def after():
+        data = module.orjson.loads(body) if module.orjson else json.loads(body)
+        products = [module.product_record(product) for product in data['data']['products']]
+        return agent.format_product_results(products, data['data']['total'], params)
+
+    before_seconds, before_text = timed(before, args.repeat)
+    after_seconds, after_text = timed(after, args.repeat)
+    if before_text != after_text:
+        sys.exit("Rendered output differs between the two paths")
+
+    print(f"{args.products} products ({len(body) / 1e6:.1f} MB response), orjson: {'yes' if module.orjson else 'no'}")
+    print(f"before: {before_seconds * 1000:7.1f}ms   after: {after_seconds * 1000:7.1f}ms   "
+          f"speedup: {before_seconds / after_seconds:.1f}x (identical output)")
+
+    dump_seconds, _ = timed(lambda: json.dumps(json.loads(body), indent=2), args.repeat)
+    print(f"debug dump of the response: {dump_seconds * 1000:7.1f}ms (skipped unless DEBUG is enabled)")
+
+
+if __name__ == '__main__':
+    main()
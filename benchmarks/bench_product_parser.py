@@ -0,0 +1,51 @@
+"""
+Microbenchmark for ProductAgent.extract_search_params.
+
+Parses the product queries used by test-product-agent.js and reports the
+per-query parse time, with agent logging disabled so only parsing is measured.
+
+Usage:
+    python benchmarks/bench_product_parser.py [--number 2000]
+"""
+import argparse
+import logging
+import re
+
+from _agents import REPO_ROOT, load_agent_module, time_per_call
+
+EXTRA_QUERIES = [
+    'black 128gb phone',
+    'phones under $500',
+    'Show me gold HyperPhone phones with 256GB storage and wireless charging under $900',
+    'water resistant budget phones with 8GB RAM and a MediaTek chip',
+    'what is the newest flagship with fast charging and 5G',
+]
+
+
+def load_queries():
+    """Collect the quoted queries from test-product-agent.js plus a few long ones."""
+    with open(f"{REPO_ROOT}/test-product-agent.js") as f:
+        source = f.read()
+    block = source[source.index('const TEST_QUERIES'):]
+    block = block[:block.index('];')]
+    return re.findall(r"^\s*'([^']+)',?", block, re.MULTILINE) + EXTRA_QUERIES
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--number', type=int, default=2000, help='Passes over the query set per sample')
+    args = parser.parse_args()
+
+    agent = load_agent_module('product').ProductAgent()
+    logging.disable(logging.CRITICAL)
+
+    queries = load_queries()
+    per_pass = time_per_call(lambda: [agent.extract_search_params(q) for q in queries], number=args.number)
+    print(f"{len(queries)} queries: {per_pass / len(queries):.2f} us/query")
+
+    slowest = max(queries, key=lambda q: time_per_call(lambda: agent.extract_search_params(q), number=args.number))
+    print(f"slowest query: {slowest!r}")
+
+
+if __name__ == '__main__':
+    main()
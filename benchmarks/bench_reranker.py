@@ -0,0 +1,112 @@
+"""
+Benchmark micro-batched reranker inference against one model call per request.
+
+Fires --requests concurrent /rerank-style requests (a query plus --passages
+passages of random length) at two schedulers and reports requests/sec and
+mean/p95 latency:
+
+- direct:  each request scores its own pairs in one call, the previous
+           behaviour of the reranker service (calls are serialized because they
+           block the event loop)
+- batched: requests go through batching.MicroBatcher, which merges pairs from
+           concurrent requests into length-bucketed batches
+
+By default the scorer is the service's placeholder (score = len/100) plus a
+simulated per-call cost (--call-overhead-ms) and per-pair cost
+(--pair-cost-ms), which is how a CPU cross-encoder behaves. Pass --model to
+score with a real FlagEmbedding reranker on CPU instead, e.g.
+--model BAAI/bge-reranker-base.
+
+Usage:
+    python benchmarks/bench_reranker.py [--requests 200] [--concurrency 32] [--passages 10]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'external_services', 'reranker-service'))
+
+from batching import MicroBatcher  # noqa: E402
+
+
+def make_scorer(args):
+    if args.model:
+        from FlagEmbedding import FlagReranker
+        reranker = FlagReranker(args.model, use_fp16=False, device='cpu')
+
+        def score(pairs):
+            scores = reranker.compute_score([list(pair) for pair in pairs], batch_size=len(pairs))
+            return scores if isinstance(scores, list) else [scores]
+        return score
+
+    def score(pairs):
+        time.sleep((args.call_overhead_ms + args.pair_cost_ms * len(pairs)) / 1000)
+        return [len(passage) / 100.0 for _, passage in pairs]
+    return score
+
+
+def make_requests(count: int, passages: int):
+    rng = random.Random(0)
+    words = 'laptop battery screen gaming keyboard memory storage price warranty display'.split()
+    return [
+        (f"best {rng.choice(words)} for {rng.choice(words)}",
+         [' '.join(rng.choices(words, k=rng.randint(5, 120))) for _ in range(passages)])
+        for _ in range(count)
+    ]
+
+
+async def run(requests, concurrency: int, score_request):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(query, passages):
+        async with semaphore:
+            start = time.perf_counter()
+            # Yield like a network read would, so requests arrive concurrently
+            # even when the scorer blocks the event loop
+            await asyncio.sleep(0)
+            await score_request(query, passages)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(q, p) for q, p in requests))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return len(requests) / elapsed, statistics.mean(latencies) * 1000, latencies[int(len(latencies) * 0.95) - 1] * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--passages', type=int, default=10, help='passages per request')
+    parser.add_argument('--max-batch', type=int, default=int(os.getenv('RERANK_MAX_BATCH', '128')))
+    parser.add_argument('--max-wait-ms', type=float, default=float(os.getenv('RERANK_MAX_WAIT_MS', '5')))
+    parser.add_argument('--bucket-size', type=int, default=int(os.getenv('RERANK_BUCKET_SIZE', '32')))
+    parser.add_argument('--call-overhead-ms', type=float, default=8.0)
+    parser.add_argument('--pair-cost-ms', type=float, default=0.5)
+    parser.add_argument('--model', type=str, default=None)
+    args = parser.parse_args()
+
+    score = make_scorer(args)
+    requests = make_requests(args.requests, args.passages)
+
+    async def direct(query, passages):
+        score([(query, p) for p in passages])
+
+    batcher = MicroBatcher(score, args.max_batch, args.max_wait_ms, args.bucket_size)
+
+    print(f"{args.requests} requests x {args.passages} passages, concurrency {args.concurrency}, "
+          f"max batch {batcher.max_batch}, max wait {batcher.max_wait * 1000:.1f}ms, bucket {batcher.bucket_size}")
+    for label, score_request in (('direct', direct), ('batched', batcher.score)):
+        throughput, mean_ms, p95_ms = await run(requests, args.concurrency, score_request)
+        print(f"{label:>8}: {throughput:8.1f} req/s   mean {mean_ms:8.1f}ms   p95 {p95_ms:8.1f}ms")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,45 @@
+"""
+Microbenchmark for StoreLocatorAgent.extract_search_params.
+
+Times the store queries used by test-store-locator-agent.js with agent logging
+disabled and reports the per-query parse time. The parity cases against the
+regex-only parser the gazetteer replaced live in
+app/api/agents/tests/test_store_gazetteer.py.
+
+Usage:
+    python benchmarks/bench_store_query_parser.py [--number 2000]
+"""
+import argparse
+import logging
+import re
+
+from _agents import REPO_ROOT, load_agent_module, time_per_call
+
+
+def load_queries():
+    """Collect the quoted queries from test-store-locator-agent.js."""
+    with open(f"{REPO_ROOT}/test-store-locator-agent.js") as f:
+        source = f.read()
+    block = source[source.index('const TEST_QUERIES'):]
+    block = block[:block.index('];')]
+    return list(dict.fromkeys(re.findall(r"^\s*'([^']+)'", block, re.MULTILINE)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--number', type=int, default=2000, help='Passes over the query set per sample')
+    args = parser.parse_args()
+
+    agent = load_agent_module('store-locator').StoreLocatorAgent()
+    logging.disable(logging.CRITICAL)
+
+    queries = load_queries()
+    per_pass = time_per_call(lambda: [agent.extract_search_params(q) for q in queries], number=args.number)
+    print(f"{len(queries)} queries: {per_pass / len(queries):.2f} us/query")
+
+    slowest = max(queries, key=lambda q: time_per_call(lambda: agent.extract_search_params(q), number=args.number))
+    print(f"slowest query: {slowest!r}")
+
+
+if __name__ == '__main__':
+    main()
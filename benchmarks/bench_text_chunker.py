@@ -0,0 +1,110 @@
+"""
+Benchmark TextExtractor.chunk_text.
+
+Chunks a synthetic document of --mb megabytes with the previous
+implementation (whole-chunk neighbours joined and truncated) and the new one.
+For each it reports throughput, chunk count, characters sent to the embedding
+model relative to the text, and peak traced memory. Then it times the new
+chunker on unpunctuated text of --mb, 2x and 4x that size, where the whole
+text is one sentence many chunks long; the time should grow linearly.
+
+The chunker's properties (chunk lengths, exact overlap, nothing lost or
+duplicated) are tested in external_services/text_extraction/tests.
+
+Usage:
+    python benchmarks/bench_text_chunker.py [--mb 8]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'external_services', 'text_extraction'))
+
+from text_extractor import TextExtractor  # noqa: E402
+
+WORDS = ('store inventory phone battery charging network order return warranty '
+         'shipping customer display camera storage price discount support e.g.').split()
+
+
+def legacy_chunk_text(text, max_length=3600, overlap=400, min_chunk_length=100, sentence_split=True):
+    """chunk_text as it was before the streaming chunker."""
+    text = re.sub(r'\s+', ' ', text.strip())
+    sentences = re.split(r'(?<=[.!?])\s+', text) if sentence_split else [text]
+    chunks = []
+    current_chunk = []
+    current_length = 0
+    for sentence in sentences:
+        if current_length + len(sentence) > max_length:
+            if current_chunk:
+                chunks.append(' '.join(current_chunk))
+                current_chunk = []
+                current_length = 0
+        current_chunk.append(sentence)
+        current_length += len(sentence) + 1
+        if current_length >= max_length or sentence == sentences[-1]:
+            chunks.append(' '.join(current_chunk))
+            current_chunk = []
+            current_length = 0
+    overlapped_chunks = []
+    for i in range(len(chunks)):
+        overlapped_chunk = ' '.join(chunks[max(0, i - 1):min(len(chunks), i + 2)]).strip()
+        if len(overlapped_chunk) > max_length:
+            overlapped_chunk = overlapped_chunk[:max_length]
+        if len(overlapped_chunk) >= min_chunk_length:
+            overlapped_chunks.append(overlapped_chunk)
+    return overlapped_chunks
+
+
+def measure(func, text):
+    tracemalloc.start()
+    start = time.perf_counter()
+    chunks = func(text)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--mb', type=float, default=8)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    sentences = []
+    size = 0
+    while size < args.mb * 1e6:
+        sentence = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(6, 30))).capitalize() + '.'
+        sentences.append(sentence)
+        size += len(sentence) + 1
+    text = '\n'.join(sentences)
+    del sentences
+
+    # The ingestion defaults (CHUNK_SIZE, CHUNK_OVERLAP, MIN_CHUNK_LENGTH)
+    params = dict(max_length=1800, overlap=200, min_chunk_length=100)
+    extractor = TextExtractor()
+    print(f"{len(text) / 1e6:.1f} MB document, max_length=1800, overlap=200")
+    for label, func in (('before', lambda t: legacy_chunk_text(t, **params)),
+                        ('after', lambda t: extractor.chunk_text(t, **params))):
+        elapsed, peak, chunks = measure(func, text)
+        embedded = sum(len(chunk) for chunk in chunks)
+        print(f"{label:>6}: {len(text) / 1e6 / elapsed:6.1f} MB/s   {len(chunks):6d} chunks   "
+              f"embedded {embedded / len(text):.2f}x the text   peak memory {peak / 1e6:6.1f} MB")
+    del text
+
+    for scale in (1, 2, 4):
+        words = int(args.mb * scale * 1e6 / 8)
+        text = ' '.join(rng.choice(WORDS) for _ in range(words))
+        start = time.perf_counter()
+        chunks = extractor.chunk_text(text, **params)
+        elapsed = time.perf_counter() - start
+        print(f"{len(text) / 1e6:5.1f} MB without sentence ends: {elapsed:6.2f}s   {len(chunks):6d} chunks")
+
+
+if __name__ == '__main__':
+    main()
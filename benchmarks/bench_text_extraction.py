@@ -0,0 +1,128 @@
+"""
+Benchmark TextExtractor.extract_text on a synthetic corpus.
+
+Writes a mix of .txt, .md, .py, .csv, .json, .ipynb and .docx files (a few of
+them large) to a temporary directory and extracts them all with a thread pool,
+as process_directory() does:
+
+- local, inline:  every file parsed in the calling thread (EXTRACT_PROCESSES=0)
+- local, pool:    files above EXTRACT_INLINE_MAX_BYTES parsed in the process pool
+- tika:           every file sent to the Tika server, the previous behaviour;
+                  only run when Tika answers on localhost:9998
+
+Usage:
+    python benchmarks/bench_text_extraction.py [--files 400] [--workers 8]
+"""
+import argparse
+import concurrent.futures
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'external_services', 'text_extraction'))
+
+from text_extractor import TextExtractor  # noqa: E402
+
+WORDS = ('store inventory phone battery charging network order return warranty '
+         'shipping customer display camera storage price discount support').split()
+
+
+def paragraph(rng: random.Random, sentences: int) -> str:
+    return ' '.join(
+        ' '.join(rng.choice(WORDS) for _ in range(rng.randint(6, 18))).capitalize() + '.'
+        for _ in range(sentences)
+    )
+
+
+def write_corpus(directory: str, files: int) -> int:
+    from docx import Document
+
+    rng = random.Random(0)
+    total_bytes = 0
+    for i in range(files):
+        kind = i % 7
+        # Every 25th file is large enough for the process pool
+        sentences = 4000 if i % 25 == 0 else rng.randint(5, 60)
+        path = os.path.join(directory, f"doc_{i}")
+        if kind == 0:
+            path += '.txt'
+            open(path, 'w').write(paragraph(rng, sentences))
+        elif kind == 1:
+            path += '.md'
+            open(path, 'w').write(f"# Document {i}\n\n{paragraph(rng, sentences)}\n")
+        elif kind == 2:
+            path += '.py'
+            open(path, 'w').write(f'"""{paragraph(rng, sentences)}"""\n\ndef f():\n    return {i}\n')
+        elif kind == 3:
+            path += '.csv'
+            open(path, 'w').write('\n'.join(f"{n},{rng.choice(WORDS)},{rng.random():.4f}" for n in range(sentences * 3)))
+        elif kind == 4:
+            path += '.json'
+            json.dump({'id': i, 'body': paragraph(rng, sentences)}, open(path, 'w'))
+        elif kind == 5:
+            path += '.ipynb'
+            cells = [{'cell_type': 'markdown', 'source': [paragraph(rng, 3)]} for _ in range(max(1, sentences // 3))]
+            json.dump({'cells': cells, 'nbformat': 4, 'nbformat_minor': 5, 'metadata': {}}, open(path, 'w'))
+        else:
+            path += '.docx'
+            document = Document()
+            for _ in range(max(1, sentences // 5)):
+                document.add_paragraph(paragraph(rng, 5))
+            document.save(path)
+        total_bytes += os.path.getsize(path)
+    return total_bytes
+
+
+def tika_available(extractor: TextExtractor) -> bool:
+    try:
+        return extractor.session.get("http://localhost:9998/tika", timeout=2).ok
+    except Exception:
+        return False
+
+
+def run(extract, paths, workers: int) -> float:
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(extract, paths))
+    elapsed = time.perf_counter() - start
+    errors = [result['error'] for result in results if 'error' in result]
+    if errors:
+        sys.exit(f"{len(errors)} files failed, e.g. {errors[0]}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--files', type=int, default=400)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        total_bytes = write_corpus(directory, args.files)
+        paths = sorted(os.path.join(directory, name) for name in os.listdir(directory))
+        print(f"{len(paths)} files, {total_bytes / 1e6:.1f} MB, {args.workers} extraction threads, "
+              f"{os.cpu_count()} CPUs")
+
+        inline = TextExtractor()
+        inline.parse_processes = 0
+        pooled = TextExtractor()
+        try:
+            run(pooled.extract_text, paths[:50], args.workers)  # start the pool
+            modes = [('local, inline', inline.extract_text), ('local, pool', pooled.extract_text)]
+            if tika_available(inline):
+                modes.append(('tika', lambda path: {'content': inline.extract_with_tika(path)}))
+            else:
+                print("Tika is not reachable on localhost:9998; skipping the Tika run")
+            for label, extract in modes:
+                elapsed = run(extract, paths, args.workers)
+                print(f"{label:>13}: {elapsed * 1000:8.1f}ms   {elapsed / len(paths) * 1e6:7.0f}us/file")
+        finally:
+            pooled.close()
+
+
+if __name__ == '__main__':
+    main()
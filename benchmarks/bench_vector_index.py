@@ -0,0 +1,129 @@
+"""
+Benchmark the local vector index (external_services/text_extraction/vector_index.py).
+
+Adds --rows synthetic clustered embeddings to a fresh index in ingestion-sized
+batches (training the lists as it grows), reopens it from disk, and runs
+--queries searches. For float32 and int8 list scans and a few nprobe values it
+reports the median and p95 latency of search() and the recall@10 against an
+exhaustive numpy scan. The time of the exhaustive scan is reported as well.
+
+Before that it checks, on a small index, that replaced and deleted chunks
+never come back, that a compaction keeps the index consistent and that the
+index survives a reopen; the script exits with an error otherwise.
+
+Usage:
+    python benchmarks/bench_vector_index.py [--rows 200000] [--dim 768] [--queries 200]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'external_services', 'text_extraction'))
+
+from vector_index import VectorIndex, normalize  # noqa: E402
+
+
+def clustered(rng: np.random.Generator, rows: int, dim: int, clusters: int) -> np.ndarray:
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, rows)
+    return centers[labels] + 1.2 * rng.standard_normal((rows, dim)).astype(np.float32)
+
+
+def add(index: VectorIndex, vectors: np.ndarray, offset: int = 0, batch: int = 2000):
+    for start in range(0, len(vectors), batch):
+        block = vectors[start:start + batch]
+        ids = [f"doc{(offset + start + i) // 40}-{(offset + start + i) % 40}" for i in range(len(block))]
+        index.add(ids, [chunk_id.split('-')[0] for chunk_id in ids], ['bench'] * len(ids), [''] * len(ids), block)
+
+
+def check_updates(directory: str) -> None:
+    rng = np.random.default_rng(1)
+    os.environ['VECTOR_INDEX_MIN_TRAIN'] = '500'
+    index = VectorIndex(os.path.join(directory, 'check'))
+    vectors = clustered(rng, 2000, 32, 10)
+    add(index, vectors)
+
+    def fail(message):
+        sys.exit(f"update check failed: {message}")
+
+    # Replacing a chunk id hides the old vector
+    target = vectors[5]
+    index.add(['doc0-5'], ['doc0'], ['bench'], ['new'], -target[None, :])
+    if any(r['id'] == 'doc0-5' and r['chunk'] != 'new' for r in index.search(target, 5, nprobe=100)):
+        fail("replaced chunk returned")
+    # Stale chunks and purged documents disappear
+    index.delete_stale('doc1', 10)
+    index.delete_parents(['doc2'])
+    for vector in vectors[40:120]:
+        for result in index.search(vector, 3, nprobe=100):
+            if result['parent_id'] == 'doc2' or (result['parent_id'] == 'doc1' and int(result['id'].split('-')[1]) >= 10):
+                fail(f"deleted chunk {result['id']} returned")
+    # Compaction (more than a fifth deleted) and reopening keep every live chunk findable
+    index.delete_parents([f"doc{i}" for i in range(3, 20)])
+    index.train()
+    expected = index.stats()
+    index.close()
+    index = VectorIndex(os.path.join(directory, 'check'))
+    if index.stats() != expected or index.generation != 1:
+        fail(f"reopened index differs: {index.stats()} vs {expected}")
+    for i in range(800, 2000, 97):
+        chunk_id = f"doc{i // 40}-{i % 40}"
+        if index.search(vectors[i], 1, nprobe=1000)[0]['id'] != chunk_id:
+            fail(f"{chunk_id} not found after compaction")
+    index.close()
+    del os.environ['VECTOR_INDEX_MIN_TRAIN']
+    print("update checks passed (replace, delete, compaction, reopen)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--dim', type=int, default=768)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        check_updates(directory)
+
+        rng = np.random.default_rng(0)
+        vectors = clustered(rng, args.rows, args.dim, 1000)
+        queries = vectors[rng.choice(args.rows, args.queries, replace=False)] \
+            + 0.8 * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+
+        start = time.perf_counter()
+        index = VectorIndex(os.path.join(directory, 'bench'))
+        add(index, vectors)
+        build_seconds = time.perf_counter() - start
+        index.close()
+        index = VectorIndex(os.path.join(directory, 'bench'))
+        print(f"{args.rows} x {args.dim} vectors added in {build_seconds:.1f}s: {index.stats()}")
+
+        unit = normalize(vectors)
+        start = time.perf_counter()
+        truth = [set(np.argsort(-(unit @ normalize(q)))[:10]) for q in queries]
+        brute_ms = (time.perf_counter() - start) / len(queries) * 1000
+        print(f"exhaustive numpy scan: {brute_ms:.1f}ms/query")
+
+        for quantized in (False, True):
+            for nprobe in (4, 8, 16):
+                latencies, recall = [], 0
+                for query, expected in zip(queries, truth):
+                    start = time.perf_counter()
+                    results = index.search(query, 10, nprobe=nprobe, quantized=quantized)
+                    latencies.append(time.perf_counter() - start)
+                    found = {int(r['id'].split('-')[0][3:]) * 40 + int(r['id'].split('-')[1]) for r in results}
+                    recall += len(found & expected) / 10
+                latencies = np.array(latencies) * 1000
+                print(f"{'int8' if quantized else 'float32':>7} nprobe={nprobe:<3} "
+                      f"p50 {np.median(latencies):6.2f}ms   p95 {np.percentile(latencies, 95):6.2f}ms   "
+                      f"recall@10 {recall / len(queries):.3f}")
+        index.close()
+
+
+if __name__ == '__main__':
+    main()
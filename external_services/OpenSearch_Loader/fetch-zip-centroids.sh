@@ -0,0 +1,22 @@
+#!/bin/bash
+set -e
+
+# Downloads the Census Bureau ZCTA gazetteer (ZIP code centroids) used by the
+# store locator's nearest-store search (app/api/agents/store_geo.py).
+# Without it the search uses the bundled three-digit prefix table,
+# zip3_centroids.csv.
+# Usage: ./fetch-zip-centroids.sh [year]
+
+YEAR="${1:-2023}"
+URL="https://www2.census.gov/geo/docs/maps-data/data/gazetteer/${YEAR}_Gazetteer/${YEAR}_Gaz_zcta_national.zip"
+DEST="$(cd "$(dirname "$0")" && pwd)/zip_centroids.txt"
+TMP_DIR="$(mktemp -d)"
+trap 'rm -rf "$TMP_DIR"' EXIT
+
+echo "=== ZIP Centroid Download Tool ==="
+echo "Downloading ${URL}..."
+curl --fail --silent --show-error --location -o "$TMP_DIR/zcta.zip" "$URL"
+unzip -q -o "$TMP_DIR/zcta.zip" -d "$TMP_DIR"
+mv "$TMP_DIR"/*_Gaz_zcta_national.txt "$DEST"
+
+echo "✓ Saved $(($(wc -l < "$DEST") - 1)) ZIP centroids to $DEST"
@@ -266,6 +266,12 @@ else
     echo "✓ Successfully loaded $COUNT documents"
 fi
 
+# Invalidate the Python agents' product search cache (see app/api/agents/response_cache.py)
+CATALOG_CACHE_STAMP="${CATALOG_CACHE_STAMP:-../../logs/catalog.stamp}"
+mkdir -p "$(dirname "$CATALOG_CACHE_STAMP")"
+touch "$CATALOG_CACHE_STAMP"
+echo "✓ Product search cache invalidated ($CATALOG_CACHE_STAMP)"
+
 echo "=== Setup Complete ==="
 echo "OpenSearch enhanced catalog index is ready for use!"
 echo "Access OpenSearch at: http://localhost:9200/"
@@ -0,0 +1,95 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple
+
+# Scores a list of (query, passage) pairs in one model call
+ScoreFn = Callable[[List[Tuple[str, str]]], List[float]]
+
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching scheduler for reranker inference
+
+    Concurrent requests put their (query, passage) pairs on a queue. A single
+    scheduler task collects pairs for at most max_wait_ms (or until max_batch
+    pairs are waiting), sorts them by length into buckets of bucket_size so
+    each model call pads as little as possible, scores them in a worker thread
+    and hands every request its own scores back. The event loop stays free
+    while the model runs.
+    """
+
+    def __init__(
+        self,
+        score_fn: ScoreFn,
+        max_batch: int = None,
+        max_wait_ms: float = None,
+        bucket_size: int = None
+    ):
+        self.score_fn = score_fn
+        self.max_batch = max_batch or int(os.getenv('RERANK_MAX_BATCH', '128'))
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else float(os.getenv('RERANK_MAX_WAIT_MS', '5'))) / 1000
+        self.bucket_size = bucket_size or int(os.getenv('RERANK_BUCKET_SIZE', '32'))
+        # One worker: the model runs one batch at a time
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rerank')
+        self.queue = None
+        self.task = None
+
+    async def score(self, query: str, passages: List[str]) -> List[float]:
+        """Score passages against a query, batched with concurrent requests"""
+        if not passages:
+            return []
+        if self.task is None:
+            self.queue = asyncio.Queue()
+            self.task = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put(([(query, p) for p in passages], future))
+        return await future
+
+    def _score_buckets(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        """Score pairs in length-sorted buckets and return scores in input order"""
+        order = sorted(range(len(pairs)), key=lambda i: len(pairs[i][0]) + len(pairs[i][1]))
+        scores = [0.0] * len(pairs)
+        for start in range(0, len(order), self.bucket_size):
+            bucket = order[start:start + self.bucket_size]
+            for i, score in zip(bucket, self.score_fn([pairs[i] for i in bucket])):
+                scores[i] = score
+        return scores
+
+    async def _collect(self) -> list:
+        """Wait for one request, then gather more until the batch is full or max_wait passes"""
+        loop = asyncio.get_running_loop()
+        items = [await self.queue.get()]
+        size = len(items[0][0])
+        deadline = loop.time() + self.max_wait
+        while size < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            items.append(item)
+            size += len(item[0])
+        return items
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = await self._collect()
+            pairs = [pair for item_pairs, _ in items for pair in item_pairs]
+            try:
+                scores = await loop.run_in_executor(self.executor, self._score_buckets, pairs)
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            # Scatter scores back to the waiting requests
+            offset = 0
+            for item_pairs, future in items:
+                if not future.done():
+                    future.set_result(scores[offset:offset + len(item_pairs)])
+                offset += len(item_pairs)
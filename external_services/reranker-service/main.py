@@ -3,6 +3,8 @@ from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from typing import List, Tuple
 
+from batching import MicroBatcher
+
 # Assuming FlagReranker is imported from FlagEmbedding
 # If using the FlagEmbedding package, adjust the import accordingly
 try:
@@ -42,13 +44,25 @@ if not hasattr(model, 'rerank'):
     import types
     model.rerank = types.MethodType(rerank_method, model)
 
+def score_pairs(pairs: List[Tuple[str, str]]) -> List[float]:
+    """Score (query, passage) pairs in one model call"""
+    if hasattr(model, 'compute_score'):
+        scores = model.compute_score([list(pair) for pair in pairs], batch_size=len(pairs))
+        # FlagReranker returns a bare float for a single pair
+        return scores if isinstance(scores, list) else [scores]
+    return [model.rerank(query, [passage])[0][1] for query, passage in pairs]
+
+# Batch pairs from concurrent requests; inference runs off the event loop
+batcher = MicroBatcher(score_pairs)
+
 # Create FastAPI app
 app = FastAPI(title="Reranker Service", description="A FastAPI service for reranking passages using GPU acceleration (MPS)", version="1.0")
 
 @app.post("/rerank")
 async def rerank(request: RerankRequest):
     try:
-        ranked = model.rerank(request.query, request.passages)
+        scores = await batcher.score(request.query, request.passages)
+        ranked = list(zip(request.passages, scores))
         # Optionally sort the ranked passages by score descending
         ranked_sorted = sorted(ranked, key=lambda x: x[1], reverse=True)
         return ranked_sorted
@@ -0,0 +1,454 @@
+# asyncio ingestion engine: one event loop for Tika, Ollama and PostgreSQL
+import io
+import os
+import asyncio
+import random
+import hashlib
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, TypeVar
+
+import httpx  # Async HTTP client for Tika and Ollama
+import asyncpg  # Async PostgreSQL driver
+from tqdm import tqdm  # Progress bar for long-running tasks
+
+import local_parsers  # Native parsers for text, notebooks and Word documents
+from ingest_manifest import IngestManifest  # Incremental re-ingestion
+from text_extractor import CREATE_STAGING_SQL, MERGE_STAGING_SQL, TextExtractor, copy_text
+
+T = TypeVar('T')
+
+# HTTP statuses worth retrying: rate limiting and server-side failures
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Decide whether a failed backend call may succeed when repeated
+
+    Args:
+        error (Exception): Error raised by the call
+
+    Returns:
+        bool: True for connection errors, timeouts and retryable HTTP statuses
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in _RETRY_STATUSES
+    return isinstance(error, (httpx.TransportError, asyncpg.PostgresConnectionError,
+                              asyncpg.InterfaceError, OSError))
+
+
+class AsyncIngestEngine:
+    """
+    Ingest a directory on a single asyncio event loop
+
+    The asyncio counterpart of TextExtractor.run_pipeline(). A fixed number
+    of file tasks take files from a bounded queue and extract (locally or
+    with Tika), chunk and embed them; writer tasks copy the rows into docs in
+    batches spanning files, on their own pooled connections. Every backend
+    has one global semaphore, so at most tika_concurrency Tika requests and
+    ollama_concurrency Ollama requests are in flight, however many files are.
+    Failed calls are retried with exponential backoff and full jitter.
+
+    Chunking, text decoding and the manifest/cache lookups reuse the
+    TextExtractor they are given; CPU-heavy work runs in its process pool or
+    in worker threads so the loop stays responsive.
+    """
+
+    def __init__(
+        self,
+        extractor: TextExtractor,
+        tika_concurrency: int = 8,
+        ollama_concurrency: int = 4,
+        write_workers: int = 2,
+        files_in_flight: int = 32,
+        queue_size: int = 8,
+        manifest: Optional[IngestManifest] = None
+    ):
+        """
+        Configure the engine
+
+        Args:
+            extractor (TextExtractor): Extractor providing parsing, chunking,
+                batching and the embedding cache
+            tika_concurrency (int): Tika requests in flight
+            ollama_concurrency (int): Ollama batch requests in flight
+            write_workers (int): Database writer tasks/connections
+            files_in_flight (int): Files being extracted, chunked or embedded at once
+            queue_size (int): Capacity of the queue of embedded files waiting
+                for a writer
+            manifest (IngestManifest, optional): Manifest for incremental runs
+
+        Configuration:
+        - INGEST_RETRIES: Attempts per backend call (default 4)
+        - INGEST_RETRY_BASE_DELAY: Backoff base in seconds (default 0.5)
+        """
+        self.extractor = extractor
+        self.tika_concurrency = tika_concurrency
+        self.ollama_concurrency = ollama_concurrency
+        self.write_workers = write_workers
+        self.files_in_flight = files_in_flight
+        self.queue_size = queue_size
+        self.manifest = manifest
+        self.attempts = max(1, int(os.getenv('INGEST_RETRIES', '4')))
+        self.retry_base_delay = float(os.getenv('INGEST_RETRY_BASE_DELAY', '0.5'))
+        self.copy_batch_rows = int(os.getenv('DOCS_COPY_BATCH_ROWS', '2000'))
+        self.stats = {'files': 0, 'skipped': 0, 'failed': 0, 'written': 0, 'incomplete': 0,
+                      'chunks': 0, 'purged': 0, 'retries': 0}
+
+    async def with_retries(self, name: str, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await a backend call, retrying retryable failures
+
+        The n-th retry waits a random time between 0 and
+        INGEST_RETRY_BASE_DELAY * 2**n seconds (full jitter), so clients that
+        failed together do not retry together.
+
+        Args:
+            name (str): Backend name used in messages
+            call: Coroutine function performing the request
+
+        Returns:
+            The call's result
+
+        Raises:
+            Exception: The last error, once the attempts are used up or the
+                error is not retryable
+        """
+        for attempt in range(self.attempts):
+            try:
+                return await call()
+            except Exception as e:
+                if attempt == self.attempts - 1 or not is_retryable(e):
+                    raise
+                delay = random.uniform(0, self.retry_base_delay * 2 ** attempt)
+                print(f"{name} call failed ({e!r}), retrying in {delay:.2f}s")
+                self.stats['retries'] += 1
+                await asyncio.sleep(delay)
+
+    async def extract(self, file_path: str) -> Optional[tuple]:
+        """
+        Extract the text of a file, locally when possible and otherwise with Tika
+
+        Args:
+            file_path (str): File to extract
+
+        Returns:
+            Optional[tuple]: (content, file_type), or None if extraction failed
+        """
+        try:
+            if local_parsers.local_format(file_path) is not None:
+                pool = None
+                if os.path.getsize(file_path) > self.extractor.inline_max_bytes:
+                    pool = self.extractor.parse_pool()
+                try:
+                    if pool is None:
+                        parsed = await asyncio.to_thread(local_parsers.parse_file, file_path)
+                    else:
+                        parsed = await asyncio.get_running_loop().run_in_executor(
+                            pool, local_parsers.parse_file, file_path)
+                except Exception as e:
+                    print(f"Local parsing failed for {file_path}, falling back to Tika: {e}")
+                    parsed = None
+                if parsed is not None:
+                    return parsed
+
+            data = await asyncio.to_thread(Path(file_path).read_bytes)
+
+            async def put():
+                async with self.tika_limit:
+                    response = await self.client.put(
+                        "http://localhost:9998/tika",
+                        headers={"Accept": "text/plain"},
+                        content=data,
+                        timeout=60
+                    )
+                response.raise_for_status()
+                return response.text
+
+            return await self.with_retries('Tika', put), 'tika'
+        except Exception as e:
+            print(f"Error processing {file_path}: {e}")
+            return None
+
+    async def embed_batch(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Embed chunks with one /api/embed request, falling back to one request per chunk
+
+        Args:
+            texts (List[str]): Text chunks to embed
+
+        Returns:
+            List[Optional[List[float]]]: One embedding (or None on failure) per chunk, in order
+        """
+        url = f"{self.extractor.ollama_url}/api/embed"
+        model = self.extractor.embedding_model
+
+        async def post(inputs):
+            async with self.ollama_limit:
+                response = await self.client.post(
+                    url, json={"model": model, "input": inputs}, timeout=30 + 5 * len(inputs)
+                )
+            response.raise_for_status()
+            embeddings = response.json().get("embeddings") or []
+            if len(embeddings) != len(inputs):
+                raise ValueError(f"expected {len(inputs)} embeddings, got {len(embeddings)}")
+            return embeddings
+
+        try:
+            return await self.with_retries('Ollama', lambda: post(texts))
+        except Exception as e:
+            if len(texts) == 1:
+                print(f"Error generating embedding: {e}")
+                return [None]
+            print(f"Error generating batch embedding, retrying chunks individually: {e}")
+            results = await asyncio.gather(*(self.embed_batch([text]) for text in texts))
+            return [result[0] for result in results]
+
+    async def embed_texts(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Embed the chunks of a file, skipping cached and duplicate chunks
+
+        All batches of the file are requested concurrently; the Ollama
+        semaphore bounds how many are actually in flight across files.
+
+        Args:
+            texts (List[str]): Text chunks to embed
+
+        Returns:
+            List[Optional[List[float]]]: One embedding (or None on failure) per chunk, in order
+        """
+        cache = self.extractor.embedding_cache
+        model = self.extractor.embedding_model
+        cached = await asyncio.to_thread(cache.get_many, model, texts) if cache is not None else {}
+        missing = [text for text in dict.fromkeys(texts) if text not in cached]
+        if missing:
+            batches = self.extractor.embedding_batches(missing)
+            results = await asyncio.gather(
+                *(self.embed_batch(missing[batch.start:batch.stop]) for batch in batches))
+            fresh = [
+                (text, embedding)
+                for batch, embeddings in zip(batches, results)
+                for text, embedding in zip(missing[batch.start:batch.stop], embeddings)
+                if embedding is not None
+            ]
+            if cache is not None:
+                await asyncio.to_thread(cache.put_many, model, fresh)
+            cached.update(fresh)
+        return [cached.get(text) for text in texts]
+
+    async def prepare(self, file_path: str) -> Optional[dict]:
+        """
+        Check, extract, chunk and embed one file
+
+        Args:
+            file_path (str): File to ingest
+
+        Returns:
+            Optional[dict]: Document ready for a writer, or None if the file
+                is unchanged or could not be extracted
+        """
+        fingerprint = None
+        if self.manifest is not None:
+            fingerprint = await asyncio.to_thread(self.manifest.check, file_path)
+            if fingerprint is None:
+                self.stats['skipped'] += 1
+                self.progress.update(1)
+                return None
+
+        extracted = await self.extract(file_path)
+        if extracted is None:
+            self.stats['failed'] += 1
+            self.progress.update(1)
+            return None
+        content, file_type = extracted
+
+        chunks = await asyncio.to_thread(self.extractor.chunk_for_embedding, content)
+        embeddings = await self.embed_texts(chunks)
+        rows = self.extractor.chunk_rows(file_path, file_type, chunks, embeddings)
+        unembedded = [index for index, embedding in enumerate(embeddings) if embedding is None]
+        return {'file_path': file_path, 'chunk_count': len(chunks), 'rows': rows,
+                'unembedded': unembedded, 'fingerprint': fingerprint}
+
+    async def copy_rows(self, rows: List[tuple]) -> bool:
+        """
+        Upsert docs rows through the staging table, as TextExtractor.copy_rows() does
+
+        Args:
+            rows (List[tuple]): Rows from chunk_rows(), possibly from many files
+
+        Returns:
+            bool: True if the rows were committed
+        """
+        if not rows:
+            return True
+        # asyncpg reads a bytes source as a file path, so the data goes in a file object
+        data = copy_text(rows).encode()
+
+        async def copy():
+            async with self.db_pool.acquire() as connection:
+                async with connection.transaction():
+                    await connection.execute(CREATE_STAGING_SQL)
+                    await connection.copy_to_table(
+                        'docs_staging', source=io.BytesIO(data), format='text',
+                        columns=['id', 'source', 'type', 'chunk', 'embedding', 'parent_id']
+                    )
+                    await connection.execute(MERGE_STAGING_SQL)
+
+        try:
+            await self.with_retries('PostgreSQL', copy)
+        except Exception as db_error:
+            print('Error copying documents into database:', db_error)
+            return False
+        if self.extractor.vector_index is not None:
+            await asyncio.to_thread(self.extractor.vector_index.add_rows, rows)
+        return True
+
+    async def delete_stale_chunks(self, file_path: str, chunk_count: int, unembedded: Sequence[int] = ()):
+        """
+        Delete chunks of a file beyond its current chunk count, and those that failed to embed
+
+        Args:
+            file_path (str): Source file path
+            chunk_count (int): Number of chunks the file now has
+            unembedded (Sequence[int]): Indexes of the chunks without an embedding
+        """
+        parent_id = hashlib.md5(file_path.encode()).hexdigest()
+        ids = [f"{parent_id}-{index}" for index in unembedded]
+        await self.with_retries('PostgreSQL', lambda: self.db_pool.execute(
+            "DELETE FROM docs WHERE parent_id = $1 "
+            "AND (split_part(id, '-', 2)::int >= $2 OR id = ANY($3::text[]))",
+            parent_id, chunk_count, ids
+        ))
+        if self.extractor.vector_index is not None:
+            await asyncio.to_thread(self.extractor.vector_index.delete_stale, parent_id, chunk_count, unembedded)
+
+    async def purge_files(self, file_paths: List[str]):
+        """
+        Delete all chunks of files that no longer exist
+
+        Args:
+            file_paths (List[str]): Source file paths to purge
+        """
+        parent_ids = [hashlib.md5(p.encode()).hexdigest() for p in file_paths]
+        await self.with_retries('PostgreSQL', lambda: self.db_pool.execute(
+            "DELETE FROM docs WHERE parent_id = ANY($1::text[])", parent_ids
+        ))
+        if self.extractor.vector_index is not None:
+            await asyncio.to_thread(self.extractor.vector_index.delete_parents, parent_ids)
+
+    async def flush(self, docs: List[dict]):
+        """
+        Copy the rows of several files and record the files that were written
+
+        Args:
+            docs (List[dict]): Documents from prepare()
+        """
+        rows = [row for doc in docs for row in doc['rows']]
+        copied = await self.copy_rows(rows)
+        written = 0
+        for doc in docs:
+            # Like write_chunks(), a file whose chunks all failed to embed
+            # is not considered written, and its rows are left alone
+            if copied and (doc['rows'] or not doc['chunk_count']):
+                try:
+                    await self.delete_stale_chunks(doc['file_path'], doc['chunk_count'], doc['unembedded'])
+                except Exception as db_error:
+                    print(f"Error deleting stale chunks of {doc['file_path']}: {db_error}")
+                    continue
+                # A file with chunks missing is not recorded, so the next
+                # incremental run embeds it again
+                if not doc['unembedded']:
+                    if doc['fingerprint'] is not None:
+                        await asyncio.to_thread(
+                            self.manifest.record, doc['file_path'], doc['fingerprint'], doc['chunk_count'])
+                    written += 1
+        self.stats['written'] += written
+        self.stats['incomplete'] += len(docs) - written
+        self.stats['chunks'] += len(rows) if copied else 0
+        self.progress.update(len(docs))
+
+    async def file_worker(self, files: asyncio.Queue, documents: asyncio.Queue):
+        """Prepare files from the files queue until it yields None."""
+        while True:
+            file_path = await files.get()
+            if file_path is None:
+                return
+            try:
+                doc = await self.prepare(file_path)
+            except Exception as e:
+                print(f"Error preparing {file_path}: {e}")
+                self.stats['failed'] += 1
+                self.progress.update(1)
+                continue
+            if doc is not None:
+                await documents.put(doc)
+
+    async def write_worker(self, documents: asyncio.Queue):
+        """Batch documents into COPYs of DOCS_COPY_BATCH_ROWS rows until the queue yields None."""
+        pending, pending_rows = [], 0
+        while True:
+            doc = await documents.get()
+            if doc is None:
+                break
+            pending.append(doc)
+            pending_rows += len(doc['rows'])
+            if pending_rows >= self.copy_batch_rows:
+                await self.flush(pending)
+                pending, pending_rows = [], 0
+        if pending:
+            await self.flush(pending)
+
+    async def run(self, directory_path: str) -> Dict[str, int]:
+        """
+        Ingest a directory
+
+        Args:
+            directory_path (str): Directory to ingest
+
+        Returns:
+            Dict[str, int]: Counts of files seen, skipped, failed, written (every
+                chunk committed), incomplete (some chunk not committed) and purged,
+                chunks written and retried backend calls
+        """
+        self.tika_limit = asyncio.Semaphore(self.tika_concurrency)
+        self.ollama_limit = asyncio.Semaphore(self.ollama_concurrency)
+        limits = httpx.Limits(max_connections=self.tika_concurrency + self.ollama_concurrency)
+        self.progress = tqdm(desc="Ingesting files", unit="file")
+        seen = []
+
+        async with httpx.AsyncClient(limits=limits) as self.client:
+            self.db_pool = await asyncpg.create_pool(
+                dsn=os.getenv('DATABASE_URL'), min_size=1, max_size=self.write_workers + 1)
+            try:
+                files = asyncio.Queue(maxsize=self.files_in_flight)
+                documents = asyncio.Queue(maxsize=self.queue_size)
+                file_tasks = [asyncio.create_task(self.file_worker(files, documents))
+                              for _ in range(self.files_in_flight)]
+                write_tasks = [asyncio.create_task(self.write_worker(documents))
+                               for _ in range(self.write_workers)]
+                try:
+                    for file_path in self.extractor.iter_files(directory_path):
+                        await files.put(str(file_path))
+                        seen.append(str(file_path))
+                        self.stats['files'] += 1
+                finally:
+                    for _ in file_tasks:
+                        await files.put(None)
+                    await asyncio.gather(*file_tasks)
+                    for _ in write_tasks:
+                        await documents.put(None)
+                    await asyncio.gather(*write_tasks)
+                    self.progress.close()
+
+                # Only reached when the directory scan completed, so a missing
+                # path really means the file was removed
+                if self.manifest is not None:
+                    removed = await asyncio.to_thread(self.manifest.missing_paths, directory_path, seen)
+                    if removed:
+                        await self.purge_files(removed)
+                        await asyncio.to_thread(self.manifest.forget, removed)
+                        self.stats['purged'] = len(removed)
+            finally:
+                await self.db_pool.close()
+
+        return self.stats
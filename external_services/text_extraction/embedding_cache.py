@@ -0,0 +1,113 @@
+# Persistent, content-addressed cache of chunk embeddings
+import os
+import sqlite3
+import hashlib
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_BATCH = 500
+
+
+def embedding_key(model: str, text: str) -> bytes:
+    """
+    Cache key of a chunk: sha256 over the model name and the chunk text
+
+    Args:
+        model (str): Embedding model name
+        text (str): Chunk text
+
+    Returns:
+        bytes: 32-byte digest
+    """
+    digest = hashlib.sha256(model.encode())
+    digest.update(b'\0')
+    digest.update(text.encode())
+    return digest.digest()
+
+
+class EmbeddingCache:
+    """
+    SQLite store of embeddings keyed by sha256(model name + chunk text)
+
+    Vectors are stored as float32 blobs. Identical chunks (overlapping
+    windows, near-duplicate documents, re-ingested files) are embedded once
+    and read back from disk afterwards. Hit and miss counts are kept for
+    reporting at the end of a run.
+
+    The cache is safe to share between threads.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Open (or create) the cache database
+
+        Args:
+            path (str, optional): SQLite file. Defaults to EMBED_CACHE_PATH
+                or embedding_cache.sqlite3 in the working directory.
+        """
+        self.path = path or os.getenv('EMBED_CACHE_PATH', 'embedding_cache.sqlite3')
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key BLOB PRIMARY KEY,
+                vector BLOB NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self._db.commit()
+
+    def get_many(self, model: str, texts: Iterable[str]) -> Dict[str, List[float]]:
+        """
+        Look up the cached embeddings of several chunks
+
+        Args:
+            model (str): Embedding model name
+            texts (Iterable[str]): Chunk texts
+
+        Returns:
+            Dict[str, List[float]]: Embedding per cached text; misses are absent
+        """
+        keys = {embedding_key(model, text): text for text in set(texts)}
+        found: Dict[str, List[float]] = {}
+        key_list = list(keys)
+        with self._lock:
+            for i in range(0, len(key_list), _LOOKUP_BATCH):
+                chunk = key_list[i:i + _LOOKUP_BATCH]
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+                for key, blob in rows:
+                    found[keys[key]] = array('f', blob).tolist()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, model: str, items: Iterable[Tuple[str, List[float]]]):
+        """
+        Store embeddings of several chunks
+
+        Args:
+            model (str): Embedding model name
+            items (Iterable[Tuple[str, List[float]]]): (chunk text, embedding) pairs
+        """
+        rows = [(embedding_key(model, text), array('f', embedding).tobytes()) for text, embedding in items]
+        if not rows:
+            return
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+            self._db.commit()
+
+    def hit_rate(self) -> float:
+        """Fraction of distinct chunk lookups served from the cache"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def close(self):
+        """Close the cache database"""
+        self._db.close()
@@ -0,0 +1,161 @@
+# Manifest of ingested files used for incremental re-ingestion
+import os
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Optional
+
+
+class FileFingerprint(NamedTuple):
+    """Size, modification time and content hash of a file at ingestion time"""
+    size: int
+    mtime_ns: int
+    content_hash: str
+
+
+def hash_file(file_path: str, block_size: int = 1 << 20) -> str:
+    """
+    Compute the SHA-256 of a file's contents
+
+    Args:
+        file_path (str): File to hash
+        block_size (int): Read size in bytes
+
+    Returns:
+        str: Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestManifest:
+    """
+    SQLite manifest of the files already written to the docs table
+
+    One row per ingested file records its size, mtime, content hash and
+    chunk count. check() compares a file against its row: a matching size and
+    mtime skips the file without reading it, and a changed mtime with the
+    same content hash only refreshes the row. Only files that really changed
+    are sent to Tika and Ollama again. A file is only recorded once every
+    one of its chunks has been embedded and written.
+
+    The manifest lives next to the ingestion rather than in the docs
+    database, whose tables are managed by the Prisma schema
+    (prisma/schema.prisma) and would be dropped by `prisma db push`.
+
+    The manifest is safe to share between the pipeline's worker threads.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Open (or create) the manifest database
+
+        Args:
+            path (str, optional): SQLite file. Defaults to INGEST_MANIFEST_PATH
+                or ingest_manifest.sqlite3 in the working directory.
+        """
+        self.path = path or os.getenv('INGEST_MANIFEST_PATH', 'ingest_manifest.sqlite3')
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                chunk_count INTEGER NOT NULL
+            )
+        """)
+        self._db.commit()
+
+    def check(self, file_path: str) -> Optional[FileFingerprint]:
+        """
+        Decide whether a file needs to be (re-)ingested
+
+        Args:
+            file_path (str): File to check
+
+        Returns:
+            Optional[FileFingerprint]: The file's current fingerprint if it is
+                new or changed, None if it is unchanged since the last run
+        """
+        stat = os.stat(file_path)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT size, mtime_ns, content_hash FROM files WHERE path = ?", (file_path,)
+            ).fetchone()
+
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return None
+
+        fingerprint = FileFingerprint(stat.st_size, stat.st_mtime_ns, hash_file(file_path))
+        if row and row[2] == fingerprint.content_hash:
+            # Touched but not modified: remember the new mtime and skip it
+            with self._lock:
+                self._db.execute(
+                    "UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?",
+                    (fingerprint.size, fingerprint.mtime_ns, file_path)
+                )
+                self._db.commit()
+            return None
+        return fingerprint
+
+    def record(self, file_path: str, fingerprint: FileFingerprint, chunk_count: int):
+        """
+        Record a successfully ingested file
+
+        Args:
+            file_path (str): Ingested file
+            fingerprint (FileFingerprint): Fingerprint returned by check()
+            chunk_count (int): Number of chunks the file produced
+        """
+        with self._lock:
+            self._db.execute(
+                """
+                INSERT INTO files (path, size, mtime_ns, content_hash, chunk_count)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (path) DO UPDATE SET
+                    size = excluded.size,
+                    mtime_ns = excluded.mtime_ns,
+                    content_hash = excluded.content_hash,
+                    chunk_count = excluded.chunk_count
+                """,
+                (file_path, fingerprint.size, fingerprint.mtime_ns, fingerprint.content_hash, chunk_count)
+            )
+            self._db.commit()
+
+    def missing_paths(self, directory_path: str, seen: Iterable[str]) -> List[str]:
+        """
+        List manifest entries under a directory that were not seen in this run
+
+        Args:
+            directory_path (str): Directory that was scanned
+            seen (Iterable[str]): Paths found by the scan
+
+        Returns:
+            List[str]: Paths of files that have been removed since they were ingested
+        """
+        directory = Path(directory_path)
+        seen = set(seen)
+        with self._lock:
+            paths = [row[0] for row in self._db.execute("SELECT path FROM files")]
+        return [p for p in paths if p not in seen and Path(p).is_relative_to(directory)]
+
+    def forget(self, paths: Iterable[str]):
+        """
+        Remove files from the manifest
+
+        Args:
+            paths (Iterable[str]): Paths to remove
+        """
+        with self._lock:
+            self._db.executemany("DELETE FROM files WHERE path = ?", [(p,) for p in paths])
+            self._db.commit()
+
+    def close(self):
+        """Close the manifest database"""
+        self._db.close()
@@ -0,0 +1,142 @@
+# Native text extraction for plain-text and simple structured formats
+import os
+import mmap
+import json
+from typing import Optional, Tuple
+
+# Formats whose bytes are the text (Tika returns them unchanged)
+PLAIN_TEXT_EXTENSIONS = {'.txt', '.md', '.py', '.java', '.csv', '.json', '.adoc'}
+
+# Files at least this large are decoded from a memory map instead of being
+# read into a bytes object first
+_MMAP_MIN_BYTES = 1 << 20
+
+
+def local_format(file_path: str) -> Optional[str]:
+    """
+    Name the local parser for a file, if there is one
+
+    Args:
+        file_path (str): Path of the file
+
+    Returns:
+        Optional[str]: 'text', 'notebook' or 'docx', or None if the file
+            has to go to Tika
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension in PLAIN_TEXT_EXTENSIONS:
+        return 'text'
+    if extension == '.ipynb':
+        return 'notebook'
+    if extension == '.docx':
+        return 'docx'
+    return None
+
+
+def read_text(file_path: str) -> Optional[str]:
+    """
+    Decode a UTF-8 text file, memory-mapping it when it is large
+
+    Args:
+        file_path (str): Path of the file
+
+    Returns:
+        Optional[str]: File content, or None if it is not valid UTF-8 (Tika
+            detects other charsets)
+    """
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        try:
+            if size < _MMAP_MIN_BYTES:
+                return f.read().decode('utf-8-sig')
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return str(mapped, 'utf-8-sig')
+        except UnicodeDecodeError:
+            return None
+
+
+def parse_notebook(file_path: str) -> Optional[str]:
+    """
+    Extract the markdown and code cell sources of a Jupyter notebook
+
+    Outputs are left out: they are mostly base64 images and execution noise
+    that Tika would otherwise pass through with the raw JSON.
+
+    Args:
+        file_path (str): Path of the .ipynb file
+
+    Returns:
+        Optional[str]: Cell sources separated by blank lines, or None if the
+            file is not an nbformat 4 notebook
+    """
+    text = read_text(file_path)
+    if text is None:
+        return None
+    try:
+        notebook = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(notebook, dict) or not isinstance(notebook.get('cells'), list):
+        return None
+
+    sources = []
+    for cell in notebook['cells']:
+        source = cell.get('source', '') if isinstance(cell, dict) else ''
+        if isinstance(source, list):
+            source = ''.join(source)
+        if source.strip():
+            sources.append(source)
+    return '\n\n'.join(sources)
+
+
+def parse_docx(file_path: str) -> str:
+    """
+    Extract the paragraphs and table cells of a Word document in body order
+
+    Args:
+        file_path (str): Path of the .docx file
+
+    Returns:
+        str: One line per paragraph and one tab-separated line per table row
+    """
+    from docx import Document
+    from docx.oxml.ns import qn
+    from docx.table import Table
+    from docx.text.paragraph import Paragraph
+
+    document = Document(file_path)
+    lines = []
+    for block in document.element.body.iterchildren():
+        if block.tag == qn('w:p'):
+            lines.append(Paragraph(block, document).text)
+        elif block.tag == qn('w:tbl'):
+            for row in Table(block, document).rows:
+                lines.append('\t'.join(cell.text for cell in row.cells))
+    return '\n'.join(lines)
+
+
+def parse_file(file_path: str) -> Optional[Tuple[str, str]]:
+    """
+    Extract the text of a file with its local parser
+
+    A module-level function so it can run in a ProcessPoolExecutor worker.
+
+    Args:
+        file_path (str): Path of the file
+
+    Returns:
+        Optional[Tuple[str, str]]: (content, file_type), or None if the file
+            has no local parser or could not be parsed and should go to Tika
+    """
+    file_type = local_format(file_path)
+    if file_type == 'text':
+        content = read_text(file_path)
+    elif file_type == 'notebook':
+        content = parse_notebook(file_path)
+    elif file_type == 'docx':
+        content = parse_docx(file_path)
+    else:
+        return None
+    if content is None:
+        return None
+    return content, file_type
@@ -0,0 +1,91 @@
+"""
+Shared fixtures for the text extraction tests.
+
+The modules in text_extraction import each other by plain name, so the
+directory is put on sys.path the way running text_extractor.py does.
+"""
+import json
+import os
+import sys
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def fake_embedding(text: str) -> list:
+    """Deterministic embedding of a text, distinct for distinct texts."""
+    return [float(len(text)), float(zlib.crc32(text.encode()))]
+
+
+class FakeOllama(ThreadingHTTPServer):
+    """
+    Stand-in for Ollama's /api/embed and /api/embeddings endpoints.
+
+    Like Ollama, the legacy /api/embeddings answers at a different scale than
+    /api/embed, so a test mixing the two gets vectors that do not match
+    fake_embedding().
+
+    Attributes:
+        requests: (path, texts) of every request, in arrival order
+        fail: Substrings; a request with any text containing one gets a 500
+        drop_batch_embedding: Answer /api/embed requests for several texts
+            with one embedding too few
+    """
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _OllamaHandler)
+        self.requests = []
+        self.fail = set()
+        self.drop_batch_embedding = False
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def paths(self) -> list:
+        return [path for path, _ in self.requests]
+
+
+class _OllamaHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        texts = body['input'] if self.path == '/api/embed' else [body['prompt']]
+        with self.server.lock:
+            self.server.requests.append((self.path, texts))
+        if any(substring in text for text in texts for substring in self.server.fail):
+            self.send_response(500)
+            self.end_headers()
+            return
+        if self.path == '/api/embed':
+            embeddings = [fake_embedding(text) for text in texts]
+            if self.server.drop_batch_embedding and len(texts) > 1:
+                embeddings = embeddings[:-1]
+            payload = {'embeddings': embeddings}
+        else:
+            payload = {'embedding': [2 * value for value in fake_embedding(texts[0])]}
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def ollama(monkeypatch):
+    """A running FakeOllama, with OLLAMA_URL pointing at it."""
+    server = FakeOllama()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv('OLLAMA_URL', server.url)
+    yield server
+    server.shutdown()
+    server.server_close()
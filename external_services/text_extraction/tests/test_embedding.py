@@ -0,0 +1,97 @@
+"""
+Tests for TextExtractor's batched embedding against a stand-in Ollama server.
+"""
+import pytest
+
+from conftest import fake_embedding
+from text_extractor import TextExtractor
+
+
+@pytest.fixture
+def extractor(ollama, monkeypatch):
+    monkeypatch.setenv('EMBED_BATCH_SIZE', '4')
+    monkeypatch.setenv('EMBED_BATCH_MAX_CHARS', '100')
+    extractor = TextExtractor()
+    yield extractor
+    extractor.close()
+
+
+def batch_requests(ollama) -> list:
+    return [texts for path, texts in ollama.requests if path == '/api/embed']
+
+
+def test_embeddings_are_returned_in_chunk_order(ollama, extractor):
+    texts = [f"chunk {index}" for index in range(10)]
+
+    for max_workers in (1, 4):
+        assert extractor.embed_texts(texts, max_workers=max_workers) == [fake_embedding(text) for text in texts]
+
+
+def test_batches_are_split_by_size(ollama, extractor):
+    texts = [f"chunk {index}" for index in range(10)]
+
+    extractor.embed_texts(texts, max_workers=1)
+
+    assert batch_requests(ollama) == [texts[0:4], texts[4:8], texts[8:10]]
+    assert ollama.paths() == ['/api/embed'] * 3
+
+
+def test_batches_are_split_by_characters(ollama, extractor):
+    # 40 + 40 fit the 100 character budget, a third 40 does not
+    texts = ['a' * 40, 'b' * 40, 'c' * 40, 'd' * 10]
+
+    extractor.embed_texts(texts, max_workers=1)
+
+    assert batch_requests(ollama) == [texts[0:2], texts[2:4]]
+
+
+def test_chunk_longer_than_the_budget_is_sent_alone(ollama, extractor):
+    texts = ['short', 'x' * 250, 'tail']
+
+    assert extractor.embed_texts(texts, max_workers=1) == [fake_embedding(text) for text in texts]
+    assert batch_requests(ollama) == [['short'], ['x' * 250], ['tail']]
+
+
+def test_failed_batch_falls_back_to_single_chunks(ollama, extractor):
+    ollama.fail = {'bad'}
+    texts = ['chunk 0', 'chunk 1 bad', 'chunk 2', 'chunk 3', 'chunk 4']
+
+    embeddings = extractor.embed_texts(texts, max_workers=1)
+
+    # Only the chunk the server rejects loses its embedding
+    assert embeddings == [fake_embedding('chunk 0'), None, fake_embedding('chunk 2'),
+                          fake_embedding('chunk 3'), fake_embedding('chunk 4')]
+    assert ollama.requests == [
+        ('/api/embed', texts[0:4]),
+        ('/api/embed', ['chunk 0']),
+        ('/api/embed', ['chunk 1 bad']),
+        ('/api/embed', ['chunk 2']),
+        ('/api/embed', ['chunk 3']),
+        ('/api/embed', texts[4:5]),
+    ]
+
+
+def test_batch_with_missing_embeddings_falls_back_to_single_chunks(ollama, extractor):
+    ollama.drop_batch_embedding = True
+    texts = ['chunk 0', 'chunk 1', 'chunk 2']
+
+    assert extractor.embed_texts(texts, max_workers=1) == [fake_embedding(text) for text in texts]
+    assert ollama.paths() == ['/api/embed'] * 4
+
+
+def test_embedding_is_none_when_the_server_fails(ollama, extractor):
+    ollama.fail = {'chunk'}
+    texts = ['chunk 0', 'chunk 1']
+
+    assert extractor.embed_text('chunk 0') is None
+    assert extractor.embed_texts(texts, max_workers=1) == [None, None]
+    assert extractor.embed_texts(texts, max_workers=4) == [None, None]
+
+
+def test_embedding_is_none_when_the_server_is_down(monkeypatch):
+    monkeypatch.setenv('OLLAMA_URL', 'http://127.0.0.1:9')
+    extractor = TextExtractor()
+    try:
+        assert extractor.embed_texts(['chunk 0', 'chunk 1'], max_workers=1) == [None, None]
+    finally:
+        extractor.close()
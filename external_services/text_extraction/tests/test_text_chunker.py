@@ -0,0 +1,104 @@
+"""
+Property tests for the streaming chunker behind TextExtractor.chunk_text.
+"""
+import random
+import re
+
+import pytest
+
+import text_chunker
+from text_extractor import TextExtractor
+
+WORDS = ('store inventory phone battery charging network order return warranty '
+         'shipping customer display camera storage price discount support e.g.').split()
+
+
+def random_text(rng: random.Random, sentences: int) -> str:
+    """Short and long sentences, words longer than a chunk and irregular whitespace."""
+    parts = []
+    for _ in range(sentences):
+        words = [rng.choice(WORDS) for _ in range(rng.choice([1, 3, 12, 40, 400]))]
+        if rng.random() < 0.05:
+            words.append('x' * rng.randint(50, 900))
+        parts.append(' '.join(words) + rng.choice(['.', '!', '?', '...', '', ',']))
+    return ''.join(part + rng.choice([' ', '  ', '\n', '\t \n']) for part in parts)
+
+
+def assert_chunk_properties(text: str, chunks: list, max_length: int, overlap: int):
+    """
+    No chunk is longer than max_length, each chunk starts with the last
+    min(overlap, len(previous)) characters of the previous one, and dropping
+    that overlap and concatenating the chunks gives back the text with
+    normalized whitespace.
+    """
+    assert all(len(chunk) <= max_length for chunk in chunks)
+    rebuilt = chunks[0] if chunks else ''
+    for previous, chunk in zip(chunks, chunks[1:]):
+        carried = min(overlap, len(previous))
+        assert chunk.startswith(previous[-carried:] if carried else '')
+        rebuilt += chunk[carried:]
+    assert rebuilt == ' '.join(text.split())
+
+
+@pytest.fixture(scope='module')
+def extractor():
+    extractor = TextExtractor()
+    yield extractor
+    extractor.close()
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_chunks_reassemble_into_the_text(extractor, seed):
+    rng = random.Random(seed)
+    for _ in range(50):
+        text = random_text(rng, rng.randint(0, 60))
+        max_length = rng.choice([20, 80, 300, 1800])
+        overlap = rng.randint(0, max_length - 1)
+        sentence_split = rng.random() < 0.8
+
+        chunks = extractor.chunk_text(text, max_length, overlap, 1, sentence_split)
+
+        assert_chunk_properties(text, chunks, max_length, overlap)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_iter_sentences_matches_re_split(seed):
+    rng = random.Random(seed)
+    for _ in range(100):
+        text = random_text(rng, rng.randint(1, 30))
+        normalized = ' '.join(text.split())
+        expected = re.split(r'(?<=[.!?])\s+', normalized) if normalized else []
+
+        assert list(text_chunker.iter_sentences(text)) == expected
+
+
+def test_unit_longer_than_many_chunks_is_cut_at_max_length():
+    text = ' '.join(['word'] * 20000)
+
+    chunks = list(text_chunker.iter_chunks(text_chunker.iter_sentences(text), 1800, 200))
+
+    assert len(chunks) == len(text) // 1600 + 1
+    assert all(len(chunk) == 1800 for chunk in chunks[:-1])
+    assert_chunk_properties(text, chunks, 1800, 200)
+
+
+def test_chunks_end_at_unit_boundaries_after_a_long_unit():
+    text = 'x' * 250 + ' aaaa' * 30
+
+    chunks = list(text_chunker.iter_chunks(text.split(' '), 100, 7))
+
+    assert [len(chunk) for chunk in chunks[:2]] == [100, 100]
+    assert all(chunk.endswith(' aaaa') for chunk in chunks[2:])
+    assert_chunk_properties(text, chunks, 100, 7)
+
+
+def test_short_chunks_are_dropped():
+    chunks = list(text_chunker.iter_chunks(['a' * 30, 'b' * 30, 'c'], 40, 5, min_chunk_length=31))
+
+    assert chunks == ['a' * 5 + ' ' + 'b' * 30 + ' c']
+
+
+@pytest.mark.parametrize('max_length, overlap', [(10, 10), (10, 20), (10, -1)])
+def test_invalid_parameters_are_rejected(max_length, overlap):
+    with pytest.raises(ValueError):
+        list(text_chunker.iter_chunks(['text'], max_length, overlap))
@@ -0,0 +1,122 @@
+# Streaming, sentence-aware text chunking with exact character overlap
+import bisect
+import re
+from typing import Iterable, Iterator
+
+# A sentence runs up to ., ! or ? followed by whitespace (or the end of the text)
+_SENTENCE_RE = re.compile(r'\S.*?(?:[.!?](?=\s)|\Z)', re.DOTALL)
+_WORD_RE = re.compile(r'\S+')
+
+
+def iter_sentences(text: str) -> Iterator[str]:
+    """
+    Lazily split text into sentences with normalized whitespace
+
+    Yields the same sentences as re.split(r'(?<=[.!?])\\s+') on the text with
+    all whitespace runs collapsed to single spaces, without building either
+    the normalized copy or the list.
+
+    Args:
+        text (str): Text to split
+
+    Yields:
+        str: Sentences
+    """
+    for match in _SENTENCE_RE.finditer(text):
+        yield ' '.join(match.group().split())
+
+
+def iter_words(text: str) -> Iterator[str]:
+    """
+    Lazily split text into whitespace-separated words
+
+    Args:
+        text (str): Text to split
+
+    Yields:
+        str: Words
+    """
+    for match in _WORD_RE.finditer(text):
+        yield match.group()
+
+
+def iter_chunks(
+    units: Iterable[str],
+    max_length: int,
+    overlap: int,
+    min_chunk_length: int = 1
+) -> Iterator[str]:
+    """
+    Pack text units into chunks of at most max_length characters
+
+    The units (sentences or words) are joined with single spaces into one
+    logical text, and each chunk is a window over it. A chunk ends at the last
+    unit boundary that fits, or is cut mid-unit when a single unit does not
+    fit. The next chunk starts exactly overlap characters before the end of
+    the previous one (or at the start of the text, for a first chunk shorter
+    than overlap), so every character of the text is embedded and only the
+    overlap is embedded twice.
+
+    Units are consumed as they are produced: memory is bounded by max_length
+    plus the longest unit, whatever the length of the text.
+
+    Args:
+        units (Iterable[str]): Sentences or words without surrounding whitespace
+        max_length (int): Maximum chunk length in characters
+        overlap (int): Characters shared by consecutive chunks
+        min_chunk_length (int, optional): Shorter chunks are dropped. Defaults to 1.
+
+    Yields:
+        str: Chunks
+
+    Raises:
+        ValueError: If the parameters are invalid
+    """
+    if max_length <= overlap:
+        raise ValueError("CHUNK_SIZE must be larger than CHUNK_OVERLAP.")
+    if overlap < 0:
+        raise ValueError("CHUNK_OVERLAP must be non-negative.")
+
+    pieces = []     # buffered text, joined only when chunks are emitted
+    ends = []       # offsets in the buffer where a unit ends
+    length = 0      # length of the buffer
+    carried = 0     # leading characters of the buffer already emitted
+
+    for unit in units:
+        if not unit:
+            continue
+        if length:
+            pieces.append(' ')
+            length += 1
+        pieces.append(unit)
+        length += len(unit)
+        ends.append(length)
+        if length <= max_length:
+            continue
+
+        # Join the buffer once and move a window start through it, so a unit
+        # many chunks long is cut in time linear in its length
+        buffer = ''.join(pieces)
+        start = 0
+        while length - start > max_length:
+            cut = start + max_length
+            boundary = bisect.bisect_right(ends, cut)
+            if boundary and ends[boundary - 1] > carried:
+                cut = ends[boundary - 1]
+            chunk = buffer[start:cut]
+            if len(chunk) >= min_chunk_length:
+                yield chunk
+
+            start = max(start, cut - overlap)
+            del ends[:bisect.bisect_right(ends, cut)]
+            carried = cut
+
+        pieces = [buffer[start:]]
+        ends = [end - start for end in ends]
+        length -= start
+        carried -= start
+
+    if length > carried:
+        chunk = ''.join(pieces)
+        if len(chunk) >= min_chunk_length:
+            yield chunk
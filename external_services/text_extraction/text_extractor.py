@@ -1,26 +1,75 @@
 # Standard library and third-party imports for text processing
 import os
-import magic  # File type detection
-from docx import Document  # Optional: Word document handling
 from pathlib import Path
-from typing import List, Dict, Generator, Optional
+from typing import List, Dict, Generator, Optional, Sequence
 from tqdm import tqdm  # Progress bar for long-running tasks
 import psycopg2  # PostgreSQL database connection
 import hashlib  # Generating unique identifiers
+import io  # In-memory buffers for COPY
+import json  # Fast embedding serialization
 from dotenv import load_dotenv  # Environment variable management
 import requests  # HTTP requests for Tika and embedding services
 from requests.adapters import HTTPAdapter  # Connection pooling
 import concurrent.futures  # Parallel processing
+import queue  # Bounded queues between pipeline stages
+import threading  # Pipeline stage workers
+from ingest_manifest import IngestManifest  # Incremental re-ingestion
+from embedding_cache import EmbeddingCache  # Skip re-embedding identical chunks
+from vector_index import VectorIndex  # Local ANN index of the docs embeddings
+import multiprocessing  # Process context for the parser pool
+import local_parsers  # Native parsers for text, notebooks and Word documents
+import text_chunker  # Streaming sentence chunker
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Marks the end of the stream on the queues between pipeline stages
+_END_OF_STREAM = object()
+
+# Escapes for values in PostgreSQL's COPY text format
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+# Session-local staging table that copy_rows() COPYs into
+CREATE_STAGING_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS docs_staging
+    (LIKE docs INCLUDING DEFAULTS) ON COMMIT DELETE ROWS
+"""
+
+# DISTINCT ON: a batch may contain the same chunk id twice, which a single
+# ON CONFLICT statement cannot update twice
+MERGE_STAGING_SQL = """
+    INSERT INTO docs (id, source, type, chunk, embedding, parent_id)
+    SELECT DISTINCT ON (id) id, source, type, chunk, embedding, parent_id
+    FROM docs_staging
+    ON CONFLICT (id) DO UPDATE SET
+        source = EXCLUDED.source,
+        type = EXCLUDED.type,
+        chunk = EXCLUDED.chunk,
+        embedding = EXCLUDED.embedding,
+        parent_id = EXCLUDED.parent_id
+"""
+
+
+def copy_text(rows: List[tuple]) -> str:
+    """
+    Encode docs rows in PostgreSQL's COPY text format
+
+    Args:
+        rows (List[tuple]): Rows from TextExtractor.chunk_rows()
+
+    Returns:
+        str: One tab-separated line per row
+    """
+    return ''.join('\t'.join(value.translate(_COPY_ESCAPES) for value in row) + '\n' for row in rows)
+
+
 class TextExtractor:
     """
     Advanced Text Extraction and Embedding Utility
 
     A comprehensive tool for processing text documents from various sources:
-    - Supports multiple file formats via Apache Tika
+    - Parses plain text, notebooks and Word documents natively
+    - Supports multiple other file formats via Apache Tika
     - Generates vector embeddings using Ollama
     - Stores processed documents in PostgreSQL with vector support
 
@@ -42,13 +91,22 @@ class TextExtractor:
     - Flexible configuration via environment variables
     """
     
-    def __init__(self, supported_extensions: List[str] = None):
+    def __init__(
+        self,
+        supported_extensions: List[str] = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        vector_index: Optional[VectorIndex] = None
+    ):
         """
         Initialize TextExtractor with configurable settings
 
         Args:
             supported_extensions (List[str], optional): List of file extensions 
                 to process. Defaults to ['.txt', '.pdf', '.docx'].
+            embedding_cache (EmbeddingCache, optional): Cache consulted before
+                calling Ollama. Defaults to no cache.
+            vector_index (VectorIndex, optional): Local index kept in sync
+                with every write to the docs table. Defaults to no index.
 
         Configuration:
         - Sets up file type detection
@@ -63,8 +121,20 @@ class TextExtractor:
             '.ods', '.odp', '.odg', '.odf', '.ipynb', '.adoc'
         ]
 
-        self.mime = magic.Magic(mime=True)  # MIME type detection
         self.db_connection = None
+
+        # Local parsing: files up to EXTRACT_INLINE_MAX_BYTES are parsed in the
+        # calling thread, larger ones in a pool of EXTRACT_PROCESSES processes
+        self.inline_max_bytes = int(os.getenv('EXTRACT_INLINE_MAX_BYTES', '65536'))
+        self.parse_processes = int(os.getenv('EXTRACT_PROCESSES', str(os.cpu_count() or 1)))
+        self._parse_pool = None
+        self._parse_pool_lock = threading.Lock()
+
+        # Embedding service configuration
+        self.ollama_url = os.getenv('OLLAMA_URL', 'http://localhost:11434')
+        self.embedding_model = "nomic-embed-text"
+        self.embedding_cache = embedding_cache
+        self.vector_index = vector_index
         
         # Robust HTTP session with high connection pool
         self.session = requests.Session()
@@ -95,11 +165,57 @@ class TextExtractor:
             response.raise_for_status()
             return response.text
     
+    def parse_pool(self) -> Optional[concurrent.futures.ProcessPoolExecutor]:
+        """
+        Get the process pool for local parsing, starting it on first use
+
+        Workers are spawned rather than forked because the pool is started
+        from the extraction threads of the pipeline.
+
+        Returns:
+            Optional[ProcessPoolExecutor]: The pool, or None if EXTRACT_PROCESSES is 0
+        """
+        if self.parse_processes <= 0:
+            return None
+        with self._parse_pool_lock:
+            if self._parse_pool is None:
+                self._parse_pool = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.parse_processes,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._parse_pool
+
+    def parse_locally(self, file_path: str) -> Optional[tuple]:
+        """
+        Extract text with a local parser, in the process pool for large files
+
+        Args:
+            file_path (str): Path to the file to be processed
+
+        Returns:
+            Optional[tuple]: (content, file_type), or None if the file has to
+                go to Tika
+        """
+        if local_parsers.local_format(file_path) is None:
+            return None
+        pool = None
+        if os.path.getsize(file_path) > self.inline_max_bytes:
+            pool = self.parse_pool()
+        try:
+            if pool is None:
+                return local_parsers.parse_file(file_path)
+            return pool.submit(local_parsers.parse_file, file_path).result()
+        except Exception as e:
+            print(f"Local parsing failed for {file_path}, falling back to Tika: {e}")
+            return None
+
     def extract_text(self, file_path: str) -> Dict[str, str]:
         """
         Process a single file and extract its text content
 
-        Handles potential extraction errors gracefully.
+        Plain text, notebooks and Word documents are parsed locally (see
+        local_parsers); other formats, and files a local parser cannot read,
+        are sent to Tika. Handles potential extraction errors gracefully.
 
         Args:
             file_path (str): Path to the file to be processed
@@ -109,11 +225,50 @@ class TextExtractor:
         """
         file_path = str(file_path)
         try:
+            parsed = self.parse_locally(file_path)
+            if parsed is not None:
+                content, file_type = parsed
+                return {"content": content, "file_path": file_path, "file_type": file_type}
             content = self.extract_with_tika(file_path)
         except Exception as e:
             return {"error": f"Error processing {file_path}: {str(e)}"}
         return {"content": content, "file_path": file_path, "file_type": "tika"}
+
+    def close(self):
+        """Shut down the local parser processes."""
+        with self._parse_pool_lock:
+            if self._parse_pool is not None:
+                self._parse_pool.shutdown()
+                self._parse_pool = None
     
+    def iter_files(self, directory_path: str) -> Generator[Path, None, None]:
+        """
+        Lazily list the files in a directory that should be processed
+
+        Skips hidden files and directories, log files, empty files and
+        unsupported extensions.
+
+        Args:
+            directory_path (str): Path to the directory to scan
+
+        Yields:
+            Path: Files to process
+
+        Raises:
+            ValueError: If the directory does not exist
+        """
+        directory = Path(directory_path)
+        if not directory.exists():
+            raise ValueError(f"Directory not found: {directory_path}")
+        
+        # Advanced file filtering
+        for f in directory.rglob("*"):
+            if (f.is_file() and f.stat().st_size > 0
+                    and not any(part.startswith('.') for part in f.parts)
+                    and not f.name.endswith('.log')
+                    and f.suffix.lower() in self.supported_extensions):
+                yield f
+
     def process_directory(self, directory_path: str) -> Generator[Dict[str, str], None, None]:
         """
         Recursively process files in a directory with advanced filtering
@@ -133,18 +288,7 @@ class TextExtractor:
         Raises:
             ValueError: If the directory does not exist
         """
-        directory = Path(directory_path)
-        if not directory.exists():
-            raise ValueError(f"Directory not found: {directory_path}")
-        
-        # Advanced file filtering
-        files = [
-            f for f in directory.rglob("*")
-            if f.is_file() and f.stat().st_size > 0 
-            and not any(part.startswith('.') for part in f.parts) 
-            and not f.name.endswith('.log')
-            and f.suffix.lower() in self.supported_extensions
-        ]
+        files = list(self.iter_files(directory_path))
         
         # Concurrent file processing with progress tracking
         with concurrent.futures.ThreadPoolExecutor(max_workers=32) as executor:
@@ -164,106 +308,349 @@ class TextExtractor:
 
         Notes:
         - Uses 'nomic-embed-text' model
+        - Uses /api/embed like embed_batch(), so single and batched embeddings
+          are both L2-normalized (the legacy /api/embeddings is not)
         - Handles embedding generation errors
         """
         try:
-            response = requests.post(
-                "http://localhost:11434/api/embeddings",
+            response = self.session.post(
+                f"{self.ollama_url}/api/embed",
                 json={
-                    "model": "nomic-embed-text",
-                    "prompt": text
+                    "model": self.embedding_model,
+                    "input": [text]
                 },
                 timeout=30
             )
             response.raise_for_status()
-            return response.json().get("embedding")
+            embeddings = response.json().get("embeddings") or []
+            if len(embeddings) != 1:
+                raise ValueError(f"expected 1 embedding, got {len(embeddings)}")
+            return embeddings[0]
         except Exception as e:
             print(f"Error generating embedding: {e}")
             return None
 
-    def process_text_content(self, text: str, file_path: str, file_type: str) -> List[Dict]:
+    def embedding_batches(self, texts: List[str]) -> List[range]:
         """
-        Advanced text processing pipeline
+        Split texts into batches for the batched embedding endpoint
 
-        Workflow:
-        1. Chunk text into semantic segments
-        2. Generate embeddings for each chunk concurrently
-        3. Insert/update chunks in PostgreSQL database
-        4. Support conflict resolution for idempotent processing
+        Batches are sized adaptively: a batch is closed once it holds
+        EMBED_BATCH_SIZE chunks or its total length would exceed
+        EMBED_BATCH_MAX_CHARS characters. A chunk longer than the character
+        budget is sent in a batch of its own.
+
+        Args:
+            texts (List[str]): Text chunks to embed
+
+        Returns:
+            List[range]: Index ranges into texts, in order
+        """
+        max_items = int(os.getenv('EMBED_BATCH_SIZE', '32'))
+        max_chars = int(os.getenv('EMBED_BATCH_MAX_CHARS', '32000'))
+
+        batches = []
+        start = 0
+        batch_chars = 0
+        for index, text in enumerate(texts):
+            if index > start and (index - start >= max_items or batch_chars + len(text) > max_chars):
+                batches.append(range(start, index))
+                start = index
+                batch_chars = 0
+            batch_chars += len(text)
+        if start < len(texts):
+            batches.append(range(start, len(texts)))
+        return batches
+
+    def embed_batch(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Generate embeddings for several text chunks in one Ollama request
+
+        Uses Ollama's /api/embed endpoint, which accepts an array of inputs. If the
+        batch request fails, each chunk is retried on its own so that a single bad
+        chunk only loses its own embedding.
+
+        Args:
+            texts (List[str]): Text chunks to embed
+
+        Returns:
+            List[Optional[List[float]]]: One embedding (or None on failure) per chunk, in order
+        """
+        try:
+            response = self.session.post(
+                f"{self.ollama_url}/api/embed",
+                json={
+                    "model": self.embedding_model,
+                    "input": texts
+                },
+                timeout=30 + 5 * len(texts)
+            )
+            response.raise_for_status()
+            embeddings = response.json().get("embeddings") or []
+            if len(embeddings) != len(texts):
+                raise ValueError(f"expected {len(texts)} embeddings, got {len(embeddings)}")
+            return embeddings
+        except Exception as e:
+            print(f"Error generating batch embedding, retrying chunks individually: {e}")
+            return [self.embed_text(text) for text in texts]
+
+    def embed_texts(
+        self,
+        texts: List[str],
+        desc: Optional[str] = None,
+        max_workers: Optional[int] = None
+    ) -> List[Optional[List[float]]]:
+        """
+        Generate embeddings for a list of text chunks using batched requests
+
+        Chunks found in the embedding cache are not sent to Ollama, and
+        identical chunks within the list are embedded only once. The rest are
+        embedded with embed_uncached() and added to the cache.
+
+        Args:
+            texts (List[str]): Text chunks to embed
+            desc (str, optional): Progress bar description
+            max_workers (int, optional): Concurrent batch requests; 1 sends
+                batches sequentially without a progress bar. Defaults to EMBED_CONCURRENCY.
+
+        Returns:
+            List[Optional[List[float]]]: One embedding (or None on failure) per chunk, in order
+        """
+        if self.embedding_cache is None:
+            return self.embed_uncached(texts, desc, max_workers)
+
+        cached = self.embedding_cache.get_many(self.embedding_model, texts)
+        missing = [text for text in dict.fromkeys(texts) if text not in cached]
+        if missing:
+            new_embeddings = self.embed_uncached(missing, desc, max_workers)
+            fresh = [(text, embedding) for text, embedding in zip(missing, new_embeddings) if embedding is not None]
+            self.embedding_cache.put_many(self.embedding_model, fresh)
+            cached.update(fresh)
+        return [cached.get(text) for text in texts]
+
+    def embed_uncached(
+        self,
+        texts: List[str],
+        desc: Optional[str] = None,
+        max_workers: Optional[int] = None
+    ) -> List[Optional[List[float]]]:
+        """
+        Embed text chunks through Ollama without consulting the cache
+
+        Batches from embedding_batches() are sent concurrently (up to
+        EMBED_CONCURRENCY requests in flight) over the pooled HTTP session.
+
+        Args:
+            texts (List[str]): Text chunks to embed
+            desc (str, optional): Progress bar description
+            max_workers (int, optional): Concurrent batch requests; 1 sends
+                batches sequentially without a progress bar. Defaults to EMBED_CONCURRENCY.
+
+        Returns:
+            List[Optional[List[float]]]: One embedding (or None on failure) per chunk, in order
+        """
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        batches = self.embedding_batches(texts)
+        if max_workers is None:
+            max_workers = int(os.getenv('EMBED_CONCURRENCY', '4'))
+
+        if max_workers == 1:
+            for batch in batches:
+                embeddings[batch.start:batch.stop] = self.embed_batch(texts[batch.start:batch.stop])
+            return embeddings
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self.embed_batch, texts[batch.start:batch.stop]): batch
+                for batch in batches
+            }
+            for future in tqdm(concurrent.futures.as_completed(futures), total=len(futures), desc=desc or "Embedding"):
+                batch = futures[future]
+                embeddings[batch.start:batch.stop] = future.result()
+        return embeddings
+
+    def chunk_for_embedding(self, text: str) -> List[str]:
+        """
+        Chunk text using the chunking parameters from the environment
 
         Args:
             text (str): Full text content
-            file_path (str): Source file path
-            file_type (str): Type of source file
 
         Returns:
-            List[Dict]: Processed and inserted document chunks
+            List[str]: Text chunks ready for embedding
         """
         # Configurable chunking parameters from environment
         chunk_size = int(os.getenv('CHUNK_SIZE', '1800'))
         chunk_overlap = int(os.getenv('CHUNK_OVERLAP', '200'))
         min_chunk_length = int(os.getenv('MIN_CHUNK_LENGTH', '100'))
         sentence_split = os.getenv('SENTENCE_SPLIT', 'True').lower() == 'true'
-        chunks = self.chunk_text(text, chunk_size, chunk_overlap, min_chunk_length, sentence_split)
-        
-        # Concurrent embedding generation
-        embedded_chunks = [None] * len(chunks)
-        with concurrent.futures.ThreadPoolExecutor(max_workers=32) as executor:
-            futures = {executor.submit(self.embed_text, chunk): idx for idx, chunk in enumerate(chunks)}
-            for future in tqdm(concurrent.futures.as_completed(futures), total=len(chunks), desc=f"Embedding {file_path}"):
-                idx = futures[future]
-                embedded_chunks[idx] = future.result()
-
-        # Prepare batch database insertion
-        batch_insert_data = []
-        for chunk_index, (chunk, embedding) in enumerate(zip(chunks, embedded_chunks)):
+        return self.chunk_text(text, chunk_size, chunk_overlap, min_chunk_length, sentence_split)
+
+    def chunk_rows(
+        self,
+        file_path: str,
+        file_type: str,
+        chunks: List[str],
+        embeddings: List[Optional[List[float]]]
+    ) -> List[tuple]:
+        """
+        Build docs table rows for the embedded chunks of one file
+
+        Chunks without an embedding are skipped.
+
+        Args:
+            file_path (str): Source file path
+            file_type (str): Type of source file
+            chunks (List[str]): Text chunks
+            embeddings (List[Optional[List[float]]]): Embedding per chunk
+
+        Returns:
+            List[tuple]: (id, source, type, chunk, embedding, parent_id) rows
+        """
+        # Generate unique identifiers
+        parent_id = hashlib.md5(file_path.encode()).hexdigest()
+        rows = []
+        for chunk_index, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
             if embedding is None:
                 continue
             
-            # Convert embedding to PostgreSQL-compatible format
-            embedding_str = '[' + ','.join(map(str, embedding)) + ']'
-            
-            # Generate unique identifiers
-            parent_id = hashlib.md5(file_path.encode()).hexdigest()
-            chunk_id = f"{parent_id}-{chunk_index}"
-            
-            batch_insert_data.append((chunk_id, file_path, file_type, chunk, embedding_str, parent_id))
-
-        # Batch database insertion with upsert
-        if batch_insert_data:
-            try:
-                query = """
-                INSERT INTO docs (id, source, type, chunk, embedding, parent_id)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                ON CONFLICT (id) DO UPDATE SET
-                    source = EXCLUDED.source,
-                    type = EXCLUDED.type,
-                    chunk = EXCLUDED.chunk,
-                    embedding = EXCLUDED.embedding,
-                    parent_id = EXCLUDED.parent_id
-                """
-                with self.db_connection.cursor() as cursor:
-                    cursor.executemany(query, batch_insert_data)
-                    self.db_connection.commit()
-
-                # Return processed data
-                return [
-                    {
-                        'id': data[0], 
-                        'source': data[1], 
-                        'type': data[2], 
-                        'chunk': data[3], 
-                        'embedding': data[4], 
-                        'parent_id': data[5]
-                    } 
-                    for data in batch_insert_data
-                ]
-            except Exception as db_error:
-                print('Error inserting/updating documents into database:', db_error)
-                self.db_connection.rollback()
+            # Convert embedding to PostgreSQL-compatible format; the C JSON
+            # encoder produces the same '[x,y,...]' text much faster than str()
+            embedding_str = json.dumps(embedding, separators=(',', ':'))
+            rows.append((f"{parent_id}-{chunk_index}", file_path, file_type, chunk, embedding_str, parent_id))
+        return rows
+
+    def insert_rows(self, connection, rows: List[tuple]) -> bool:
+        """
+        Upsert docs rows with executemany (one statement per row)
+
+        Args:
+            connection: psycopg2 connection to write with
+            rows (List[tuple]): Rows from chunk_rows()
+
+        Returns:
+            bool: True if the rows were committed
+        """
+        try:
+            query = """
+            INSERT INTO docs (id, source, type, chunk, embedding, parent_id)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON CONFLICT (id) DO UPDATE SET
+                source = EXCLUDED.source,
+                type = EXCLUDED.type,
+                chunk = EXCLUDED.chunk,
+                embedding = EXCLUDED.embedding,
+                parent_id = EXCLUDED.parent_id
+            """
+            with connection.cursor() as cursor:
+                cursor.executemany(query, rows)
+                connection.commit()
+            return True
+        except Exception as db_error:
+            print('Error inserting/updating documents into database:', db_error)
+            connection.rollback()
+            return False
+
+    def copy_rows(self, connection, rows: List[tuple]) -> bool:
+        """
+        Upsert docs rows by streaming them with COPY into a staging table
+
+        The rows are copied into a temporary table in one round trip and then
+        merged into docs with a single INSERT ... SELECT ... ON CONFLICT, all
+        in one transaction. Committed rows are added to the vector index.
+
+        Args:
+            connection: psycopg2 connection to write with
+            rows (List[tuple]): Rows from chunk_rows(), possibly from many files
+
+        Returns:
+            bool: True if the rows were committed
+        """
+        if not rows:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(CREATE_STAGING_SQL)
+                cursor.copy_expert(
+                    "COPY docs_staging (id, source, type, chunk, embedding, parent_id) FROM STDIN",
+                    io.StringIO(copy_text(rows))
+                )
+                cursor.execute(MERGE_STAGING_SQL)
+            connection.commit()
+        except Exception as db_error:
+            print('Error copying documents into database:', db_error)
+            connection.rollback()
+            return False
+        if self.vector_index is not None:
+            self.vector_index.add_rows(rows)
+        return True
+
+    def write_chunks(
+        self,
+        connection,
+        file_path: str,
+        file_type: str,
+        chunks: List[str],
+        embeddings: List[Optional[List[float]]]
+    ) -> List[Dict]:
+        """
+        Insert or update embedded chunks of one file in the docs table
+
+        Chunks without an embedding are skipped.
+
+        Args:
+            connection: psycopg2 connection to write with
+            file_path (str): Source file path
+            file_type (str): Type of source file
+            chunks (List[str]): Text chunks
+            embeddings (List[Optional[List[float]]]): Embedding per chunk
+
+        Returns:
+            List[Dict]: Inserted document chunks (empty on database errors)
+        """
+        batch_insert_data = self.chunk_rows(file_path, file_type, chunks, embeddings)
+
+        # Bulk database insertion with upsert
+        if batch_insert_data and self.copy_rows(connection, batch_insert_data):
+            # Return processed data
+            return [
+                {
+                    'id': data[0], 
+                    'source': data[1], 
+                    'type': data[2], 
+                    'chunk': data[3], 
+                    'embedding': data[4], 
+                    'parent_id': data[5]
+                } 
+                for data in batch_insert_data
+            ]
         
         return []
 
+    def process_text_content(self, text: str, file_path: str, file_type: str) -> List[Dict]:
+        """
+        Advanced text processing pipeline
+
+        Workflow:
+        1. Chunk text into semantic segments
+        2. Generate embeddings for the chunks in batched requests
+        3. Insert/update chunks in PostgreSQL database
+        4. Support conflict resolution for idempotent processing
+
+        Args:
+            text (str): Full text content
+            file_path (str): Source file path
+            file_type (str): Type of source file
+
+        Returns:
+            List[Dict]: Processed and inserted document chunks
+        """
+        chunks = self.chunk_for_embedding(text)
+        
+        # Batched embedding generation
+        embedded_chunks = self.embed_texts(chunks, desc=f"Embedding {file_path}")
+
+        return self.write_chunks(self.db_connection, file_path, file_type, chunks, embedded_chunks)
+
     def chunk_text(
         self, 
         text: str, 
@@ -273,9 +660,13 @@ class TextExtractor:
         sentence_split: bool = True
     ) -> List[str]:
         """
-        Intelligently chunk text with advanced semantic and sentence-aware strategies.
+        Chunk text at sentence boundaries with exact character overlap
 
-        Ensures semantic continuity and prevents mid-sentence splits.
+        Sentences (or words, without sentence splitting) are streamed from the
+        text and packed into chunks of at most max_length characters; a
+        sentence longer than a chunk is cut. Consecutive chunks share exactly
+        overlap characters, so apart from the overlap each character of the
+        text is embedded once. Whitespace is normalized to single spaces.
 
         Args:
             text (str): Full text to be chunked
@@ -290,71 +681,29 @@ class TextExtractor:
         Raises:
             ValueError: If chunk parameters are invalid
         """
-        import re
         import logging
 
         # Validate input parameters
-        if max_length <= overlap:
-            raise ValueError("CHUNK_SIZE must be larger than CHUNK_OVERLAP.")
-        if overlap < 0:
-            raise ValueError("CHUNK_OVERLAP must be non-negative.")
         if min_chunk_length <= 0:
             raise ValueError("MIN_CHUNK_LENGTH must be positive.")
 
-        # Remove extra whitespaces and normalize text
-        text = re.sub(r'\s+', ' ', text.strip())
-
-        # If sentence splitting is enabled, use sentence boundaries
-        if sentence_split:
-            # Split text into sentences, handling various punctuation
-            sentences = re.split(r'(?<=[.!?])\s+', text)
-        else:
-            # Treat the entire text as a single "sentence"
-            sentences = [text]
-
-        chunks = []
-        current_chunk = []
-        current_length = 0
-
-        for sentence in sentences:
-            # If adding this sentence would exceed max_length, finalize current chunk
-            if current_length + len(sentence) > max_length:
-                if current_chunk:
-                    chunks.append(' '.join(current_chunk))
-                    current_chunk = []
-                    current_length = 0
-
-            current_chunk.append(sentence)
-            current_length += len(sentence) + 1  # +1 for space
-
-            # If chunk is full or we've processed all sentences, finalize
-            if current_length >= max_length or sentence == sentences[-1]:
-                chunks.append(' '.join(current_chunk))
-                current_chunk = []
-                current_length = 0
-
-        # Apply overlap to chunks
-        overlapped_chunks = []
-        for i in range(len(chunks)):
-            start = max(0, i - 1)
-            end = min(len(chunks), i + 2)
-            overlapped_chunk = ' '.join(chunks[start:end]).strip()
-            
-            # Trim to max_length
-            if len(overlapped_chunk) > max_length:
-                overlapped_chunk = overlapped_chunk[:max_length]
-            
-            # Skip very short chunks
-            if len(overlapped_chunk) >= min_chunk_length:
-                overlapped_chunks.append(overlapped_chunk)
+        units = text_chunker.iter_sentences(text) if sentence_split else text_chunker.iter_words(text)
+        chunks = list(text_chunker.iter_chunks(units, max_length, overlap, min_chunk_length))
 
         # Log chunk information
-        logging.info(f"Text Chunking Summary: "
-                     f"Total Chunks={len(overlapped_chunks)}, "
-                     f"Max Length={max_length}, "
-                     f"Overlap={overlap}")
+        logging.info("Text Chunking Summary: Total Chunks=%s, Max Length=%s, Overlap=%s",
+                     len(chunks), max_length, overlap)
+
+        return chunks
 
-        return overlapped_chunks
+    def open_db_connection(self):
+        """
+        Open a new PostgreSQL connection using DATABASE_URL
+
+        Returns:
+            psycopg2 connection
+        """
+        return psycopg2.connect(dsn=os.getenv('DATABASE_URL'))
 
     def connect_to_db(self):
         """
@@ -363,9 +712,276 @@ class TextExtractor:
         Uses connection string from environment variables.
         Provides connection status feedback.
         """
-        self.db_connection = psycopg2.connect(dsn=os.getenv('DATABASE_URL'))
+        self.db_connection = self.open_db_connection()
         print('Connected to the database.')
 
+    def _start_stage(
+        self,
+        name: str,
+        func,
+        inbox: queue.Queue,
+        outbox: Optional[queue.Queue],
+        workers: int,
+        finish=None
+    ) -> List[threading.Thread]:
+        """
+        Start the worker threads of one pipeline stage
+
+        Each worker takes items from inbox, applies func and puts non-None
+        results on outbox. Because both queues are bounded, a slow stage blocks
+        the stages feeding it (backpressure). A stage stops when it reads the
+        end-of-stream marker, which it hands on to its siblings and, once the
+        last worker is done, to the next stage.
+
+        Args:
+            name (str): Stage name used in error messages
+            func: Callable applied to every item
+            inbox (queue.Queue): Input queue
+            outbox (queue.Queue, optional): Output queue; None for the last stage
+            workers (int): Number of worker threads
+            finish (optional): Callable run by each worker once the stream
+                ends, e.g. to flush buffered work
+
+        Returns:
+            List[threading.Thread]: The started worker threads
+        """
+        remaining = [workers]
+        lock = threading.Lock()
+
+        def worker():
+            while True:
+                item = inbox.get()
+                if item is _END_OF_STREAM:
+                    inbox.put(_END_OF_STREAM)
+                    break
+                try:
+                    result = func(item)
+                except Exception as e:
+                    print(f"Error in {name} stage: {e}")
+                    continue
+                if result is not None and outbox is not None:
+                    outbox.put(result)
+
+            if finish is not None:
+                try:
+                    finish()
+                except Exception as e:
+                    print(f"Error finishing {name} stage: {e}")
+
+            with lock:
+                remaining[0] -= 1
+                last_worker = remaining[0] == 0
+            if last_worker and outbox is not None:
+                outbox.put(_END_OF_STREAM)
+
+        threads = [threading.Thread(target=worker, name=f"{name}-{i}", daemon=True) for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def delete_stale_chunks(
+        self,
+        connection,
+        file_path: str,
+        chunk_count: int,
+        unembedded: Sequence[int] = ()
+    ):
+        """
+        Delete chunks of a file beyond its current chunk count
+
+        When a changed file produces fewer chunks than before, the upsert in
+        write_chunks() leaves the old tail behind; this removes it. Chunks
+        that failed to embed were not upserted, so the rows left at their ids
+        from an earlier version of the file are removed as well.
+
+        Args:
+            connection: psycopg2 connection to write with
+            file_path (str): Source file path
+            chunk_count (int): Number of chunks the file now has
+            unembedded (Sequence[int]): Indexes of the chunks without an embedding
+        """
+        parent_id = hashlib.md5(file_path.encode()).hexdigest()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM docs WHERE parent_id = %s "
+                "AND (split_part(id, '-', 2)::int >= %s OR id = ANY(%s))",
+                (parent_id, chunk_count, [f"{parent_id}-{index}" for index in unembedded])
+            )
+        connection.commit()
+        if self.vector_index is not None:
+            self.vector_index.delete_stale(parent_id, chunk_count, unembedded)
+
+    def purge_files(self, connection, file_paths: List[str]):
+        """
+        Delete all chunks of files that no longer exist
+
+        Args:
+            connection: psycopg2 connection to write with
+            file_paths (List[str]): Source file paths to purge
+        """
+        parent_ids = [hashlib.md5(p.encode()).hexdigest() for p in file_paths]
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM docs WHERE parent_id = ANY(%s)", (parent_ids,))
+        connection.commit()
+        if self.vector_index is not None:
+            self.vector_index.delete_parents(parent_ids)
+
+    def run_pipeline(
+        self,
+        directory_path: str,
+        extract_workers: int = 8,
+        chunk_workers: int = 2,
+        embed_workers: int = 4,
+        write_workers: int = 2,
+        queue_size: int = 8,
+        manifest: Optional[IngestManifest] = None
+    ) -> Dict[str, int]:
+        """
+        Ingest a directory with a streaming extract -> chunk -> embed -> write pipeline
+
+        Files are streamed from iter_files() through bounded queues, so only a
+        few documents per stage are held in memory regardless of corpus size,
+        and Tika, Ollama and PostgreSQL are all kept busy at the same time.
+        Every write worker uses its own database connection and copies rows
+        in batches of DOCS_COPY_BATCH_ROWS that span files.
+
+        With a manifest the run is incremental: unchanged files are skipped
+        before Tika is called, and the chunks of files removed from the
+        directory are purged at the end.
+
+        Args:
+            directory_path (str): Directory to ingest
+            extract_workers (int): Concurrent extractions (local parses or Tika requests)
+            chunk_workers (int): Chunking threads
+            embed_workers (int): Files embedded concurrently (one batch request each at a time)
+            write_workers (int): Database writer threads/connections
+            queue_size (int): Capacity of each queue between stages
+            manifest (IngestManifest, optional): Manifest for incremental runs
+
+        Returns:
+            Dict[str, int]: Counts of files seen, skipped, failed, written (every
+                chunk committed), incomplete (some chunk not committed) and purged,
+                and chunks written
+        """
+        stats = {'files': 0, 'skipped': 0, 'failed': 0, 'written': 0, 'incomplete': 0,
+                 'chunks': 0, 'purged': 0}
+        stats_lock = threading.Lock()
+        copy_batch_rows = int(os.getenv('DOCS_COPY_BATCH_ROWS', '2000'))
+        connections = []
+        local = threading.local()
+        seen = []
+
+        def connection():
+            if not hasattr(local, 'connection'):
+                local.connection = self.open_db_connection()
+                with stats_lock:
+                    connections.append(local.connection)
+            return local.connection
+
+        def extract(file_path):
+            file_path = str(file_path)
+            fingerprint = None
+            if manifest is not None:
+                fingerprint = manifest.check(file_path)
+                if fingerprint is None:
+                    with stats_lock:
+                        stats['skipped'] += 1
+                    progress.update(1)
+                    return None
+
+            result = self.extract_text(file_path)
+            if 'error' in result:
+                print(result['error'])
+                with stats_lock:
+                    stats['failed'] += 1
+                return None
+            result['fingerprint'] = fingerprint
+            return result
+
+        def chunk(doc):
+            doc['chunks'] = self.chunk_for_embedding(doc.pop('content'))
+            return doc
+
+        def embed(doc):
+            doc['embeddings'] = self.embed_texts(doc['chunks'], max_workers=1)
+            return doc
+
+        def write(doc):
+            # Rows are buffered per writer and copied in batches that span files
+            if not hasattr(local, 'pending_docs'):
+                local.pending_docs, local.pending_rows = [], []
+            embeddings = doc.pop('embeddings')
+            rows = self.chunk_rows(doc['file_path'], doc['file_type'], doc['chunks'], embeddings)
+            doc['unembedded'] = [index for index, embedding in enumerate(embeddings) if embedding is None]
+            local.pending_docs.append(doc)
+            local.pending_rows.extend(rows)
+            if len(local.pending_rows) >= copy_batch_rows:
+                flush()
+
+        def flush():
+            docs, rows = getattr(local, 'pending_docs', []), getattr(local, 'pending_rows', [])
+            if not docs:
+                return
+            local.pending_docs, local.pending_rows = [], []
+            copied = self.copy_rows(connection(), rows)
+            written = 0
+            for doc in docs:
+                file_path, chunks, unembedded = doc['file_path'], doc['chunks'], doc['unembedded']
+                # Like write_chunks(), a file whose chunks all failed to embed
+                # is not considered written, and its rows are left alone
+                if copied and (len(unembedded) < len(chunks) or not chunks):
+                    self.delete_stale_chunks(connection(), file_path, len(chunks), unembedded)
+                    # A file with chunks missing is not recorded, so the next
+                    # incremental run embeds it again
+                    if not unembedded:
+                        if doc['fingerprint'] is not None:
+                            manifest.record(file_path, doc['fingerprint'], len(chunks))
+                        written += 1
+            with stats_lock:
+                stats['written'] += written
+                stats['incomplete'] += len(docs) - written
+                stats['chunks'] += len(rows) if copied else 0
+            progress.update(len(docs))
+
+        files_queue = queue.Queue(maxsize=queue_size)
+        extracted_queue = queue.Queue(maxsize=queue_size)
+        chunked_queue = queue.Queue(maxsize=queue_size)
+        embedded_queue = queue.Queue(maxsize=queue_size)
+
+        progress = tqdm(desc="Ingesting files", unit="file")
+        threads = (
+            self._start_stage('extract', extract, files_queue, extracted_queue, extract_workers)
+            + self._start_stage('chunk', chunk, extracted_queue, chunked_queue, chunk_workers)
+            + self._start_stage('embed', embed, chunked_queue, embedded_queue, embed_workers)
+            + self._start_stage('write', write, embedded_queue, None, write_workers, finish=flush)
+        )
+
+        try:
+            for file_path in self.iter_files(directory_path):
+                files_queue.put(file_path)
+                seen.append(str(file_path))
+                stats['files'] += 1
+        finally:
+            files_queue.put(_END_OF_STREAM)
+            for thread in threads:
+                thread.join()
+            progress.close()
+
+        try:
+            # Only reached when the directory scan completed, so a missing
+            # path really means the file was removed
+            if manifest is not None:
+                removed = manifest.missing_paths(directory_path, seen)
+                if removed:
+                    self.purge_files(connection(), removed)
+                    manifest.forget(removed)
+                    stats['purged'] = len(removed)
+        finally:
+            for db_connection in connections:
+                db_connection.close()
+
+        return stats
+
 # Main execution block for standalone script usage
 if __name__ == '__main__':
     import argparse
@@ -374,24 +990,73 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Process text files for embedding and storage.')
     parser.add_argument('--directory', type=str, default='data',
                         help='Directory to process files from (default: data)')
+    parser.add_argument('--extract-workers', type=int, default=8,
+                        help='Concurrent extractions, local or Tika (default: 8)')
+    parser.add_argument('--chunk-workers', type=int, default=2,
+                        help='Chunking threads (default: 2)')
+    parser.add_argument('--embed-workers', type=int, default=4,
+                        help='Files embedded concurrently (default: 4)')
+    parser.add_argument('--write-workers', type=int, default=2,
+                        help='Database writer connections (default: 2)')
+    parser.add_argument('--queue-size', type=int, default=8,
+                        help='Capacity of the queue between pipeline stages (default: 8)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Skip unchanged files and purge removed ones using the ingest manifest')
+    parser.add_argument('--manifest', type=str, default=None,
+                        help='Ingest manifest path (default: INGEST_MANIFEST_PATH or ingest_manifest.sqlite3)')
+    parser.add_argument('--no-embed-cache', action='store_true',
+                        help='Embed every chunk instead of reusing cached embeddings')
+    parser.add_argument('--vector-index', action='store_true',
+                        help='Keep the local vector index (VECTOR_INDEX_PATH) in sync with the docs table')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='Ingest on one asyncio event loop (httpx, asyncpg); --extract-workers and '
+                             '--embed-workers then cap Tika and Ollama requests in flight')
+    parser.add_argument('--files-in-flight', type=int, default=32,
+                        help='Files extracted, chunked or embedded at once with --async (default: 32)')
     args = parser.parse_args()
     
-    # Text extraction and embedding workflow
-    extractor = TextExtractor()
-    extractor.connect_to_db()
-    
-    # Step 1: Extract text from files
-    results = list(extractor.process_directory(args.directory))
-
-    # Step 2: Process and embed extracted text
-    for result in results:
-        if 'error' not in result:
-            extractor.process_text_content(
-                text=result['content'], 
-                file_path=result['file_path'], 
-                file_type=result['file_type']
-            )
+    # Text extraction and embedding workflow: extract, chunk, embed and write
+    # stream through bounded queues so memory stays flat for any corpus size
+    embedding_cache = None if args.no_embed_cache else EmbeddingCache()
+    vector_index = VectorIndex() if args.vector_index else None
+    extractor = TextExtractor(embedding_cache=embedding_cache, vector_index=vector_index)
+    manifest = IngestManifest(args.manifest) if args.incremental else None
+    try:
+        if args.use_async:
+            import asyncio
+            from async_ingest import AsyncIngestEngine
 
-    # Cleanup database connection
-    extractor.db_connection.close()
-    print('Database connection closed.')
\ No newline at end of file
+            engine = AsyncIngestEngine(
+                extractor,
+                tika_concurrency=args.extract_workers,
+                ollama_concurrency=args.embed_workers,
+                write_workers=args.write_workers,
+                files_in_flight=args.files_in_flight,
+                queue_size=args.queue_size,
+                manifest=manifest
+            )
+            stats = asyncio.run(engine.run(args.directory))
+        else:
+            stats = extractor.run_pipeline(
+                args.directory,
+                extract_workers=args.extract_workers,
+                chunk_workers=args.chunk_workers,
+                embed_workers=args.embed_workers,
+                write_workers=args.write_workers,
+                queue_size=args.queue_size,
+                manifest=manifest
+            )
+    finally:
+        extractor.close()
+        if manifest is not None:
+            manifest.close()
+        if embedding_cache is not None:
+            embedding_cache.close()
+        if vector_index is not None:
+            vector_index.close()
+    print(f"Processed {stats['files']} files: {stats['written']} written "
+          f"({stats['chunks']} chunks), {stats['incomplete']} incomplete, {stats['skipped']} unchanged, "
+          f"{stats['failed']} failed to extract, {stats['purged']} removed files purged.")
+    if embedding_cache is not None:
+        print(f"Embedding cache: {embedding_cache.hits} hits, {embedding_cache.misses} misses "
+              f"({embedding_cache.hit_rate():.1%} hit rate).")
\ No newline at end of file
@@ -0,0 +1,536 @@
+# Local IVF-flat index over the docs embeddings for top-k search without PostgreSQL
+import os
+import json
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_BATCH = 500
+
+# Rows per block when scanning or assigning the whole index
+_SCAN_BLOCK = 65536
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """
+    Scale vectors to unit length so that cosine similarity is a dot product
+
+    Args:
+        vectors (np.ndarray): (n, dim) or (dim,) array
+
+    Returns:
+        np.ndarray: float32 array of the same shape; zero vectors stay zero
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def quantize(unit: np.ndarray) -> tuple:
+    """
+    Quantize unit vectors to int8 with one scale per vector
+
+    Args:
+        unit (np.ndarray): (n, dim) unit vectors
+
+    Returns:
+        tuple: (codes, scales) with unit ~= codes * scales[:, None]
+    """
+    scales = np.abs(unit).max(axis=1) / 127
+    scales[scales == 0] = 1
+    codes = np.rint(unit / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+class VectorIndex:
+    """
+    IVF-flat index of chunk embeddings, persisted in a directory
+
+    Vectors are stored normalized in append-only float32 files that are
+    memory-mapped for search, next to an int8 copy (one scale per vector)
+    and the inverted-list number of every row. Chunk ids, sources and texts
+    live in a SQLite table keyed by row number.
+
+    Once the index holds VECTOR_INDEX_MIN_TRAIN live vectors, spherical
+    k-means over a sample assigns every vector to one of about sqrt(n)
+    lists. A search scores the centroids, scans the nprobe closest lists
+    (on the int8 codes when quantized search is on) and re-scores the best
+    rescore_factor * k candidates with exact cosine similarity on the
+    float32 vectors. Smaller indexes are searched exhaustively.
+
+    Updates are incremental: new vectors join their nearest list, replaced
+    and deleted chunks are tombstoned. The lists are retrained when the live
+    count has doubled since training, and tombstoned rows are compacted away
+    at that point once they exceed a fifth of the index. A compaction writes
+    a new generation of files, which SQLite switches to atomically.
+
+    The index is safe to share between threads.
+
+    Configuration (environment variables):
+    - VECTOR_INDEX_PATH: Index directory (default vector_index)
+    - VECTOR_INDEX_INT8: Scan lists on int8 codes before exact re-scoring (default false)
+    - VECTOR_INDEX_NPROBE: Lists scanned per query (default 8)
+    - VECTOR_INDEX_RESCORE: Candidates re-scored per requested result (default 10)
+    - VECTOR_INDEX_MIN_TRAIN: Live vectors needed before lists are trained (default 10000)
+    """
+
+    def __init__(self, path: Optional[str] = None, quantized: Optional[bool] = None):
+        """
+        Open (or create) an index directory
+
+        Args:
+            path (str, optional): Index directory. Defaults to VECTOR_INDEX_PATH
+                or vector_index in the working directory.
+            quantized (bool, optional): Scan on int8 codes. Defaults to VECTOR_INDEX_INT8.
+        """
+        self.path = path or os.getenv('VECTOR_INDEX_PATH', 'vector_index')
+        if quantized is None:
+            quantized = os.getenv('VECTOR_INDEX_INT8', 'false').lower() == 'true'
+        self.quantized = quantized
+        self.nprobe = int(os.getenv('VECTOR_INDEX_NPROBE', '8'))
+        self.rescore_factor = int(os.getenv('VECTOR_INDEX_RESCORE', '10'))
+        self.min_train = int(os.getenv('VECTOR_INDEX_MIN_TRAIN', '10000'))
+        os.makedirs(self.path, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(os.path.join(self.path, 'rows.sqlite3'), check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS rows (
+                row INTEGER PRIMARY KEY,
+                id TEXT NOT NULL,
+                parent_id TEXT NOT NULL,
+                source TEXT,
+                chunk TEXT,
+                chunk_index INTEGER NOT NULL,
+                deleted INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS rows_id ON rows (id);
+            CREATE INDEX IF NOT EXISTS rows_parent ON rows (parent_id, chunk_index);
+            CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        """)
+        self._db.commit()
+
+        settings = dict(self._db.execute("SELECT key, value FROM settings"))
+        self.dim = int(settings['dim']) if 'dim' in settings else None
+        self.generation = int(settings.get('generation', '0'))
+        self.trained_rows = int(settings.get('trained_rows', '0'))
+        self.count = self._db.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM rows").fetchone()[0]
+        self.deleted = np.zeros(self.count, dtype=bool)
+        for (row,) in self._db.execute("SELECT row FROM rows WHERE deleted = 1"):
+            self.deleted[row] = True
+        centroids_path = self._file('centroids.npy')
+        self.centroids = np.load(centroids_path) if os.path.exists(centroids_path) else None
+
+        # Drop anything appended after the last committed row, e.g. by a
+        # process killed between writing the files and committing SQLite
+        if self.dim is not None:
+            for name, width in self._row_files():
+                if os.path.exists(self._file(name)):
+                    os.truncate(self._file(name), self.count * width)
+        self._views = None
+        self._lists = None
+
+    def _file(self, name: str, generation: Optional[int] = None) -> str:
+        """Path of an index file of the current (or given) generation."""
+        generation = self.generation if generation is None else generation
+        return os.path.join(self.path, f"{generation}.{name}")
+
+    def _row_files(self) -> List[tuple]:
+        """(file name, bytes per row) of the per-row files."""
+        return [('vectors.f32', self.dim * 4), ('codes.i8', self.dim), ('scales.f32', 4), ('lists.i32', 4)]
+
+    def _set(self, key: str, value):
+        self._db.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _mapped(self) -> Dict[str, np.ndarray]:
+        """Memory maps of the per-row files, reopened after every change."""
+        if self._views is None:
+            self._views = {}
+            if self.count:
+                for name, dtype, shape in (('vectors.f32', np.float32, (self.count, self.dim)),
+                                           ('codes.i8', np.int8, (self.count, self.dim)),
+                                           ('scales.f32', np.float32, (self.count,)),
+                                           ('lists.i32', np.int32, (self.count,))):
+                    self._views[name] = np.memmap(self._file(name), dtype=dtype, mode='r', shape=shape)
+        return self._views
+
+    def _inverted_lists(self) -> tuple:
+        """Row numbers grouped by list, and the offset of every list's group."""
+        if self._lists is None:
+            lists = np.asarray(self._mapped()['lists.i32'])
+            order = np.argsort(lists, kind='stable').astype(np.int64)
+            counts = np.bincount(lists, minlength=len(self.centroids))
+            self._lists = (order, np.concatenate(([0], np.cumsum(counts))))
+        return self._lists
+
+    def _assign(self, unit: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        """Nearest centroid of every vector, computed in blocks."""
+        lists = np.empty(len(unit), dtype=np.int32)
+        for start in range(0, len(unit), _SCAN_BLOCK):
+            block = np.asarray(unit[start:start + _SCAN_BLOCK], dtype=np.float32)
+            lists[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        return lists
+
+    def _mark_deleted(self, rows: Iterable[int]):
+        rows = list(rows)
+        if rows:
+            self._db.executemany("UPDATE rows SET deleted = 1 WHERE row = ?", [(row,) for row in rows])
+            self.deleted[rows] = True
+
+    def add(
+        self,
+        ids: Sequence[str],
+        parent_ids: Sequence[str],
+        sources: Sequence[str],
+        chunks: Sequence[str],
+        vectors: np.ndarray
+    ):
+        """
+        Add chunk embeddings, replacing earlier versions of the same chunk ids
+
+        Args:
+            ids (Sequence[str]): Chunk ids ("<parent_id>-<chunk index>")
+            parent_ids (Sequence[str]): Document id per chunk
+            sources (Sequence[str]): Source path per chunk
+            chunks (Sequence[str]): Chunk texts
+            vectors (np.ndarray): (n, dim) embeddings
+
+        Raises:
+            ValueError: If the vectors do not match the dimension of the index
+        """
+        if not len(ids):
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self._set('dim', self.dim)
+            if vectors.ndim != 2 or vectors.shape[1] != self.dim:
+                raise ValueError(f"expected {self.dim}-dimensional vectors, got shape {vectors.shape}")
+
+            unit = normalize(vectors)
+            codes, scales = quantize(unit)
+            if self.centroids is not None:
+                lists = self._assign(unit, self.centroids)
+            else:
+                lists = np.full(len(unit), -1, dtype=np.int32)
+
+            for i in range(0, len(ids), _LOOKUP_BATCH):
+                batch = list(ids[i:i + _LOOKUP_BATCH])
+                self._mark_deleted(row for (row,) in self._db.execute(
+                    f"SELECT row FROM rows WHERE deleted = 0 AND id IN ({','.join('?' * len(batch))})", batch))
+
+            for name, values in (('vectors.f32', unit), ('codes.i8', codes),
+                                 ('scales.f32', scales), ('lists.i32', lists)):
+                with open(self._file(name), 'ab') as f:
+                    values.tofile(f)
+            start = self.count
+            self._db.executemany(
+                "INSERT INTO rows (row, id, parent_id, source, chunk, chunk_index) VALUES (?, ?, ?, ?, ?, ?)",
+                [(start + i, chunk_id, parent_id, source, chunk, int(chunk_id.rsplit('-', 1)[1]))
+                 for i, (chunk_id, parent_id, source, chunk) in enumerate(zip(ids, parent_ids, sources, chunks))]
+            )
+            self._db.commit()
+
+            self.count += len(ids)
+            self.deleted = np.concatenate((self.deleted, np.zeros(len(ids), dtype=bool)))
+            self._views = None
+            self._lists = None
+            self._maybe_train()
+
+    def add_rows(self, rows: List[tuple]):
+        """
+        Add docs rows as produced by TextExtractor.chunk_rows()
+
+        Args:
+            rows (List[tuple]): (id, source, type, chunk, embedding, parent_id)
+                rows with the embedding as '[x,y,...]' text
+        """
+        if not rows:
+            return
+        self.add(
+            [row[0] for row in rows],
+            [row[5] for row in rows],
+            [row[1] for row in rows],
+            [row[3] for row in rows],
+            np.array([json.loads(row[4]) for row in rows], dtype=np.float32)
+        )
+
+    def delete_stale(self, parent_id: str, chunk_count: int, unembedded: Sequence[int] = ()):
+        """
+        Delete the chunks of a document beyond its current chunk count
+
+        Args:
+            parent_id (str): Document id
+            chunk_count (int): Number of chunks the document now has
+            unembedded (Sequence[int]): Indexes of chunks to delete below the count as well
+        """
+        unembedded = list(unembedded)
+        with self._lock:
+            self._mark_deleted(row for (row,) in self._db.execute(
+                "SELECT row FROM rows WHERE deleted = 0 AND parent_id = ? AND chunk_index >= ?",
+                (parent_id, chunk_count)))
+            for i in range(0, len(unembedded), _LOOKUP_BATCH):
+                batch = unembedded[i:i + _LOOKUP_BATCH]
+                self._mark_deleted(row for (row,) in self._db.execute(
+                    f"SELECT row FROM rows WHERE deleted = 0 AND parent_id = ? "
+                    f"AND chunk_index IN ({','.join('?' * len(batch))})",
+                    [parent_id] + batch))
+            self._db.commit()
+
+    def delete_parents(self, parent_ids: Iterable[str]):
+        """
+        Delete all chunks of documents
+
+        Args:
+            parent_ids (Iterable[str]): Document ids
+        """
+        parent_ids = list(parent_ids)
+        with self._lock:
+            for i in range(0, len(parent_ids), _LOOKUP_BATCH):
+                batch = parent_ids[i:i + _LOOKUP_BATCH]
+                self._mark_deleted(row for (row,) in self._db.execute(
+                    f"SELECT row FROM rows WHERE deleted = 0 AND parent_id IN ({','.join('?' * len(batch))})",
+                    batch))
+            self._db.commit()
+
+    def _maybe_train(self):
+        live = self.count - int(self.deleted.sum())
+        if live >= self.min_train and (self.centroids is None or live >= 2 * self.trained_rows):
+            self.train()
+
+    def train(self, iterations: int = 10, sample_per_list: int = 64, seed: int = 0):
+        """
+        (Re)train the inverted lists with spherical k-means
+
+        Tombstoned rows are compacted away first when they make up more than
+        a fifth of the index.
+
+        Args:
+            iterations (int): k-means iterations
+            sample_per_list (int): Training vectors sampled per list
+            seed (int): Random seed for sampling and initialization
+        """
+        with self._lock:
+            if self.count and self.deleted.mean() > 0.2:
+                self._compact()
+            live = np.flatnonzero(~self.deleted)
+            if not len(live):
+                return
+            rng = np.random.default_rng(seed)
+            nlist = max(1, min(int(np.sqrt(len(live))), 65536))
+            sample = np.sort(rng.choice(live, min(len(live), nlist * sample_per_list), replace=False))
+            vectors = self._mapped()['vectors.f32']
+            data = np.asarray(vectors[sample])
+
+            centroids = data[rng.choice(len(data), nlist, replace=False)]
+            for _ in range(iterations):
+                assignment = self._assign(data, centroids)
+                order = np.argsort(assignment, kind='stable')
+                counts = np.bincount(assignment, minlength=nlist)
+                starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+                filled = counts > 0
+                sums = np.add.reduceat(data[order], starts[filled], axis=0)
+                centroids = centroids.copy()
+                centroids[filled] = normalize(sums)
+                empty = np.flatnonzero(~filled)
+                if len(empty):
+                    centroids[empty] = data[rng.choice(len(data), len(empty), replace=False)]
+
+            lists = self._assign(vectors, centroids)
+            self._views = None
+            tmp_path = self._file('lists.i32') + '.tmp'
+            lists.tofile(tmp_path)
+            os.replace(tmp_path, self._file('lists.i32'))
+            np.save(self._file('centroids.tmp.npy'), centroids)
+            os.replace(self._file('centroids.tmp.npy'), self._file('centroids.npy'))
+            self.centroids = centroids
+            self.trained_rows = len(live)
+            self._set('trained_rows', self.trained_rows)
+            self._db.commit()
+            self._lists = None
+
+    def _compact(self):
+        """Rewrite the index without tombstoned rows as a new file generation."""
+        live = np.flatnonzero(~self.deleted)
+        views = self._mapped()
+        generation = self.generation + 1
+        for name, _ in self._row_files():
+            with open(self._file(name, generation), 'wb') as f:
+                for start in range(0, len(live), _SCAN_BLOCK):
+                    np.asarray(views[name][live[start:start + _SCAN_BLOCK]]).tofile(f)
+        if self.centroids is not None:
+            np.save(self._file('centroids.npy', generation), self.centroids)
+
+        with self._db:
+            self._db.execute("DELETE FROM rows WHERE deleted = 1")
+            self._db.execute("CREATE TEMP TABLE renumbered AS SELECT row, ROW_NUMBER() OVER (ORDER BY row) - 1 AS new_row FROM rows")
+            self._db.execute("UPDATE rows SET row = -1 - (SELECT new_row FROM renumbered WHERE renumbered.row = rows.row)")
+            self._db.execute("UPDATE rows SET row = -1 - row")
+            self._db.execute("DROP TABLE renumbered")
+            self._set('generation', generation)
+
+        previous = self.generation
+        self.generation = generation
+        self.count = len(live)
+        self.deleted = np.zeros(self.count, dtype=bool)
+        self._views = None
+        self._lists = None
+        for name in [name for name, _ in self._row_files()] + ['centroids.npy']:
+            if os.path.exists(self._file(name, previous)):
+                os.remove(self._file(name, previous))
+
+    def search(
+        self,
+        vector: Sequence[float],
+        k: int = 10,
+        nprobe: Optional[int] = None,
+        quantized: Optional[bool] = None
+    ) -> List[Dict]:
+        """
+        Find the chunks most similar to a query embedding
+
+        Args:
+            vector (Sequence[float]): Query embedding
+            k (int): Number of results
+            nprobe (int, optional): Lists to scan. Defaults to VECTOR_INDEX_NPROBE.
+            quantized (bool, optional): Scan on int8 codes. Defaults to the index setting.
+
+        Returns:
+            List[Dict]: Up to k results (id, parent_id, source, chunk,
+                similarity), most similar first
+        """
+        query = normalize(vector)
+        nprobe = nprobe or self.nprobe
+        quantized = self.quantized if quantized is None else quantized
+        with self._lock:
+            if not self.count:
+                return []
+            views = self._mapped()
+            if self.centroids is None:
+                candidates = np.flatnonzero(~self.deleted)
+            else:
+                order, offsets = self._inverted_lists()
+                probe = np.argsort(-(self.centroids @ query))[:nprobe]
+                candidates = np.sort(np.concatenate([order[offsets[l]:offsets[l + 1]] for l in probe]))
+                candidates = candidates[~self.deleted[candidates]]
+            if not len(candidates):
+                return []
+
+            # Scan the candidates; with int8 codes, re-score the best of them exactly
+            scores = np.empty(len(candidates), dtype=np.float32)
+            for start in range(0, len(candidates), _SCAN_BLOCK):
+                block = candidates[start:start + _SCAN_BLOCK]
+                if quantized:
+                    scores[start:start + len(block)] = (views['codes.i8'][block] @ query) * views['scales.f32'][block]
+                else:
+                    scores[start:start + len(block)] = views['vectors.f32'][block] @ query
+            if quantized:
+                shortlist = min(len(candidates), k * self.rescore_factor)
+                best = np.sort(candidates[np.argpartition(-scores, shortlist - 1)[:shortlist]])
+                exact = views['vectors.f32'][best] @ query
+            else:
+                best, exact = candidates, scores
+            k = min(k, len(best))
+            top = np.argpartition(-exact, k - 1)[:k]
+            top = top[np.argsort(-exact[top])]
+            rows = [int(row) for row in best[top]]
+            similarities = {row: float(score) for row, score in zip(rows, exact[top])}
+
+            metadata = {}
+            for i in range(0, len(rows), _LOOKUP_BATCH):
+                batch = rows[i:i + _LOOKUP_BATCH]
+                for row, chunk_id, parent_id, source, chunk in self._db.execute(
+                        f"SELECT row, id, parent_id, source, chunk FROM rows WHERE row IN ({','.join('?' * len(batch))})",
+                        batch):
+                    metadata[row] = {'id': chunk_id, 'parent_id': parent_id, 'source': source, 'chunk': chunk}
+        return [dict(metadata[row], similarity=similarities[row]) for row in rows]
+
+    def build_from_db(self, connection, batch_rows: int = 10000) -> int:
+        """
+        Add every embedded row of the docs table, then train the lists
+
+        Args:
+            connection: psycopg2 connection to read with
+            batch_rows (int): Rows fetched and added at a time
+
+        Returns:
+            int: Number of rows added
+        """
+        added = 0
+        with connection.cursor(name='vector_index_build') as cursor:
+            cursor.itersize = batch_rows
+            cursor.execute("""
+                SELECT id, source, type, chunk, embedding::text, parent_id
+                FROM docs WHERE embedding IS NOT NULL ORDER BY id
+            """)
+            while True:
+                rows = cursor.fetchmany(batch_rows)
+                if not rows:
+                    break
+                self.add_rows(rows)
+                added += len(rows)
+        if added and self.count - int(self.deleted.sum()) > 0:
+            self.train()
+        return added
+
+    def stats(self) -> Dict[str, int]:
+        """Return the row, tombstone and list counts."""
+        with self._lock:
+            deleted = int(self.deleted.sum())
+            return {
+                'rows': self.count - deleted,
+                'deleted': deleted,
+                'lists': 0 if self.centroids is None else len(self.centroids),
+                'dim': self.dim or 0,
+            }
+
+    def close(self):
+        """Close the row database"""
+        with self._lock:
+            self._views = None
+            self._db.close()
+
+
+# Command-line entry point: build the index from PostgreSQL or query it
+if __name__ == '__main__':
+    import argparse
+    import psycopg2
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description='Build or query the local vector index of the docs table.')
+    parser.add_argument('--path', type=str, default=None,
+                        help='Index directory (default: VECTOR_INDEX_PATH or vector_index)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('build', help='Add all docs rows from DATABASE_URL and train the lists')
+    query_parser = subparsers.add_parser('query', help='Print the chunks most similar to a text')
+    query_parser.add_argument('text', type=str)
+    query_parser.add_argument('-k', type=int, default=5, help='Number of results (default: 5)')
+    query_parser.add_argument('--int8', action='store_true', help='Scan lists on int8 codes')
+    args = parser.parse_args()
+
+    index = VectorIndex(args.path)
+    try:
+        if args.command == 'build':
+            connection = psycopg2.connect(dsn=os.getenv('DATABASE_URL'))
+            try:
+                added = index.build_from_db(connection)
+            finally:
+                connection.close()
+            print(f"Added {added} rows: {index.stats()}")
+        else:
+            from text_extractor import TextExtractor
+
+            embedding = TextExtractor().embed_text(args.text)
+            if embedding is None:
+                raise SystemExit("Could not embed the query")
+            for result in index.search(embedding, args.k, quantized=args.int8 or None):
+                print(f"{result['similarity']:.4f}  {result['id']}  {result['source']}")
+                print(f"    {result['chunk'][:200]}")
+    finally:
+        index.close()
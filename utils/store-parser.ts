@@ -28,6 +28,7 @@ export interface StoreData {
   state: string;
   zipCode: string;
   phoneNumber: string;
+  distanceMiles?: number;
 }
 
 /**
@@ -164,6 +165,13 @@ export function parseStoreLocatorData(message: string): StoreResponse | null {
           currentStore.zipCode = addressMatch[4];
         }
       }
+      // Distance line (nearest-store results) starts with 📏
+      else if (line.startsWith('📏')) {
+        const distanceMatch = line.match(/📏\s+([\d.]+) miles away/);
+        if (distanceMatch) {
+          currentStore.distanceMiles = parseFloat(distanceMatch[1]);
+        }
+      }
       // Phone line starts with 📞
       else if (line.startsWith('📞')) {
         const phoneMatch = line.match(/📞\s+(.*)$/);